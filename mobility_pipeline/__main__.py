@@ -0,0 +1,105 @@
+"""Single entry point for the mobility_pipeline scripts
+
+Run ``python -m mobility_pipeline [subcommand] [arguments]`` from the directory
+containing ``mobility_pipeline``. Each subcommand runs the ``main`` function of
+one of the scripts with the remaining arguments, so
+``python -m mobility_pipeline gen-day-mobility --help`` shows the same help as
+``gen_day_mobility.py --help``.
+
+This module imports only the standard library. A script's module, and with it
+heavy dependencies like pandas, shapely, and matplotlib, is only imported once
+its subcommand is chosen, so listing the subcommands is nearly instant and
+each subcommand pays only for the dependencies it uses.
+"""
+
+from argparse import ArgumentParser, REMAINDER, RawDescriptionHelpFormatter
+from importlib import import_module
+from os import path
+import sys
+from typing import List, Optional
+
+
+SUBCOMMANDS = {
+    'gen-tower-tower': (
+        'gen_tower_tower',
+        'Aggregate raw connection events into mobility data'),
+    'gen-voronoi': (
+        'gen_voronoi',
+        'Compute the Voronoi tessellation of the towers'),
+    'gen-country-matrices': (
+        'gen_country_matrices',
+        'Compute the tower-to-admin and admin-to-tower matrices'),
+    'gen-day-mobility': (
+        'gen_day_mobility',
+        "Compute admin-to-admin matrices from days' mobility data"),
+    'lookup-points': (
+        'lookup_points',
+        'Find the tower and admin containing each point'),
+    'query-cube': (
+        'query_cube',
+        'Sum admin-to-admin matrices over ranges of days'),
+    'run-jobs': (
+        'run_jobs',
+        'Run the stale stages for many countries and days'),
+    'gen-hierarchy': (
+        'gen_hierarchy',
+        'Derive the matrices of a coarser admin level'),
+    'serve': (
+        'serve_matrices',
+        'Serve admin-to-admin computations over HTTP'),
+    'check-validation': (
+        'check_validation',
+        'Check the validity of the configured data files'),
+    'plot-voronoi': (
+        'plot_voronoi',
+        'Plot the Voronoi tessellation and towers'),
+    'visualize-overlaps': (
+        'visualize_overlaps',
+        'Plot one Voronoi cell over the admins it overlaps'),
+    'benchmark': (
+        'run_benchmarks',
+        'Benchmark the pipeline on synthetic countries'),
+}
+"""Map from subcommand to the script module it runs and a short description"""
+
+PACKAGE_DIR = path.dirname(path.abspath(__file__))
+"""Directory containing the scripts, which import each other by their
+top-level names (e.g. ``from data_interface import ...``)"""
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run the subcommand named by the first argument
+
+    Args:
+        argv: Arguments, not including the program name. Defaults to
+            ``sys.argv[1:]``.
+
+    Returns:
+        None
+    """
+    epilog = 'subcommands:\n' + '\n'.join(
+        f'  {name:<22}{description}'
+        for name, (_, description) in SUBCOMMANDS.items())
+    parser = ArgumentParser(
+        prog='python -m mobility_pipeline',
+        description='Run one of the mobility_pipeline tools. Pass --help '
+                    'after a subcommand for its usage.',
+        epilog=epilog,
+        formatter_class=RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('subcommand', choices=sorted(SUBCOMMANDS),
+                        metavar='subcommand', help='Tool to run')
+    parser.add_argument('args', nargs=REMAINDER,
+                        help='Arguments for the tool')
+    args = parser.parse_args(argv)
+
+    module_name, _ = SUBCOMMANDS[args.subcommand]
+    if PACKAGE_DIR not in sys.path:
+        sys.path.insert(0, PACKAGE_DIR)
+    module = import_module(module_name)
+    sys.argv = [f'{parser.prog} {args.subcommand}'] + args.args
+    module.main()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,7 @@
+"""Benchmarks for measuring how the pipeline scales
+
+:py:mod:`mobility_pipeline.benchmarks.synthetic` generates seeded synthetic
+countries of configurable size, so the benchmarks in
+:py:mod:`mobility_pipeline.benchmarks.cases` can run without private data. Run
+them with ``run_benchmarks.py``.
+"""
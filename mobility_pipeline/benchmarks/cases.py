@@ -0,0 +1,175 @@
+"""Benchmark cases and the harness that measures them
+
+Each case is a function that takes a
+:py:class:`mobility_pipeline.benchmarks.synthetic.SyntheticCountry` and a
+scratch directory and returns a function of no arguments that runs the code
+being measured. Setup done before returning, such as writing input files, is
+not measured.
+
+:py:func:`measure` times the returned function and, in a separate run so that
+tracing does not distort the timings, measures its peak memory allocation with
+:py:mod:`tracemalloc`.
+"""
+
+from __future__ import annotations
+from os import path
+import time
+import tracemalloc
+from typing import TYPE_CHECKING, Any, Callable, Dict, List
+
+from data_interface import (
+    load_polygons_from_json,
+    save_polygons_to_json,
+)
+
+if TYPE_CHECKING:
+    from benchmarks.synthetic import SyntheticCountry
+
+# The cases import the code they measure during their setup, so that listing
+# the cases, as run_benchmarks.py --help does, skips pandas and shapely
+# pylint: disable=import-outside-toplevel
+
+
+def case_tower_to_admin(country: SyntheticCountry, _: str) -> Callable:
+    """Compute the tower-to-admin matrix"""
+    from lib.make_matrix import make_tower_to_admin_matrix
+    return lambda: make_tower_to_admin_matrix(country.tower_cells,
+                                              country.admin_cells)
+
+
+def case_admin_to_tower(country: SyntheticCountry, _: str) -> Callable:
+    """Compute the admin-to-tower matrix"""
+    from lib.make_matrix import make_admin_to_tower_matrix
+    return lambda: make_admin_to_tower_matrix(country.admin_cells,
+                                              country.tower_cells)
+
+
+def case_tower_to_admin_shapely(country: SyntheticCountry,
+                                _: str) -> Callable:
+    """Compute the tower-to-admin matrix without the convex kernel"""
+    from lib.make_matrix import make_a_to_b_matrix
+    return lambda: make_a_to_b_matrix(country.tower_cells,
+                                      country.admin_cells, use_convex=False)
+
+
+def case_tower_tower(country: SyntheticCountry, _: str) -> Callable:
+    """Compute the tower-to-tower matrix"""
+    from lib.make_matrix import make_tower_tower_matrix
+    return lambda: make_tower_tower_matrix(country.mobility,
+                                           len(country.towers))
+
+
+def case_admin_admin(country: SyntheticCountry, _: str) -> Callable:
+    """Multiply the matrices into the admin-to-admin matrix"""
+    from lib.make_matrix import (
+        make_tower_tower_matrix,
+        make_tower_to_admin_matrix,
+        make_admin_to_tower_matrix,
+        make_admin_admin_matrix,
+    )
+    tower_admin = make_tower_to_admin_matrix(country.tower_cells,
+                                             country.admin_cells)
+    admin_tower = make_admin_to_tower_matrix(country.admin_cells,
+                                             country.tower_cells)
+    tower_tower = make_tower_tower_matrix(country.mobility,
+                                          len(country.towers))
+    return lambda: make_admin_admin_matrix(tower_tower, tower_admin,
+                                           admin_tower)
+
+
+def case_load_admins(country: SyntheticCountry, scratch: str) -> Callable:
+    """Load the admin cells from GeoJSON"""
+    json_path = path.join(scratch, 'admins.json')
+    save_polygons_to_json(country.admin_cells, json_path)
+    return lambda: load_polygons_from_json(json_path)
+
+
+def case_validate_admins(country: SyntheticCountry, _: str) -> Callable:
+    """Check that the admin cells are contiguous and disjoint"""
+    from lib.validate import validate_contiguous_disjoint_cells
+    return lambda: validate_contiguous_disjoint_cells(country.admin_cells)
+
+
+def case_validate_voronoi(country: SyntheticCountry, _: str) -> Callable:
+    """Check that the Voronoi cells are contiguous and disjoint"""
+    from lib.validate import validate_contiguous_disjoint_cells
+    return lambda: validate_contiguous_disjoint_cells(country.tower_cells)
+
+
+CASES: Dict[str, Callable[[SyntheticCountry, str], Callable]] = {
+    'tower_to_admin': case_tower_to_admin,
+    'tower_to_admin_shapely': case_tower_to_admin_shapely,
+    'admin_to_tower': case_admin_to_tower,
+    'tower_tower': case_tower_tower,
+    'admin_admin': case_admin_admin,
+    'load_admins': case_load_admins,
+    'validate_admins': case_validate_admins,
+    'validate_voronoi': case_validate_voronoi,
+}
+"""Map from case name to case function"""
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Measure the time and peak memory of a function
+
+    Args:
+        func: Function to measure
+        repeat: Number of times to time the function. The fastest time is
+            reported.
+
+    Returns:
+        Dictionary with keys ``wall_seconds``, the fastest wall time,
+        ``cpu_seconds``, the CPU time of the same run, and
+        ``peak_memory_bytes``, the most memory allocated at once in a traced
+        run.
+    """
+    best_wall = float('inf')
+    best_cpu = float('inf')
+    for _ in range(repeat):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        func()
+        cpu = time.process_time() - cpu_start
+        wall = time.perf_counter() - wall_start
+        if wall < best_wall:
+            best_wall, best_cpu = wall, cpu
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'wall_seconds': best_wall, 'cpu_seconds': best_cpu,
+            'peak_memory_bytes': peak}
+
+
+def run_case(name: str, country: SyntheticCountry, scratch: str,
+             repeat: int) -> Dict[str, float]:
+    """Set up and measure one case
+
+    Args:
+        name: Key of the case in :py:const:`CASES`
+        country: Synthetic country to run the case on
+        scratch: Directory for any files the case needs
+        repeat: Number of timed runs
+
+    Returns:
+        The measurements from :py:func:`measure`
+    """
+    return measure(CASES[name](country, scratch), repeat)
+
+
+def sweep_sizes(tower_counts: List[int], admin_sides: List[int],
+                vertex_counts: List[int]) -> List[Dict[str, int]]:
+    """List every combination of country sizes to benchmark
+
+    Returns:
+        One dictionary per combination, with keys ``n_towers``,
+        ``n_admins_side``, and ``n_vertices``.
+    """
+    return [{'n_towers': n_towers, 'n_admins_side': n_admins_side,
+             'n_vertices': n_vertices}
+            for n_towers in tower_counts
+            for n_admins_side in admin_sides
+            for n_vertices in vertex_counts]
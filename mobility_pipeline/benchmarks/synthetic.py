@@ -0,0 +1,201 @@
+"""Seeded generator of synthetic countries for benchmarks
+
+A synthetic country is a rectangle containing:
+
+* Towers placed uniformly at random.
+* The Voronoi tessellation of the towers, clipped to the rectangle.
+* A grid of admins whose shared borders are random polylines with a
+  configurable number of vertices, so the cost of geometry operations can be
+  scaled like that of real admin boundaries. Each block of 2x2 admins forms a
+  parent admin, so the admins are nested like admin levels 1 and 2.
+* Mobility data between a random subset of the tower pairs.
+
+Every function takes a :py:class:`numpy.random.RandomState`, so the same seed
+always generates the same country.
+"""
+
+from typing import List, NamedTuple, Tuple
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+from shapely.geometry import MultiPolygon, Polygon, box  # type: ignore
+
+from lib.tessellate import tessellate
+
+
+BOUNDS = (0.0, 0.0, 100.0, 100.0)
+"""Default ``(min_x, min_y, max_x, max_y)`` of a synthetic country"""
+
+JITTER = 0.2
+"""Maximum displacement of an admin border vertex, as a fraction of the admin
+size. Must be below ``1 / pi`` so that borders meeting at a corner cannot
+cross."""
+
+
+class SyntheticCountry(NamedTuple):
+    """A synthetic country generated by :py:func:`make_country`
+
+    Attributes:
+        towers: Tower coordinates, one ``[x, y]`` row per tower
+        tower_cells: Voronoi cell of each tower
+        admin_cells: Admin cells, in row-major order of the admin grid
+        parent_ids: Index of the parent admin of each admin
+        mobility: Mobility data in the format returned by
+            :py:func:`mobility_pipeline.data_interface.load_mobility`
+    """
+    towers: np.ndarray
+    tower_cells: List[MultiPolygon]
+    admin_cells: List[MultiPolygon]
+    parent_ids: np.ndarray
+    mobility: pd.DataFrame
+
+
+def make_towers(rng: np.random.RandomState, n_towers: int,
+                bounds: Tuple[float, float, float, float] = BOUNDS) \
+        -> np.ndarray:
+    """Place towers uniformly at random
+
+    Args:
+        rng: Source of randomness
+        n_towers: Number of towers
+        bounds: ``(min_x, min_y, max_x, max_y)`` of the country
+
+    Returns:
+        Tower coordinates, one ``[x, y]`` row per tower
+    """
+    min_x, min_y, max_x, max_y = bounds
+    return np.column_stack([rng.uniform(min_x, max_x, n_towers),
+                            rng.uniform(min_y, max_y, n_towers)])
+
+
+def make_voronoi_cells(towers: np.ndarray,
+                       bounds: Tuple[float, float, float, float] = BOUNDS) \
+        -> List[MultiPolygon]:
+    """Compute the Voronoi tessellation of the towers within the bounds
+
+    Args:
+        towers: Tower coordinates, one ``[x, y]`` row per tower
+        bounds: ``(min_x, min_y, max_x, max_y)`` of the country
+
+    Returns:
+        The Voronoi cell of each tower, in tower order
+    """
+    return tessellate(towers, [MultiPolygon([box(*bounds)])])
+
+
+def _border(rng: np.random.RandomState, start: np.ndarray, end: np.ndarray,
+            n_vertices: int, amplitude: float) -> np.ndarray:
+    """Make a random polyline between two grid nodes
+
+    Interior vertices are displaced perpendicular to the straight line by up
+    to ``amplitude * sin(pi * t)``, where ``t`` is the fraction of the way
+    from ``start`` to ``end``, so borders stay apart near the nodes.
+
+    Returns:
+        The polyline, including both endpoints, one ``[x, y]`` row per vertex
+    """
+    t = np.linspace(0, 1, n_vertices + 2)
+    points = start + np.outer(t, end - start)
+    direction = (end - start) / np.linalg.norm(end - start)
+    normal = np.array([-direction[1], direction[0]])
+    offsets = rng.uniform(-1, 1, len(t)) * amplitude * np.sin(np.pi * t)
+    return points + np.outer(offsets, normal)
+
+
+def make_admin_grid(rng: np.random.RandomState, n_side: int, n_vertices: int,
+                    bounds: Tuple[float, float, float, float] = BOUNDS) \
+        -> Tuple[List[MultiPolygon], np.ndarray]:
+    """Make a grid of admins with random borders
+
+    Neighboring admins share the exact same border polyline, so the admins are
+    contiguous and disjoint. Borders on the edge of the country are straight.
+
+    Args:
+        rng: Source of randomness
+        n_side: Number of admins along each side of the grid
+        n_vertices: Number of vertices in each border between two grid nodes,
+            not counting the nodes
+        bounds: ``(min_x, min_y, max_x, max_y)`` of the country
+
+    Returns:
+        The admin cells in row-major order, and the index of each admin's
+        parent, where each parent is a 2x2 block of admins.
+    """
+    min_x, min_y, max_x, max_y = bounds
+    xs = np.linspace(min_x, max_x, n_side + 1)
+    ys = np.linspace(min_y, max_y, n_side + 1)
+    width = (max_x - min_x) / n_side
+    height = (max_y - min_y) / n_side
+
+    def border(x_0, y_0, x_1, y_1, on_edge, size):
+        amplitude = 0 if on_edge else JITTER * size
+        return _border(rng, np.array([x_0, y_0]), np.array([x_1, y_1]),
+                       n_vertices, amplitude)
+
+    # horizontal[j][i] runs from node (i, j) to node (i + 1, j)
+    horizontal = [[border(xs[i], ys[j], xs[i + 1], ys[j],
+                          j in (0, n_side), height)
+                   for i in range(n_side)] for j in range(n_side + 1)]
+    # vertical[j][i] runs from node (i, j) to node (i, j + 1)
+    vertical = [[border(xs[i], ys[j], xs[i], ys[j + 1],
+                        i in (0, n_side), width)
+                 for i in range(n_side + 1)] for j in range(n_side)]
+
+    cells = []
+    parent_ids = []
+    n_parents_side = (n_side + 1) // 2
+    for j in range(n_side):
+        for i in range(n_side):
+            ring = np.vstack([horizontal[j][i][:-1],
+                              vertical[j][i + 1][:-1],
+                              horizontal[j + 1][i][::-1][:-1],
+                              vertical[j][i][::-1][:-1]])
+            cells.append(MultiPolygon([Polygon(ring)]))
+            parent_ids.append((j // 2) * n_parents_side + i // 2)
+    return cells, np.array(parent_ids)
+
+
+def make_mobility(rng: np.random.RandomState, n_towers: int,
+                  density: float) -> pd.DataFrame:
+    """Make random mobility data
+
+    Args:
+        rng: Source of randomness
+        n_towers: Number of towers
+        density: Approximate fraction of tower pairs with a non-zero count
+
+    Returns:
+        Mobility data in the format returned by
+        :py:func:`mobility_pipeline.data_interface.load_mobility`, in
+        ``ORIGIN``-major order.
+    """
+    n_pairs = int(density * n_towers ** 2)
+    pairs = np.unique(rng.randint(0, n_towers ** 2, size=n_pairs,
+                                  dtype=np.int64))
+    return pd.DataFrame({
+        'ORIGIN': (pairs // n_towers).astype(np.int32),
+        'DESTINATION': (pairs % n_towers).astype(np.int32),
+        'COUNT': rng.randint(1, 1000, size=len(pairs)),
+    })
+
+
+def make_country(n_towers: int, n_admins_side: int, n_vertices: int,
+                 density: float, seed: int = 0) -> SyntheticCountry:
+    """Generate a synthetic country
+
+    Args:
+        n_towers: Number of towers
+        n_admins_side: Number of admins along each side of the admin grid
+        n_vertices: Number of vertices in each admin border segment
+        density: Approximate fraction of tower pairs with mobility
+        seed: Seed for the random number generator
+
+    Returns:
+        The synthetic country
+    """
+    rng = np.random.RandomState(seed)
+    towers = make_towers(rng, n_towers)
+    tower_cells = make_voronoi_cells(towers)
+    admin_cells, parent_ids = make_admin_grid(rng, n_admins_side, n_vertices)
+    mobility = make_mobility(rng, n_towers, density)
+    return SyntheticCountry(towers, tower_cells, admin_cells, parent_ids,
+                            mobility)
@@ -1,15 +1,15 @@
 """Script that checks the validity of data files
 """
 
+from argparse import ArgumentParser
 import csv
+from typing import Optional
 from mobility_pipeline.data_interface import TOWERS_PATH, MOBILITY_PATH, \
-    load_voronoi_cells, load_towers, VORONOI_PATH, COUNTRY_ID
-from mobility_pipeline.lib.validate import validate_mobility, validate_admins, \
-    validate_voronoi, validate_tower_cells_aligned, \
-    validate_tower_index_name_aligned
+    load_voronoi_cells, load_towers, open_input, VORONOI_PATH, COUNTRY_ID
+from mobility_pipeline.lib.instrument import Metrics, profiled
 
 
-def validate_data_files() -> bool:
+def validate_data_files(metrics: Optional[Metrics] = None) -> bool:
     # pylint: disable=too-many-return-statements
     # pylint: disable=too-many-branches
     """Check the validity of data files
@@ -25,14 +25,26 @@ def validate_data_files() -> bool:
     * Mobility file at
       :py:const:`mobility_pipeline.data_interface.MOBILITY_PATH`
 
+    Args:
+        metrics: Records the time and memory of each check. If ``None``, the
+            checks are not measured.
+
     Returns:
         ``True`` if all files are valid, ``False`` otherwise.
     """
+    # lib.validate uses shapely, so we import it here to keep --help fast
+    # pylint: disable=import-outside-toplevel
+    from mobility_pipeline.lib.validate import validate_mobility, \
+        validate_admins, validate_voronoi, validate_tower_cells_aligned, \
+        validate_tower_index_name_aligned
+
+    if metrics is None:
+        metrics = Metrics(log=None)
 
     # Load and validate towers
     f = None
     try:
-        f = open(TOWERS_PATH, 'r')
+        f = open_input(TOWERS_PATH)
         towers_csv = csv.reader(f)
     except (FileNotFoundError, IOError) as e:
         msg = repr(e)
@@ -40,26 +52,32 @@ def validate_data_files() -> bool:
         return False
     else:
         print('SUCCESS: Towers file opened')
-        align_error = validate_tower_index_name_aligned(towers_csv)
+        with metrics.stage('Validating towers'):
+            align_error = validate_tower_index_name_aligned(towers_csv)
         if align_error:
             print(f'INVALID tower index alignment: {align_error}')
             return False
         print('SUCCESS: Tower indices aligned')
-        towers = load_towers(TOWERS_PATH)
+        with metrics.stage('Loading towers'):
+            towers = load_towers(TOWERS_PATH)
     finally:
         if f:
             f.close()
 
     # Load and validate Voronoi
-    voronoi_errs = validate_voronoi(VORONOI_PATH)
+    with metrics.stage('Validating Voronoi'):
+        voronoi_errs = validate_voronoi(VORONOI_PATH)
     if voronoi_errs:
         print(f'INVALID Voronoi: {voronoi_errs}')
         return False
     print('SUCCESS: Voronoi valid')
-    voronoi = load_voronoi_cells(VORONOI_PATH)
+    with metrics.stage('Loading Voronoi'):
+        voronoi = load_voronoi_cells(VORONOI_PATH)
 
     # Check towers and Voronoi aligned
-    tower_voronoi_align_err = validate_tower_cells_aligned(voronoi, towers)
+    with metrics.stage('Validating tower and Voronoi alignment'):
+        tower_voronoi_align_err = validate_tower_cells_aligned(voronoi,
+                                                               towers)
     if tower_voronoi_align_err:
         print(f'INVALID tower-Voronoi alignment: {tower_voronoi_align_err}')
         return False
@@ -67,7 +85,7 @@ def validate_data_files() -> bool:
 
     # Validate mobility data
     try:
-        f = open(MOBILITY_PATH, 'r')
+        f = open_input(MOBILITY_PATH)
         mobility_csv = csv.reader(f)
     except (FileNotFoundError, IOError) as e:
         msg = repr(e)
@@ -75,7 +93,8 @@ def validate_data_files() -> bool:
         return False
     else:
         print('SUCCESS: Mobility data loaded')
-        mobility_err = validate_mobility(list(mobility_csv)[1:])
+        with metrics.stage('Validating mobility'):
+            mobility_err = validate_mobility(list(mobility_csv)[1:])
         if mobility_err:
             print(f'INVALID mobility data: {mobility_err}')
             return False
@@ -85,7 +104,8 @@ def validate_data_files() -> bool:
             f.close()
 
     # Validate Admins
-    admin_errs = validate_admins(COUNTRY_ID)
+    with metrics.stage('Validating admins'):
+        admin_errs = validate_admins(COUNTRY_ID)
     if admin_errs:
         print(f'INVALID Admins: {admin_errs}')
         return False
@@ -93,8 +113,25 @@ def validate_data_files() -> bool:
     return True
 
 
+def main():
+    """Main function called when script run"""
+    parser = ArgumentParser(
+        description='Check the validity of the data files configured in '
+                    'mobility_pipeline.data_interface',
+        epilog="""https://github.com/codethechange/mobility_pipeline""",
+    )
+    parser.add_argument('--profile', action='store', metavar='PREFIX',
+                        help='Save a profile to PREFIX.prof and the time and '
+                             'memory of each check to PREFIX.json')
+    args = parser.parse_args()
+
+    metrics = Metrics(log=None)
+    with profiled(f'{args.profile}.prof' if args.profile else None):
+        valid = validate_data_files(metrics)
+    if args.profile:
+        metrics.save(f'{args.profile}.json')
+    exit(0 if valid else 1)
+
+
 if __name__ == '__main__':
-    if validate_data_files():
-        exit(0)
-    else:
-        exit(1)
+    main()
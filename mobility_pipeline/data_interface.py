@@ -1,16 +1,35 @@
 """Stores the constants and functions to interface with data files
 
 This file is specific to the data files we are using and their format.
+
+Every script imports this module, including to build its command-line parser,
+so pandas, scipy, and shapely are only imported by the functions that use
+them. That way ``--help`` answers without importing them.
 """
 
-from os import path
+from __future__ import annotations
+from os import path, remove
 import json
-from typing import List
-import shapefile  # type: ignore
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 import numpy as np  # type: ignore
-import pandas as pd  # type: ignore
-from shapely.geometry import MultiPolygon  # type: ignore
-from lib.voronoi import load_cell
+from lib.compression import open_compressed
+
+if TYPE_CHECKING:
+    import pandas as pd  # type: ignore
+    from scipy import sparse  # type: ignore
+    from shapely.geometry import MultiPolygon  # type: ignore
+
+# pylint: disable=import-outside-toplevel
 
 # Thanks to abarnert at StackOverflow for how to document constants
 # https://stackoverflow.com/a/20227174
@@ -37,24 +56,120 @@ ADMIN_TOWER_TEMPLATE = f"{DATA_PATH}/%s-admin-to-tower.csv"
 """Template that uses country identifier to make path to admin_tower matrix"""
 ADMIN_ADMIN_TEMPLATE = f"{DATA_PATH}/%s-%s-admin-to-admin.csv"
 """Path to admin-to-admin matrix, accepts substitutions of country_id, day_id"""
+ADMIN_ADMIN_EDGES_TEMPLATE = f"{DATA_PATH}/%s-%s-admin-to-admin-edges.csv"
+"""Path to admin-to-admin edge list, accepts country_id, day_id"""
+ADMIN_ADMIN_NPZ_TEMPLATE = f"{DATA_PATH}/%s-%s-admin-to-admin.npz"
+"""Path to sparse admin-to-admin matrix, accepts country_id, day_id"""
+ADMIN_ADMIN_TOP_K_TEMPLATE = f"{DATA_PATH}/%s-%s-admin-to-admin-top-k.csv"
+"""Path to top destinations per origin, accepts country_id, day_id"""
+ADMIN_ADMIN_SUBSET_TEMPLATE = \
+    f"{DATA_PATH}/%s-%s-admin-to-admin-subset.csv"
+"""Path to an edge list of flows between some admins, accepts country_id,
+day_id"""
+ADMIN_ADMIN_TEMPLATES = {
+    'csv': ADMIN_ADMIN_TEMPLATE,
+    'edges': ADMIN_ADMIN_EDGES_TEMPLATE,
+    'npz': ADMIN_ADMIN_NPZ_TEMPLATE,
+    'top_k': ADMIN_ADMIN_TOP_K_TEMPLATE,
+}
+"""Map from admin-to-admin output format to the template for its path"""
 ADMIN_GEOJSON_TEMPLATE = f"{DATA_PATH}/%s-shape.json"
 """Path to admin GeoJSON file, accepts substitution of country_id"""
+ADMIN_KEYS_TEMPLATE = f"{DATA_PATH}/%s-admin-keys.csv"
+"""Path to the identifiers of derived admins, accepts country_id"""
+TOWER_REMAP_TEMPLATE = f"{DATA_PATH}/%s-tower-remap.csv"
+"""Path to the map from towers to representative towers, accepts country_id"""
+CUBE_TEMPLATE = f"{DATA_PATH}/%s-cube"
+"""Path to the directory of the time series of admin-to-admin matrices,
+accepts country_id"""
+SIMPLIFIED_CELLS_TEMPLATE = f"{DATA_PATH}/%s-%s-cells-simplified.npz"
+"""Path to the cache of simplified cells, accepts country_id and the kind of
+cells, ``admin`` or ``tower``"""
+LOOKUP_TEMPLATE = f"{DATA_PATH}/%s-lookup.pkl"
+"""Path to the index for finding the tower and admin containing points,
+accepts country_id"""
+BASELINE_TEMPLATE = f"{DATA_PATH}/%s-baseline.npz"
+"""Path to the running statistics of admin-to-admin matrices, accepts
+country_id"""
+ZSCORE_TEMPLATE = f"{DATA_PATH}/%s-%s-admin-to-admin-zscore.csv"
+"""Path to the z-scores of a day's flows against the baseline, accepts
+country_id, day_id"""
+CHANGE_TEMPLATE = f"{DATA_PATH}/%s-%s-admin-to-admin-change.csv"
+"""Path to the percent changes of a day's flows from the baseline mean,
+accepts country_id, day_id"""
+TOWER_ADMIN_CHECKPOINT_TEMPLATE = f"{DATA_PATH}/%s-tower-to-admin.checkpoint"
+"""Path to the directory of the finished rows of an interrupted tower_admin
+computation, accepts country_id"""
+ADMIN_TOWER_CHECKPOINT_TEMPLATE = f"{DATA_PATH}/%s-admin-to-tower.checkpoint"
+"""Path to the directory of the finished rows of an interrupted admin_tower
+computation, accepts country_id"""
+MOBILITY_CHUNKSIZE = 5_000_000
+"""Default number of mobility rows to read at a time when filtering"""
+EVENTS_CHUNKSIZE = 5_000_000
+"""Number of raw connection events to read from disk at a time"""
+INDEX_DTYPE = np.int32
+"""Type used for tower indices"""
+
+
+def open_input(source: Union[str, IO[bytes]], mode: str = 'r') -> IO:
+    """Open an input file, which may be compressed, for reading
+
+    Compressed files are decompressed while they are read, so they never need
+    to be decompressed to disk. See :py:mod:`lib.compression` for the
+    supported codecs and how they are detected.
+
+    Args:
+        source: Path to the file, or a binary file object such as a
+            :py:class:`io.BytesIO` holding the file's contents
+        mode: ``r`` to read text, ``rb`` to read bytes
+
+    Returns:
+        The opened file
+    """
+    return open_compressed(source, mode)
 
 
 def load_polygons_from_json(filepath) -> List[MultiPolygon]:
     """Loads cells from given filepath to JSON.
 
+    The file may be compressed (see :py:func:`open_input`).
+
     Returns:
         A list of :py:mod:`shapely.geometry.MultiPolygon` objects, each of which
         describes a cell. If the cell can be described as a single polygon, the
         returned MultiPolygon will contain only 1 polygon.
     """
-    with open(filepath, 'r') as f:
-        raw_json = json.loads(f.read())
+    from lib.voronoi import load_cell
+    with open_input(filepath) as f:
+        raw_json = json.load(f)
     cells = [load_cell(feature['geometry']) for feature in raw_json['features']]
     return cells
 
 
+def save_polygons_to_json(cells: List[MultiPolygon], filepath: str) -> None:
+    """Saves cells to a GeoJSON file that :py:func:`load_polygons_from_json`
+    can load
+
+    Cells with zero area are saved as features without geometry, which
+    :py:func:`lib.voronoi.load_cell` loads as empty cells.
+
+    Args:
+        cells: The cells to save, in order
+        filepath: Path to the GeoJSON file to write
+
+    Returns:
+        None
+    """
+    from shapely.geometry import mapping  # type: ignore
+    features = []
+    for cell in cells:
+        geometry = mapping(cell) if cell.area != 0 else {}
+        features.append(dict(type="Feature", geometry=geometry,
+                             properties={}))
+    with open(filepath, 'w') as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f)
+
+
 def convert_shape_to_json(shapefile_path_prefix: str, country_id: str) -> None:
     """Converts shapefile containing administrative regions to GeoJSON format
 
@@ -70,6 +185,9 @@ def convert_shape_to_json(shapefile_path_prefix: str, country_id: str) -> None:
     Returns:
         None
     """
+    # pyshp is only needed here, so we import it here to keep startup fast
+    import shapefile  # type: ignore # pylint: disable=import-outside-toplevel
+
     # read the shapefile
     base, extension = path.splitext(shapefile_path_prefix)
     if extension.lower() in [".shp", ".dbf"]:
@@ -101,6 +219,41 @@ def load_admin_cells(identifier: str) -> List[MultiPolygon]:
     return load_polygons_from_json(ADMIN_GEOJSON_TEMPLATE % identifier)
 
 
+def load_admin_properties(identifier: str) -> List[Dict[str, Any]]:
+    """Loads the shapefile attributes of the administrative regions
+
+    Data is loaded from :py:const:`ADMIN_GEOJSON_TEMPLATE` ``% identifier``,
+    which :py:func:`convert_shape_to_json` writes with each shape's attributes
+    as its feature's properties.
+
+    Returns:
+        The properties of each administrative region, in the same order as
+        the cells returned by :py:func:`load_admin_cells`.
+    """
+    with open_input(ADMIN_GEOJSON_TEMPLATE % identifier) as f:
+        raw_json = json.load(f)
+    return [feature.get('properties') or {}
+            for feature in raw_json['features']]
+
+
+def save_admin_keys(country_id: str, keys: List[Any]) -> None:
+    """Save the identifier of each admin of a derived admin level
+
+    Saved to :py:const:`ADMIN_KEYS_TEMPLATE` ``% country_id`` as a CSV with
+    columns ``ADMIN`` (the admin's index in the matrices) and ``KEY``.
+
+    Args:
+        country_id: Country identifier of the derived admin level
+        keys: Identifier of each admin, in matrix order
+
+    Returns:
+        None
+    """
+    import pandas as pd  # type: ignore
+    pd.DataFrame({'ADMIN': np.arange(len(keys)), 'KEY': keys}) \
+        .to_csv(ADMIN_KEYS_TEMPLATE % country_id, index=False)
+
+
 def load_voronoi_cells(voronoi_path: str) -> List[MultiPolygon]:
     """Loads cells
 
@@ -118,84 +271,307 @@ def load_towers(towers_path: str) -> np.ndarray:
     """Loads the tower positions from a file
 
     Arguments:
-        towers_path: Path to towers file
+        towers_path: Path to towers file, which may be compressed (see
+            :py:func:`open_input`)
 
     Returns:
         A matrix of tower coordinates with columns ``[longitude, latitude]`` and
         one tower per row. Row indices match the numeric portions of tower
         names.
     """
-    towers_mat = np.genfromtxt(towers_path, delimiter=',')
+    with open_input(towers_path) as f:
+        towers_mat = np.genfromtxt(f, delimiter=',')
     towers_mat = towers_mat[1:, 1:]
     return towers_mat
 
 
-def load_mobility(mobility_path: str) -> pd.DataFrame:
+def load_mobility(mobility_path: Union[str, IO[bytes]]) -> pd.DataFrame:
     """Loads mobility data from the file at ``mobility_path``.
 
+    The file may be compressed, and ``mobility_path`` may also be a binary
+    file object holding the file's contents (see :py:func:`open_input`).
+
     Returns:
         A :py:class:`pandas.DataFrame` with columns ``ORIGIN``, ``DESTINATION``,
         and ``COUNT``. Columns ``ORIGIN`` and ``DESTINATION`` contain numeric
-        portions of tower names, represented as :py:class:`numpy.int`. These
+        portions of tower names, represented as :py:const:`INDEX_DTYPE`. These
         numeric portions strictly increase in ``ORIGIN``-major order, but rows
         may be missing if they would have had a ``COUNT`` value of ``0``.
     """
-    df = pd.read_csv(mobility_path)
+    import pandas as pd  # type: ignore
+    with open_input(mobility_path) as f:
+        df = pd.read_csv(f)
     del df['DATE']
-    df['ORIGIN'] = df['ORIGIN'].str[2:].astype(np.int)
-    df['DESTINATION'] = df['DESTINATION'].str[2:].astype(np.int)
+    df['ORIGIN'] = df['ORIGIN'].str[2:].astype(INDEX_DTYPE)
+    df['DESTINATION'] = df['DESTINATION'].str[2:].astype(INDEX_DTYPE)
     return df
 
 
-def load_tower_admin(country_id: str) -> np.ndarray:
+def load_mobility_rows(mobility_path: str, origin_mask: np.ndarray,
+                       destination_mask: np.ndarray,
+                       chunksize: int = MOBILITY_CHUNKSIZE) -> pd.DataFrame:
+    """Loads only the mobility data between some towers
+
+    The file is read in chunks, and only the matching rows of each chunk are
+    kept, so the memory used scales with the number of matching rows.
+
+    Args:
+        mobility_path: Path to the mobility data, which may be compressed
+            (see :py:func:`open_input`)
+        origin_mask: Boolean array that is true at the indices of the origin
+            towers to keep. Towers past its end are dropped.
+        destination_mask: Boolean array that is true at the indices of the
+            destination towers to keep. Towers past its end are dropped.
+        chunksize: Number of rows to read at a time
+
+    Returns:
+        The matching rows, in the format returned by :py:func:`load_mobility`
+    """
+    import pandas as pd  # type: ignore
+    kept = []
+    with open_input(mobility_path) as f:
+        reader = pd.read_csv(f, chunksize=chunksize,
+                             usecols=['ORIGIN', 'DESTINATION', 'COUNT'])
+        for chunk in reader:
+            origins = chunk['ORIGIN'].str[2:].astype(INDEX_DTYPE).values
+            destinations = chunk['DESTINATION'].str[2:]\
+                .astype(INDEX_DTYPE).values
+            matches = (origins < len(origin_mask)) & \
+                (destinations < len(destination_mask))
+            matches[matches] = origin_mask[origins[matches]] & \
+                destination_mask[destinations[matches]]
+            kept.append(pd.DataFrame({
+                'ORIGIN': origins[matches],
+                'DESTINATION': destinations[matches],
+                'COUNT': chunk['COUNT'].values[matches],
+            }))
+    if not kept:
+        return pd.DataFrame({
+            'ORIGIN': np.array([], dtype=INDEX_DTYPE),
+            'DESTINATION': np.array([], dtype=INDEX_DTYPE),
+            'COUNT': np.array([]),
+        })
+    return pd.concat(kept, ignore_index=True)
+
+
+def save_mobility(mobility: pd.DataFrame, mobility_path: str,
+                  day_id: str) -> None:
+    """Save mobility data so that it can be loaded by :py:func:`load_mobility`
+
+    Args:
+        mobility: DataFrame with columns ``ORIGIN``, ``DESTINATION``, and
+            ``COUNT``, where ``ORIGIN`` and ``DESTINATION`` are tower indices.
+        mobility_path: File to save the mobility data to
+        day_id: Value for the ``DATE`` column
+
+    Returns:
+        None
+    """
+    import pandas as pd  # type: ignore
+    df = pd.DataFrame({
+        'DATE': day_id,
+        'ORIGIN': TOWER_PREFIX + mobility['ORIGIN'].astype(str),
+        'DESTINATION': TOWER_PREFIX + mobility['DESTINATION'].astype(str),
+        'COUNT': mobility['COUNT'],
+    })
+    df.to_csv(mobility_path, index=False)
+
+
+def load_events(events_path: str, chunksize: int = EVENTS_CHUNKSIZE) \
+        -> Iterator[pd.DataFrame]:
+    """Loads raw per-device connection events in chunks
+
+    The file must be a CSV with columns ``DEVICE``, ``TIMESTAMP``, and
+    ``TOWER``. ``TIMESTAMP`` may be integer seconds since the epoch or any
+    string :py:func:`pandas.to_datetime` understands, where strings without a
+    UTC offset are taken to be in UTC. ``TOWER`` holds tower
+    names, which are :py:const:`TOWER_PREFIX` followed by the tower index.
+
+    Args:
+        events_path: Path to the events file, which may be compressed (see
+            :py:func:`open_input`)
+        chunksize: Maximum number of events in each yielded chunk
+
+    Returns:
+        An iterator of :py:class:`pandas.DataFrame` objects with columns
+        ``DEVICE``, ``TIMESTAMP`` (as :py:class:`numpy.int64` seconds since
+        the epoch), and ``TOWER`` (as the numeric portion of the tower name).
+    """
+    import pandas as pd  # type: ignore
+    with open_input(events_path) as f:
+        reader = pd.read_csv(f, chunksize=chunksize,
+                             usecols=['DEVICE', 'TIMESTAMP', 'TOWER'])
+        for chunk in reader:
+            if not np.issubdtype(chunk['TIMESTAMP'].dtype, np.integer):
+                times = pd.to_datetime(chunk['TIMESTAMP'])
+                chunk['TIMESTAMP'] = times.values.astype(np.int64) // 10 ** 9
+            chunk['TOWER'] = chunk['TOWER'].str[len(TOWER_PREFIX):]\
+                .astype(INDEX_DTYPE)
+            yield chunk
+
+
+def load_tower_admin(country_id: str, dtype: type = np.float64,
+                     memmap_path: Optional[str] = None) -> np.ndarray:
     """Load tower-to-admin matrix
 
     Data loaded from :py:const:`TOWER_ADMIN_TEMPLATE` ``% country_id``.
 
     Args:
         country_id: Country identifier
+        dtype: Type of the returned matrix
+        memmap_path: If given, the matrix is copied to a ``.npy`` file at
+            this path and returned memory-mapped, as by
+            :py:func:`deserialize_mat_memmap`
 
     Returns:
         The tower-to-admin matrix
     """
     file_path = TOWER_ADMIN_TEMPLATE % country_id
-    return deserialize_mat(file_path)
+    if memmap_path is not None:
+        return deserialize_mat_memmap(file_path, memmap_path, dtype)
+    return deserialize_mat(file_path, dtype)
 
 
-def load_admin_tower(country_id: str) -> np.ndarray:
+def load_admin_tower(country_id: str, dtype: type = np.float64,
+                     memmap_path: Optional[str] = None) -> np.ndarray:
     """Load admin-to-tower matrix
 
     Data loaded from :py:const:`ADMIN_TOWER_TEMPLATE` ``% country_id``.
 
     Args:
         country_id: Country identifier
+        dtype: Type of the returned matrix
+        memmap_path: If given, the matrix is copied to a ``.npy`` file at
+            this path and returned memory-mapped, as by
+            :py:func:`deserialize_mat_memmap`
 
     Returns:
         The admin-to-tower matrix
     """
     mat_path = ADMIN_TOWER_TEMPLATE % country_id
-    return deserialize_mat(mat_path)
+    if memmap_path is not None:
+        return deserialize_mat_memmap(mat_path, memmap_path, dtype)
+    return deserialize_mat(mat_path, dtype)
 
 
-def save_admin_admin(country_id: str, day_id: str,
-                     admin_admin: np.ndarray) -> str:
+def save_admin_admin(country_id: str, day_id: str, admin_admin: np.ndarray,
+                     output_format: str = 'csv', threshold: float = 0,
+                     top_k: int = 10) -> str:
     """Save admin-to-admin matrix
 
-    Saved to :py:const:`ADMIN_ADMIN_TEMPLATE` ``% (country_id, day_id)``.
+    Saved to the template in :py:const:`ADMIN_ADMIN_TEMPLATES` for
+    ``output_format``, substituted with ``(country_id, day_id)``. The formats
+    are:
+
+    * ``csv``: The dense matrix, as written by :py:func:`serialize_mat`.
+    * ``edges``: A CSV edge list from :py:func:`lib.flows.admin_admin_to_edges`
+      of the flows of at least ``threshold``.
+    * ``npz``: A compressed sparse matrix from
+      :py:func:`lib.flows.admin_admin_to_csr` of the flows of at least
+      ``threshold``, written by :py:func:`scipy.sparse.save_npz`.
+    * ``top_k``: A CSV table from :py:func:`lib.flows.admin_admin_top_k` of
+      the ``top_k`` largest destinations for each origin.
 
     Args:
         country_id: Country identifier
         day_id: Day identifier
         admin_admin: Admin-to-admin matrix to save
+        output_format: One of the keys of :py:const:`ADMIN_ADMIN_TEMPLATES`
+        threshold: Minimum flow to keep for the ``edges`` and ``npz`` formats
+        top_k: Number of destinations per origin for the ``top_k`` format
 
     Returns:
         Path at which matrix was saved
     """
-    file_path = ADMIN_ADMIN_TEMPLATE % (country_id, day_id)
-    serialize_mat(admin_admin, file_path)
+    from scipy import sparse  # type: ignore
+    from lib.flows import (
+        admin_admin_to_edges,
+        admin_admin_to_csr,
+        admin_admin_top_k,
+    )
+    file_path = ADMIN_ADMIN_TEMPLATES[output_format] % (country_id, day_id)
+    if output_format == 'csv':
+        serialize_mat(admin_admin, file_path)
+    elif output_format == 'edges':
+        admin_admin_to_edges(admin_admin, threshold).to_csv(file_path,
+                                                            index=False)
+    elif output_format == 'npz':
+        sparse.save_npz(file_path, admin_admin_to_csr(admin_admin, threshold))
+    else:
+        admin_admin_top_k(admin_admin, top_k).to_csv(file_path, index=False)
     return file_path
 
 
+def save_admin_admin_subset(country_id: str, day_id: str,
+                            edges: pd.DataFrame) -> str:
+    """Save the admin-to-admin flows between a subset of admins
+
+    Saved to :py:const:`ADMIN_ADMIN_SUBSET_TEMPLATE`, substituted with
+    ``(country_id, day_id)``.
+
+    Args:
+        country_id: Country identifier
+        day_id: Day identifier
+        edges: Edge list from :py:func:`lib.subset.subset_to_edges`
+
+    Returns:
+        Path at which the edge list was saved
+    """
+    file_path = ADMIN_ADMIN_SUBSET_TEMPLATE % (country_id, day_id)
+    edges.to_csv(file_path, index=False)
+    return file_path
+
+
+def save_baseline_scores(country_id: str, day_id: str, zscore: np.ndarray,
+                         change: np.ndarray) -> Tuple[str, str]:
+    """Save how a day's flows compare to the baseline
+
+    Saved to :py:const:`ZSCORE_TEMPLATE` and :py:const:`CHANGE_TEMPLATE`,
+    substituted with ``(country_id, day_id)``, by :py:func:`serialize_mat`.
+    Cells without a score are written as ``nan``.
+
+    Args:
+        country_id: Country identifier
+        day_id: Day identifier
+        zscore: Z-score matrix from :py:meth:`lib.baseline.Baseline.score`
+        change: Percent change matrix from
+            :py:meth:`lib.baseline.Baseline.score`
+
+    Returns:
+        Paths at which the z-scores and percent changes were saved
+    """
+    zscore_path = ZSCORE_TEMPLATE % (country_id, day_id)
+    change_path = CHANGE_TEMPLATE % (country_id, day_id)
+    serialize_mat(zscore, zscore_path)
+    serialize_mat(change, change_path)
+    return zscore_path, change_path
+
+
+def load_admin_admin(country_id: str, day_id: str,
+                     output_format: str = 'csv') \
+        -> Union[np.ndarray, sparse.csr_matrix, pd.DataFrame]:
+    """Load an admin-to-admin matrix saved by :py:func:`save_admin_admin`
+
+    Args:
+        country_id: Country identifier
+        day_id: Day identifier
+        output_format: Format the matrix was saved in
+
+    Returns:
+        The dense matrix for ``csv``, a :py:class:`scipy.sparse.csr_matrix`
+        for ``npz``, and a :py:class:`pandas.DataFrame` for ``edges`` and
+        ``top_k``.
+    """
+    import pandas as pd  # type: ignore
+    from scipy import sparse  # type: ignore
+    file_path = ADMIN_ADMIN_TEMPLATES[output_format] % (country_id, day_id)
+    if output_format == 'csv':
+        return deserialize_mat(file_path)
+    if output_format == 'npz':
+        return sparse.load_npz(file_path)
+    return pd.read_csv(file_path)
+
+
 def save_tower_admin(country_id: str, mat: np.ndarray) -> None:
     """Save tower-to-admin matrix
 
@@ -228,10 +604,73 @@ def save_admin_tower(country_id: str, mat: np.ndarray) -> None:
     serialize_mat(mat, file_path)
 
 
+def save_tower_remap(country_id: str, remap: Optional[np.ndarray]) -> None:
+    """Save the map from towers to their representatives
+
+    Saved to :py:const:`TOWER_REMAP_TEMPLATE` ``% country_id``, one
+    representative index per line in tower order.
+
+    Args:
+        country_id: Country identifier
+        remap: Remap array from :py:func:`lib.canonical.canonicalize`. If
+            ``None``, any saved remap array is deleted, since the matrices
+            are no longer in terms of representatives.
+
+    Returns:
+        None
+    """
+    file_path = TOWER_REMAP_TEMPLATE % country_id
+    if remap is None:
+        if path.exists(file_path):
+            remove(file_path)
+        return
+    np.savetxt(file_path, remap, fmt='%d')
+
+
+def load_tower_remap(country_id: str) -> Optional[np.ndarray]:
+    """Load the map from towers to their representatives, if there is one
+
+    Data loaded from :py:const:`TOWER_REMAP_TEMPLATE` ``% country_id``.
+
+    Args:
+        country_id: Country identifier
+
+    Returns:
+        The remap array, or ``None`` if the country's matrices were computed
+        without canonicalizing the towers.
+    """
+    file_path = TOWER_REMAP_TEMPLATE % country_id
+    if not path.exists(file_path):
+        return None
+    return np.loadtxt(file_path, dtype=INDEX_DTYPE, ndmin=1)
+
+
+def create_tower_tower_memmap(n_towers: int, mat_path: str,
+                              dtype: type = np.float64) -> np.ndarray:
+    """Create an all-zero tower-to-tower matrix backed by a file
+
+    The matrix is stored in ``.npy`` format, so it can be larger than memory.
+    Fill it with :py:func:`lib.make_matrix.fill_tower_tower_matrix`.
+
+    Args:
+        n_towers: Number of towers, which defines the length of each matrix
+            dimension
+        mat_path: File to store the matrix in
+        dtype: Type of the matrix
+
+    Returns:
+        The matrix, as a :py:class:`numpy.memmap`
+    """
+    return np.lib.format.open_memmap(mat_path, mode='w+', dtype=dtype,
+                                     shape=(n_towers, n_towers))
+
+
 def serialize_mat(mat: np.ndarray, mat_path: str) -> None:
     """Save a matrix to a file
 
     Matrix is saved such that it can be recovered by :py:func:`deserialize_mat`.
+    Integer matrices are written without a decimal point, and float32
+    matrices with the 9 significant digits needed to recover them exactly.
 
     Args:
         mat: Matrix to save
@@ -240,18 +679,53 @@ def serialize_mat(mat: np.ndarray, mat_path: str) -> None:
     Returns:
         None
     """
-    np.savetxt(mat_path, mat, delimiter=',')
+    fmt = '%.18e'
+    if np.issubdtype(mat.dtype, np.integer):
+        fmt = '%d'
+    elif mat.dtype == np.float32:
+        fmt = '%.9g'
+    np.savetxt(mat_path, mat, fmt=fmt, delimiter=',')
 
 
-def deserialize_mat(mat_path: str) -> np.ndarray:
+def deserialize_mat(mat_path: str, dtype: type = np.float64) -> np.ndarray:
     """Deserialize a matrix from a file
 
     File must have been created by :py:func:`serialize_mat`.
 
     Args:
         mat_path: Path of matrix file
+        dtype: Type of the returned matrix
 
     Returns:
         Deserialized matrix
     """
-    return np.genfromtxt(mat_path, delimiter=',')
+    return np.genfromtxt(mat_path, delimiter=',', dtype=dtype)
+
+
+def deserialize_mat_memmap(mat_path: str, npy_path: str,
+                           dtype: type = np.float64) -> np.ndarray:
+    """Deserialize a matrix from a file into a file-backed array
+
+    File must have been created by :py:func:`serialize_mat`. Unlike
+    :py:func:`deserialize_mat`, the matrix is copied one row at a time into a
+    ``.npy`` file, so it never has to fit in memory.
+
+    Args:
+        mat_path: Path of matrix file
+        npy_path: Path of the ``.npy`` file to copy the matrix to
+        dtype: Type of the returned matrix
+
+    Returns:
+        The matrix, as a read-only :py:class:`numpy.memmap`
+    """
+    with open(mat_path) as f:
+        n_cols = len(f.readline().split(','))
+        n_rows = 1 + sum(1 for _ in f)
+    mat = np.lib.format.open_memmap(npy_path, mode='w+', dtype=dtype,
+                                    shape=(n_rows, n_cols))
+    with open(mat_path) as f:
+        for i, line in enumerate(f):
+            mat[i] = np.array(line.split(','), dtype=dtype)
+    mat.flush()
+    del mat
+    return np.load(npy_path, mmap_mode='r')
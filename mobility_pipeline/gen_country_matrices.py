@@ -11,12 +11,22 @@ from data_interface import (
     load_admin_cells,
     save_admin_tower,
     save_tower_admin,
+    save_tower_remap,
+    load_towers,
+    load_tower_admin,
+    load_admin_tower,
     DATA_PATH,
+    TOWER_ADMIN_CHECKPOINT_TEMPLATE,
+    ADMIN_TOWER_CHECKPOINT_TEMPLATE,
+    SIMPLIFIED_CELLS_TEMPLATE,
 )
-from lib.make_matrix import (
-    make_tower_to_admin_matrix,
-    make_admin_to_tower_matrix,
+from lib.checkpoint import (
+    RowCheckpoint,
+    fingerprint_cells,
+    DEFAULT_CHECKPOINT_SECONDS,
 )
+from lib.precision import FLOAT32_POLICY, FLOAT64_POLICY
+from lib.instrument import Metrics, ProgressReporter, profiled
 
 
 DESC = f"""Compute the admin-to-tower and tower-to-admin matrices for a country.
@@ -31,7 +41,121 @@ JSON is not found), the JSON will be generated at
 DATA_PATH/[country-id]-shape.json.
 
 If no shapefiles are specified, then the parsed Shapefiles as JSON must exist
-as [country_id]-shape.json under DATA_PATH."""
+as [country_id]-shape.json under DATA_PATH.
+
+With --float32, the matrices are computed and saved in single precision, which
+is enough for overlap fractions and halves their size.
+
+With --canonicalize, towers with identical cells share one row and column of
+the matrices, and towers with empty cells are dropped, or, if --towers is
+given, merged with a tower at the same location. The map from each tower to
+its row is saved as DATA_PATH/[country_id]-tower-remap.csv, which
+gen_day_mobility.py uses to merge the mobility data to match.
+
+With --engine centroid, no Voronoi tessellation is needed. Instead, each
+tower in the --towers CSV is assigned to the admin containing it, which takes
+seconds but only approximates the overlaps. Use it for quick looks and dry
+runs. It keeps every tower, so it cannot be combined with --canonicalize, and
+any remap saved by an earlier canonicalized run is removed. --compare
+EXACT_ID reports how far the computed matrices are from the exact ones
+previously saved under EXACT_ID.
+
+With --engine raster, the cells are drawn onto a grid of square pixels of
+side --resolution, and the overlaps are estimated by counting pixels. This is
+much faster than the exact engine for detailed borders, at the cost of an
+error that shrinks with the pixel size. The error is estimated by computing
+--error-samples rows of each matrix exactly.
+
+With --simplify TOLERANCE, the admin and Voronoi cells are simplified before
+the exact or raster engine runs, dropping the vertices within TOLERANCE (in
+the units of the cells' coordinates) of the simplified borders. This speeds
+up the exact engine for detailed borders. The simplified cells are cached as
+DATA_PATH/[country_id]-admin-cells-simplified.npz and
+DATA_PATH/[country_id]-tower-cells-simplified.npz, and the largest change in
+any overlap fraction is estimated by computing --error-samples rows of each
+matrix from both the original and the simplified cells.
+
+The exact engine can take hours for a large country. With --checkpoint-every
+SECONDS, the rows of each matrix finished since the last save are saved that
+often to a new file in DATA_PATH/[country_id]-tower-to-admin.checkpoint/ and
+DATA_PATH/[country_id]-admin-to-tower.checkpoint/. If the run is interrupted,
+running the same command with --resume skips the saved rows, provided the
+cells are unchanged. The checkpoints are deleted once the matrices are saved.
+
+With --profile PREFIX, cProfile statistics are written to PREFIX.prof and the
+time, memory, and counters of each stage to PREFIX.json."""
+
+
+def load_cells(args, metrics):
+    """Load the Voronoi and admin cells, canonicalizing and simplifying them
+
+    The towers are canonicalized if ``--canonicalize`` was given, and the
+    cells simplified if ``--simplify`` was given.
+
+    Args:
+        args: The parsed command-line arguments
+        metrics: The :py:class:`lib.instrument.Metrics` to record stages in
+
+    Returns:
+        The tower cells, the admin cells, and the remap array, or ``None`` if
+        the towers were not canonicalized.
+    """
+    # Like the engines in main, these use shapely, so --help skips them
+    # pylint: disable=import-outside-toplevel
+    from lib.canonical import canonicalize
+    from lib.simplify import (
+        cached_simplify,
+        count_vertices,
+        estimate_simplification_error,
+    )
+
+    with metrics.stage("Loading admin and Voronoi cells"):
+        tower_cells = load_voronoi_cells(args.voronoi_path)
+        admin_cells = load_admin_cells(args.country_id)
+
+    remap = None
+    if args.canonicalize:
+        with metrics.stage("Canonicalizing towers"):
+            towers = load_towers(args.towers) if args.towers else None
+            remap, representatives = canonicalize(tower_cells, towers)
+            tower_cells = [tower_cells[i] for i in representatives]
+        print(f"Kept {len(tower_cells)} of {len(remap)} towers")
+
+    if args.simplify:
+        with metrics.stage("Simplifying cells"):
+            simple_tower_cells = cached_simplify(
+                tower_cells, args.simplify,
+                SIMPLIFIED_CELLS_TEMPLATE % (args.country_id, "tower"))
+            simple_admin_cells = cached_simplify(
+                admin_cells, args.simplify,
+                SIMPLIFIED_CELLS_TEMPLATE % (args.country_id, "admin"))
+        for name, cells, simple_cells in [
+                ("admin", admin_cells, simple_admin_cells),
+                ("Voronoi", tower_cells, simple_tower_cells)]:
+            print(f"Simplified {name} cells from {count_vertices(cells)} to "
+                  f"{count_vertices(simple_cells)} vertices")
+        if args.error_samples:
+            with metrics.stage("Estimating simplification error"):
+                errors = estimate_simplification_error(
+                    tower_cells, admin_cells, simple_tower_cells,
+                    simple_admin_cells, args.error_samples)
+            for name, error in errors.items():
+                print(f"Estimated {name} change from simplifying: "
+                      f"{format_errors(error)}")
+        tower_cells, admin_cells = simple_tower_cells, simple_admin_cells
+    return tower_cells, admin_cells, remap
+
+
+def format_errors(errors):
+    """Format the errors from :py:func:`lib.centroid.compare_operators`
+
+    Args:
+        errors: Dictionary from error name to value
+
+    Returns:
+        The errors as a string of comma-separated ``name = value`` pairs
+    """
+    return ", ".join(f"{key} = {value:.4g}" for key, value in errors.items())
 
 
 def main():
@@ -44,27 +168,148 @@ def main():
                         help="Uniquely identifies country data in DATA_PATH")
     parser.add_argument("-s", "--shapefile_path_prefix", action="store",
                         help="Path, without file extension, to shapefiles")
-    parser.add_argument("voronoi_path", action="store",
-                        help="Path to the computed Voronoi tessellation")
+    parser.add_argument("voronoi_path", action="store", nargs="?",
+                        help="Path to the computed Voronoi tessellation; "
+                             "required by the exact and raster engines")
+    parser.add_argument("--float32", action="store_true",
+                        help="Compute in single instead of double precision")
+    parser.add_argument("--canonicalize", action="store_true",
+                        help="Merge duplicate towers and drop empty cells")
+    parser.add_argument("--towers", action="store", metavar="TOWERS_PATH",
+                        help="Towers CSV, used by --canonicalize to merge "
+                             "co-located towers")
+    parser.add_argument("--engine", action="store", default="exact",
+                        choices=["exact", "centroid", "raster"],
+                        help="How to compute the overlaps")
+    parser.add_argument("--resolution", action="store", type=float,
+                        default=0.01,
+                        help="Pixel size of the raster engine, in the units "
+                             "of the cells' coordinates")
+    parser.add_argument("--simplify", action="store", type=float,
+                        metavar="TOLERANCE",
+                        help="Simplify the cells' borders to within "
+                             "TOLERANCE before computing overlaps")
+    parser.add_argument("--error-samples", action="store", type=int,
+                        default=20,
+                        help="Rows to compute exactly to estimate the error "
+                             "of the raster engine and of --simplify; 0 to "
+                             "skip")
+    parser.add_argument("--compare", action="store", metavar="EXACT_ID",
+                        help="Report the error against the exact matrices "
+                             "saved for EXACT_ID")
+    parser.add_argument("--checkpoint-every", action="store", type=float,
+                        metavar="SECONDS",
+                        help="Save the finished rows of the exact engine this "
+                             "often")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip the rows saved by an interrupted run; "
+                             "implies --checkpoint-every "
+                             f"{DEFAULT_CHECKPOINT_SECONDS:g}")
+    parser.add_argument("--profile", action="store", metavar="PREFIX",
+                        help="Save a profile and stage metrics at PREFIX")
     args = parser.parse_args()
+    if args.engine != "centroid" and not args.voronoi_path:
+        parser.error(f"the {args.engine} engine requires voronoi_path")
+    if args.engine == "centroid" and not args.towers:
+        parser.error("the centroid engine requires --towers")
+    if args.engine == "centroid" and args.simplify:
+        parser.error("--simplify cannot be used with the centroid engine")
+    if args.engine == "centroid" and args.canonicalize:
+        parser.error("--canonicalize cannot be used with the centroid engine, "
+                     "which needs the Voronoi cells to find identical towers")
+
+    # The engines use shapely, so we import them after parsing the arguments
+    # to keep --help fast
+    # pylint: disable=import-outside-toplevel
+    from lib.centroid import make_centroid_operators, compare_operators
+    from lib.raster import make_raster_operators, estimate_raster_error
+    from lib.make_matrix import (
+        make_tower_to_admin_matrix,
+        make_admin_to_tower_matrix,
+    )
+
+    policy = FLOAT32_POLICY if args.float32 else FLOAT64_POLICY
+    metrics = Metrics()
+
+    with profiled(f"{args.profile}.prof" if args.profile else None):
+        if args.shapefile_path_prefix:
+            with metrics.stage("Converting Shapefiles to GeoJSON"):
+                convert_shape_to_json(args.shapefile_path_prefix,
+                                      args.country_id)
+        else:
+            print("Assuming GeoJSON file already exists.")
+
+        remap = None
+        tower_admin_checkpoint = admin_tower_checkpoint = None
+        if args.engine == "centroid":
+            with metrics.stage("Loading admin cells and towers"):
+                admin_cells = load_admin_cells(args.country_id)
+                towers = load_towers(args.towers)
+            with metrics.stage("Assigning towers to admins"):
+                tower_admin_mat, admin_tower_mat = make_centroid_operators(
+                    towers, admin_cells)
+                tower_admin_mat = tower_admin_mat.toarray() \
+                    .astype(policy.operator_dtype)
+                admin_tower_mat = admin_tower_mat.toarray() \
+                    .astype(policy.operator_dtype)
+        elif args.engine == "raster":
+            tower_cells, admin_cells, remap = load_cells(args, metrics)
+            with metrics.stage("Rasterizing cells"):
+                tower_admin_mat, admin_tower_mat = make_raster_operators(
+                    tower_cells, admin_cells, args.resolution,
+                    policy.operator_dtype)
+            if args.error_samples:
+                with metrics.stage("Estimating error from exact rows"):
+                    errors = estimate_raster_error(
+                        tower_cells, admin_cells, tower_admin_mat,
+                        admin_tower_mat, args.error_samples)
+                for name, error in errors.items():
+                    print(f"Estimated {name} error: {format_errors(error)}")
+        else:
+            tower_cells, admin_cells, remap = load_cells(args, metrics)
+            if args.checkpoint_every is not None or args.resume:
+                with metrics.stage("Fingerprinting cells"):
+                    fingerprint = fingerprint_cells(
+                        tower_cells, admin_cells,
+                        extra=str(policy.operator_dtype))
+                every = args.checkpoint_every \
+                    if args.checkpoint_every is not None \
+                    else DEFAULT_CHECKPOINT_SECONDS
+                tower_admin_checkpoint = RowCheckpoint(
+                    TOWER_ADMIN_CHECKPOINT_TEMPLATE % args.country_id,
+                    fingerprint, every, args.resume)
+                admin_tower_checkpoint = RowCheckpoint(
+                    ADMIN_TOWER_CHECKPOINT_TEMPLATE % args.country_id,
+                    fingerprint, every, args.resume)
+            with metrics.stage("Generating tower-to-admin matrix"):
+                tower_admin_mat = make_tower_to_admin_matrix(
+                    tower_cells, admin_cells, policy.operator_dtype, metrics,
+                    ProgressReporter(len(admin_cells), "Admins"),
+                    tower_admin_checkpoint)
+            with metrics.stage("Generating admin-to-tower matrix"):
+                admin_tower_mat = make_admin_to_tower_matrix(
+                    admin_cells, tower_cells, policy.operator_dtype, metrics,
+                    ProgressReporter(len(tower_cells), "Towers"),
+                    admin_tower_checkpoint)
+
+        if args.compare:
+            with metrics.stage(f"Comparing to the matrices of {args.compare}"):
+                for name, mat, load in [
+                        ("Tower-to-admin", tower_admin_mat, load_tower_admin),
+                        ("Admin-to-tower", admin_tower_mat, load_admin_tower)]:
+                    errors = compare_operators(mat, load(args.compare))
+                    print(f"{name} error: {format_errors(errors)}")
+
+        with metrics.stage("Saving matrices"):
+            save_tower_admin(args.country_id, tower_admin_mat)
+            save_admin_tower(args.country_id, admin_tower_mat)
+            save_tower_remap(args.country_id, remap)
+        if tower_admin_checkpoint is not None:
+            tower_admin_checkpoint.remove()
+            admin_tower_checkpoint.remove()
 
-    if args.shapefile_path_prefix:
-        print("Converting Shapefiles to GeoJSON")
-        convert_shape_to_json(args.shapefile_path_prefix, args.country_id)
-    else:
-        print("Assuming GeoJSON file already exists.")
-    print("Loading admin and Voronoi cells")
-    tower_cells = load_voronoi_cells(args.voronoi_path)
-    admin_cells = load_admin_cells(args.country_id)
-
-    print("Generating tower-to-admin matrix")
-    tower_admin_mat = make_tower_to_admin_matrix(tower_cells, admin_cells)
-    print("Generating admin-to-tower matrix")
-    admin_tower_mat = make_admin_to_tower_matrix(admin_cells, tower_cells)
-
-    print("Saving matrices")
-    save_tower_admin(args.country_id, tower_admin_mat)
-    save_admin_tower(args.country_id, admin_tower_mat)
+    if args.profile:
+        metrics.save(f"{args.profile}.json")
 
 
 if __name__ == "__main__":
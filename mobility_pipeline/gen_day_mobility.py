@@ -1,29 +1,95 @@
 #!/usr/bin/env python3
 
-"""Generate admin-to-admin mobility matrix for a single day"""
+"""Generate admin-to-admin mobility matrices for one or more days"""
 
 from argparse import ArgumentParser
-from os import path
+from os import path, remove
+from tempfile import TemporaryDirectory
 
 from data_interface import (
     load_mobility,
+    load_mobility_rows,
     load_admin_tower,
     load_tower_admin,
+    load_tower_remap,
     save_admin_admin,
+    save_admin_admin_subset,
+    create_tower_tower_memmap,
+    ADMIN_ADMIN_TEMPLATES,
+    save_baseline_scores,
+    BASELINE_TEMPLATE,
+    CUBE_TEMPLATE,
     DATA_PATH,
 )
-from lib.make_matrix import (
-    make_tower_tower_matrix,
-    make_admin_admin_matrix,
-)
+from lib.baseline import Baseline
+from lib.cube import MobilityCube, parse_day
+from lib.pipeline import run_pipeline
+from lib.precision import FLOAT32_POLICY, FLOAT64_POLICY, round_counts
+from lib.instrument import Metrics, profiled
+
+
+DESCRIPTION = f"""Compute the admin-to-admin matrix for one or more days' data
+
+Meant to be run once for each day you want mobility data for, or once for a
+batch of days by adding more days with --day. When processing several days,
+the next day's mobility data is loaded and the previous day's matrix is saved
+while the current day's matrix is computed.
+
+If the tower-to-tower matrix does not fit in memory, use --memory-budget. The
+tower-to-tower matrix will then be stored on disk in --scratch-dir and
+multiplied in blocks small enough to fit within the budget. The
+tower-to-admin and admin-to-tower matrices are also copied to --scratch-dir
+and read one block at a time, so none of the tower-sized matrices are held
+in memory whole.
+
+With --float32, matrices are loaded and multiplied in single precision, which
+halves memory use. See mobility_pipeline.lib.precision for the error bounds.
+
+Use --format to save a compact edge list (edges), compressed sparse matrix
+(npz), or table of the largest destinations for each origin (top_k) instead
+of the dense CSV. --threshold drops flows below the given size from the edges
+and npz formats.
+
+To compute only the flows between some admins, list the indices of the origin
+admins with --origins and of the destination admins with --destinations (if
+either is omitted, all admins are used). Only the mobility data between the
+towers that touch those admins is read, and the flows are saved as an edge
+list of at least --threshold with the full matrix's admin indices at
+DATA_PATH/[country_id]-[day_id]-admin-to-admin-subset.csv. --memory-budget
+and --format are ignored.
 
+With --cube, each day's matrix is also appended to the time series at
+DATA_PATH/[country_id]-cube, whose running sums let query_cube.py sum any
+range of days, week, or month by reading two matrices. The day_ids must then
+be dates like 20150201 or 2015-02-01, given in chronological order and after
+the last day already in the cube. --cube cannot be used with --origins or
+--destinations.
 
-DESCRIPTION = f"""Compute the admin-to-admin matrix for one day's data
+With --baseline, each day's matrix is compared to running statistics of the
+flows of earlier days kept at DATA_PATH/[country_id]-baseline.npz, and the
+z-score and percent change of every flow from the baseline mean are saved as
+DATA_PATH/[country_id]-[day_id]-admin-to-admin-zscore.csv and
+DATA_PATH/[country_id]-[day_id]-admin-to-admin-change.csv. Each day is then
+added to the baseline, unless it is after --baseline-until, so that the days
+being monitored do not shift the baseline. With --weekday, each day is
+compared only to baseline days on the same day of the week. As with --cube,
+the day_ids must be dates, and the days added to the baseline must be in
+chronological order after the last day already in it. --baseline cannot be
+used with --origins or --destinations.
 
-Meant to be run once for each day you want mobility data for.
+If gen_country_matrices.py was run with --canonicalize, the mobility data is
+merged onto the representative towers using
+DATA_PATH/[identifier]-tower-remap.csv.
+
+With --profile PREFIX, cProfile statistics for the computation, covering the
+reading and writing threads as well, are written to PREFIX.prof and the time
+and memory of each stage to PREFIX.json. Memory is measured for the whole
+process, and since days are read and written while others are computed, the
+change in memory is only recorded for stages that did not overlap another.
 
 Produces the admin-to-admin mobility matrix as
-DATA_PATH/[country_id]-[day_id]-admin-to-admin.csv. where
+DATA_PATH/[country_id]-[day_id]-admin-to-admin.csv, or a similarly named file
+for the other formats, where
 DATA_PATH = '{path.abspath(DATA_PATH)}'.
 
 The following files must be present under the directory at DATA_PATH:
@@ -32,6 +98,64 @@ The following files must be present under the directory at DATA_PATH:
 * [identifier]-admin-to-tower.csv: Admin-to-tower matrix"""
 
 
+def check_order(parser, days, dates, last, store):
+    """Exit with an error unless days are in order after the last day
+
+    Args:
+        parser: Parser to report the error with
+        days: ``(day_id, mobility_path)`` of each day
+        dates: Date of each day
+        last: Date of the last day already in the store, or ``None``
+        store: Name of the store, for the error message
+
+    Returns:
+        None
+    """
+    for day, (day_id, _) in zip(dates, days):
+        if last is not None and day <= last:
+            parser.error(f"day {day_id} is not after {last}, the last day in "
+                         f"the {store}")
+        last = day
+
+
+def adds_to_baseline(day, baseline_until):
+    """Check whether a day is in the baseline period
+
+    Args:
+        day: Date of the day
+        baseline_until: Last date of the baseline period, or ``None`` if it
+            has no end
+
+    Returns:
+        Whether to add the day to the baseline
+    """
+    return baseline_until is None or day <= baseline_until
+
+
+def score_day(baseline, baseline_until, country_id, day_id, admin_admin_mat):
+    """Save a day's scores against the baseline, then add it to the baseline
+
+    Args:
+        baseline: The country's :py:class:`lib.baseline.Baseline`
+        baseline_until: Last date to add to the baseline, or ``None``
+        country_id: Country identifier
+        day_id: Day identifier, which must be a date
+        admin_admin_mat: The day's admin-to-admin matrix
+
+    Returns:
+        None
+    """
+    day = parse_day(day_id)
+    scores = baseline.score(day, admin_admin_mat)
+    zscore_path, change_path = save_baseline_scores(
+        country_id, day_id, scores.zscore, scores.change)
+    print(f"Scores against {scores.n_days} baseline days saved as "
+          f"{zscore_path} and {change_path}")
+    if adds_to_baseline(day, baseline_until):
+        baseline.update(day, admin_admin_mat)
+        baseline.save()
+
+
 def main():
     """Called when script run"""
     parser = ArgumentParser(
@@ -44,23 +168,200 @@ def main():
                         help="Uniquely identifies the day to process data for")
     parser.add_argument("mobility_path", action="store",
                         help="Path to the mobility data to use")
+    parser.add_argument("--day", action="append", nargs=2, default=[],
+                        metavar=("DAY_ID", "MOBILITY_PATH"),
+                        help="Another day to process; may be repeated")
+    parser.add_argument("--queue-size", action="store", type=int, default=1,
+                        help="Maximum days waiting between loading, "
+                             "computing, and saving")
+    parser.add_argument("--memory-budget", action="store", type=float,
+                        help="Compute out-of-core within this many megabytes")
+    parser.add_argument("--scratch-dir", action="store", default=DATA_PATH,
+                        help="Directory for the out-of-core matrices")
+    parser.add_argument("--float32", action="store_true",
+                        help="Compute in single instead of double precision")
+    parser.add_argument("--round", action="store_true",
+                        help="Round the saved admin-to-admin matrix to "
+                             "integers; --cube and --baseline still get the "
+                             "unrounded matrix")
+    parser.add_argument("--format", action="store", default="csv",
+                        choices=sorted(ADMIN_ADMIN_TEMPLATES),
+                        help="Format to save the admin-to-admin matrix in")
+    parser.add_argument("--threshold", action="store", type=float, default=0,
+                        help="Minimum flow to save in the edges and npz "
+                             "formats")
+    parser.add_argument("--top-k", action="store", type=int, default=10,
+                        help="Destinations per origin in the top_k format")
+    parser.add_argument("--origins", action="store", type=int, nargs="+",
+                        metavar="ADMIN", help="Indices of the origin admins")
+    parser.add_argument("--destinations", action="store", type=int,
+                        nargs="+", metavar="ADMIN",
+                        help="Indices of the destination admins")
+    parser.add_argument("--cube", action="store_true",
+                        help="Also append each day to the country's cube")
+    parser.add_argument("--baseline", action="store_true",
+                        help="Score each day against the country's baseline")
+    parser.add_argument("--baseline-until", action="store", metavar="DAY_ID",
+                        help="Last day to add to the baseline")
+    parser.add_argument("--weekday", action="store_true",
+                        help="Keep the baseline by day of week")
+    parser.add_argument("--profile", action="store", metavar="PREFIX",
+                        help="Save a profile and stage metrics at PREFIX")
     args = parser.parse_args()
 
-    print("Loading Mobility Data")
-    mobility_df = load_mobility(args.mobility_path)
+    # These use pandas, scipy, and shapely, so we import them after parsing
+    # the arguments to keep --help fast
+    # pylint: disable=import-outside-toplevel
+    from lib.make_matrix import (
+        make_tower_tower_matrix,
+        make_admin_admin_matrix,
+        fill_tower_tower_matrix,
+        make_admin_admin_blocked,
+    )
+    from lib.canonical import remap_mobility
+    from lib.subset import (
+        make_subset,
+        tower_mask,
+        make_admin_admin_subset,
+        subset_to_edges,
+    )
+
+    days = [(args.day_id, args.mobility_path)] + \
+        [(day_id, mobility_path) for day_id, mobility_path in args.day]
+    if (args.cube or args.baseline) and (args.origins or args.destinations):
+        parser.error("--cube and --baseline cannot be used with --origins or "
+                     "--destinations")
+    cube = None
+    baseline = None
+    baseline_until = None
+    if args.cube or args.baseline:
+        try:
+            dates = [parse_day(day_id) for day_id, _ in days]
+            if args.baseline_until:
+                baseline_until = parse_day(args.baseline_until)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.cube:
+        cube = MobilityCube(CUBE_TEMPLATE % args.country_id)
+        check_order(parser, days, dates,
+                    cube.dates[-1] if len(cube) else None, "cube")
+    if args.baseline:
+        try:
+            baseline = Baseline(BASELINE_TEMPLATE % args.country_id,
+                                args.weekday)
+        except ValueError as e:
+            parser.error(str(e))
+        check_order(parser, [day for day, date in zip(days, dates)
+                             if adds_to_baseline(date, baseline_until)],
+                    [date for date in dates
+                     if adds_to_baseline(date, baseline_until)],
+                    baseline.last_day, "baseline")
+
+    policy = FLOAT32_POLICY if args.float32 else FLOAT64_POLICY
+    policy = policy._replace(round_output=args.round)
+    metrics = Metrics()
+
+    # With a memory budget, the operators are memory-mapped from scratch files
+    scratch = TemporaryDirectory(dir=args.scratch_dir) \
+        if args.memory_budget else None
+    with metrics.stage("Loading Tower-to-Admin and Admin-to-Tower Matrices"):
+        tower_admin_mat = load_tower_admin(
+            args.country_id, policy.operator_dtype,
+            path.join(scratch.name, "tower-to-admin.npy") if scratch else None)
+        admin_tower_mat = load_admin_tower(
+            args.country_id, policy.operator_dtype,
+            path.join(scratch.name, "admin-to-tower.npy") if scratch else None)
+        remap = load_tower_remap(args.country_id)
+
+    subset = None
+    if args.origins or args.destinations:
+        n_admins = len(tower_admin_mat)
+        for option, admins in [("--origins", args.origins),
+                                ("--destinations", args.destinations)]:
+            invalid = [i for i in admins or [] if not 0 <= i < n_admins]
+            if invalid:
+                parser.error(f"{option} {invalid} out of range; "
+                             f"{args.country_id} has admins 0 to "
+                             f"{n_admins - 1}")
+        subset = make_subset(tower_admin_mat, admin_tower_mat, args.origins,
+                             args.destinations)
+        n_towers = len(admin_tower_mat)
+        origin_mask = tower_mask(subset.origin_towers, n_towers, remap)
+        destination_mask = tower_mask(subset.destination_towers, n_towers,
+                                      remap)
+        print(f"Using {len(subset.origin_towers)} origin and "
+              f"{len(subset.destination_towers)} destination towers")
+
+    def read(day):
+        day_id, mobility_path = day
+        with metrics.stage(f"Loading Mobility Data for {day_id}"):
+            if subset is not None:
+                return load_mobility_rows(mobility_path, origin_mask,
+                                          destination_mask)
+            return load_mobility(mobility_path)
+
+    def compute(day, mobility_df):
+        with metrics.stage(f"Computing Admin-to-Admin Matrix for {day[0]}"):
+            if subset is not None:
+                if remap is not None:
+                    mobility_df = remap_mobility(mobility_df, remap)
+                return make_admin_admin_subset(mobility_df, subset)
+            if args.memory_budget:
+                return compute_blocked(day, mobility_df)
+            tower_tower_mat = make_tower_tower_matrix(mobility_df,
+                                                      len(admin_tower_mat),
+                                                      policy.operator_dtype,
+                                                      remap)
+            return make_admin_admin_matrix(tower_tower_mat, tower_admin_mat,
+                                           admin_tower_mat)
 
-    print("Loading Tower-to-Admin and Admin-to-Tower Matrices")
-    tower_admin_mat = load_tower_admin(args.country_id)
-    admin_tower_mat = load_admin_tower(args.country_id)
+    def compute_blocked(day, mobility_df):
+        n_towers = len(admin_tower_mat)
+        mat_path = path.join(scratch.name, f"{day[0]}-tower-to-tower.npy")
+        tower_tower_mat = create_tower_tower_memmap(n_towers, mat_path,
+                                                    policy.operator_dtype)
+        if remap is not None:
+            mobility_df = remap_mobility(mobility_df, remap)
+        fill_tower_tower_matrix(mobility_df, tower_tower_mat)
+        admin_admin_mat = make_admin_admin_blocked(
+            tower_tower_mat, tower_admin_mat, admin_tower_mat,
+            int(args.memory_budget * 2 ** 20))
+        del tower_tower_mat
+        remove(mat_path)
+        return admin_admin_mat
 
-    print("Computing Admin-to-Admin Matrix")
-    tower_tower_mat = make_tower_tower_matrix(mobility_df, len(admin_tower_mat))
+    def write(day, admin_admin_mat):
+        with metrics.stage(f"Saving Admin-to-Admin Matrix for {day[0]}"):
+            # Only the saved matrix is rounded, so the cube and baseline
+            # do not accumulate rounding errors
+            output_mat = round_counts(admin_admin_mat) \
+                if policy.round_output else admin_admin_mat
+            if subset is not None:
+                mat_path = save_admin_admin_subset(
+                    args.country_id, day[0],
+                    subset_to_edges(output_mat, subset, args.threshold))
+                print(f"Admin-to-Admin Flows saved as {mat_path}")
+                return mat_path
+            mat_path = save_admin_admin(args.country_id, day[0], output_mat,
+                                        args.format, args.threshold,
+                                        args.top_k)
+            if cube is not None:
+                cube.append(parse_day(day[0]), admin_admin_mat)
+            if baseline is not None:
+                score_day(baseline, baseline_until, args.country_id, day[0],
+                          admin_admin_mat)
+        print(f"Admin-to-Admin Matrix saved as {mat_path}")
+        return mat_path
 
-    admin_admin_mat = make_admin_admin_matrix(tower_tower_mat, tower_admin_mat,
-                                              admin_tower_mat)
-    print("Saving admin-to-admin matrix")
-    mat_path = save_admin_admin(args.country_id, args.day_id, admin_admin_mat)
-    print(f"Admin-to-Admin Matrix saved as {mat_path}")
+    try:
+        with profiled(f"{args.profile}.prof" if args.profile else None):
+            run_pipeline(days, read, compute, write,
+                         queue_size=args.queue_size)
+    finally:
+        if scratch is not None:
+            scratch.cleanup()
+    if args.profile:
+        metrics.save(f"{args.profile}.json")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+"""Derive the matrices of a coarser admin level from a finer one"""
+
+from argparse import ArgumentParser
+from os import path
+
+from data_interface import (
+    load_admin_cells,
+    load_admin_properties,
+    load_tower_admin,
+    load_admin_tower,
+    load_tower_remap,
+    load_admin_admin,
+    save_tower_admin,
+    save_admin_tower,
+    save_tower_remap,
+    save_admin_admin,
+    save_admin_keys,
+    DATA_PATH,
+)
+
+
+DESCRIPTION = f"""Derive the matrices of a coarser admin level from a finer one
+
+Groups the admins of fine_country_id by the shapefile attribute given with
+--field (for GADM level 2 shapefiles, GID_1 gives level 1 and GID_0 the whole
+country). Without --field, all admins are grouped into one. The
+tower-to-admin and admin-to-tower matrices of the groups are derived from the
+fine admins' matrices and saved under coarse_country_id, along with
+DATA_PATH/[coarse_country_id]-admin-keys.csv, which lists the attribute value
+of each coarse admin in matrix order. Here, DATA_PATH =
+'{path.abspath(DATA_PATH)}'.
+
+For each --day, the coarse admin-to-admin matrix is derived from the fine
+admin-to-admin matrix, which must be saved in the CSV format. You can also run
+gen_day_mobility.py with coarse_country_id to compute coarse matrices for new
+days.
+
+The derived matrices equal those gen_country_matrices.py would compute from
+a shapefile of the coarse admins, but no polygon intersections are needed."""
+
+
+def main():
+    """Called when script run"""
+    parser = ArgumentParser(
+        description=DESCRIPTION,
+        epilog="""https://github.com/codethechange/mobility_pipeline""",
+    )
+    parser.add_argument("fine_country_id", action="store",
+                        help="Identifies the fine admin level in DATA_PATH")
+    parser.add_argument("coarse_country_id", action="store",
+                        help="Identifier to save the coarse admin level as")
+    parser.add_argument("--field", action="store",
+                        help="Shapefile attribute naming each admin's parent")
+    parser.add_argument("--day", action="append", default=[],
+                        metavar="DAY_ID",
+                        help="Day whose admin-to-admin matrix to coarsen; "
+                             "may be repeated")
+    args = parser.parse_args()
+
+    # lib.hierarchy uses scipy, so we import it after parsing the arguments
+    # to keep --help fast
+    # pylint: disable=import-outside-toplevel
+    from lib.hierarchy import (
+        membership_matrix,
+        coarsen_tower_admin,
+        coarsen_admin_tower,
+        coarsen_admin_admin,
+    )
+
+    print("Loading admin cells and attributes")
+    admin_areas = [cell.area for cell in
+                   load_admin_cells(args.fine_country_id)]
+    if args.field:
+        keys = [properties[args.field] for properties in
+                load_admin_properties(args.fine_country_id)]
+    else:
+        keys = [args.coarse_country_id] * len(admin_areas)
+    membership, parents = membership_matrix(keys)
+    print(f"Grouped {len(admin_areas)} admins into {len(parents)}")
+
+    print("Coarsening Tower-to-Admin and Admin-to-Tower Matrices")
+    save_tower_admin(args.coarse_country_id, coarsen_tower_admin(
+        load_tower_admin(args.fine_country_id), membership, admin_areas))
+    save_admin_tower(args.coarse_country_id, coarsen_admin_tower(
+        load_admin_tower(args.fine_country_id), membership))
+    save_tower_remap(args.coarse_country_id,
+                     load_tower_remap(args.fine_country_id))
+    save_admin_keys(args.coarse_country_id, parents)
+
+    for day_id in args.day:
+        admin_admin_mat = load_admin_admin(args.fine_country_id, day_id, 'csv')
+        mat_path = save_admin_admin(args.coarse_country_id, day_id,
+                                    coarsen_admin_admin(admin_admin_mat,
+                                                        membership,
+                                                        admin_areas))
+        print(f"Admin-to-Admin Matrix saved as {mat_path}")
+
+
+if __name__ == "__main__":
+    main()
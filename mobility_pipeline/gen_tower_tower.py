@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+"""Aggregate raw connection events into tower-to-tower mobility counts"""
+
+from argparse import ArgumentParser
+
+from data_interface import (
+    load_events,
+    save_mobility,
+    EVENTS_CHUNKSIZE,
+)
+
+
+DESCRIPTION = """Aggregate one day of raw connection events into mobility data
+
+The events file must be a CSV with columns DEVICE, TIMESTAMP, and TOWER. Each
+device is counted once, from the tower of its first event in the morning
+window to the tower of its last event in the evening window. The events are
+read in chunks, so memory use depends on the number of devices rather than the
+number of events.
+
+The --morning and --evening hours are in UTC, since that is what timestamps
+in seconds since the epoch count. Give the country's --utc-offset to use its
+local time instead, e.g. --utc-offset -3 for Brasilia. TIMESTAMP strings
+without a UTC offset are taken to be in UTC.
+
+Produces a mobility CSV with columns DATE, ORIGIN, DESTINATION, and COUNT that
+can be passed to gen_day_mobility.py."""
+
+
+def hours_to_window(hours):
+    """Convert a ``[start, end]`` pair of hours to a window in seconds
+
+    Args:
+        hours: Start and end of the window in hours since midnight, or ``None``
+
+    Returns:
+        The window as ``(start, end)`` seconds since midnight, or ``None`` if
+        ``hours`` is ``None``.
+    """
+    if hours is None:
+        return None
+    start, end = hours
+    return int(start * 3600), int(end * 3600)
+
+
+def main():
+    """Called when script run"""
+    parser = ArgumentParser(
+        description=DESCRIPTION,
+        epilog="""https://github.com/codethechange/mobility_pipeline""",
+    )
+    parser.add_argument("events_path", action="store",
+                        help="Path to the raw connection events")
+    parser.add_argument("day_id", action="store",
+                        help="Value to write to the DATE column")
+    parser.add_argument("mobility_path", action="store",
+                        help="Path to save the mobility data to")
+    parser.add_argument("--morning", action="store", nargs=2, type=float,
+                        metavar=("START", "END"),
+                        help="Hours of the day, in UTC plus --utc-offset, "
+                             "from which origins are taken (default: whole "
+                             "day)")
+    parser.add_argument("--evening", action="store", nargs=2, type=float,
+                        metavar=("START", "END"),
+                        help="Hours of the day, in UTC plus --utc-offset, "
+                             "from which destinations are taken (default: "
+                             "whole day)")
+    parser.add_argument("--utc-offset", action="store", type=float,
+                        default=0, metavar="HOURS",
+                        help="Hours that the local time of --morning and "
+                             "--evening is ahead of UTC (default: 0)")
+    parser.add_argument("--chunksize", action="store", type=int,
+                        default=EVENTS_CHUNKSIZE,
+                        help="Number of events to read at a time")
+    args = parser.parse_args()
+
+    # lib.aggregate uses pandas and scipy, so we import it after parsing the arguments
+    # to keep --help fast
+    # pylint: disable=import-outside-toplevel
+    from lib.aggregate import TowerTowerAggregator
+
+    aggregator = TowerTowerAggregator(morning=hours_to_window(args.morning),
+                                      evening=hours_to_window(args.evening),
+                                      utc_offset=int(args.utc_offset * 3600))
+    print("Aggregating events")
+    for chunk in load_events(args.events_path, args.chunksize):
+        aggregator.add_chunk(chunk)
+    print(f"Saw {aggregator.n_devices} devices")
+
+    print("Saving mobility data")
+    save_mobility(aggregator.to_mobility(), args.mobility_path, args.day_id)
+    print(f"Mobility data saved as {args.mobility_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+"""Generate the Voronoi tessellation of a country's towers"""
+
+from argparse import ArgumentParser
+from os import path
+
+from data_interface import (
+    load_towers,
+    load_admin_cells,
+    save_polygons_to_json,
+    DATA_PATH,
+)
+
+
+DESCRIPTION = f"""Compute the Voronoi tessellation of the towers in a country
+
+Reads the towers CSV and the admin cells at DATA_PATH/[country_id]-shape.json,
+where DATA_PATH = '{path.abspath(DATA_PATH)}', computes the Voronoi cell of
+each tower, and clips the cells to the union of the admin cells. The cells are
+saved as GeoJSON in tower order, ready for gen_country_matrices.py.
+
+Towers at the same location as an earlier tower and towers outside the
+country get empty cells."""
+
+
+def main():
+    """Called when script run"""
+    parser = ArgumentParser(
+        description=DESCRIPTION,
+        epilog="""https://github.com/codethechange/mobility_pipeline""",
+    )
+    parser.add_argument("country_id", action="store",
+                        help="Uniquely identifies country data in DATA_PATH")
+    parser.add_argument("towers_path", action="store",
+                        help="Path to the towers CSV")
+    parser.add_argument("voronoi_path", action="store",
+                        help="Path to save the Voronoi tessellation to")
+    args = parser.parse_args()
+
+    # lib.tessellate uses scipy and shapely, so we import it after parsing the
+    # arguments to keep --help fast
+    # pylint: disable=import-outside-toplevel
+    from lib.tessellate import tessellate
+
+    print("Loading towers and admin cells")
+    towers = load_towers(args.towers_path)
+    admin_cells = load_admin_cells(args.country_id)
+    print("Computing Voronoi tessellation")
+    cells = tessellate(towers, admin_cells)
+    save_polygons_to_json(cells, args.voronoi_path)
+    print(f"Voronoi tessellation saved as {args.voronoi_path}")
+
+
+if __name__ == "__main__":
+    main()
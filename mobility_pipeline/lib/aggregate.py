@@ -0,0 +1,233 @@
+"""Streaming aggregation of raw connection events into tower-tower counts
+
+The tower-tower matrix (see :py:mod:`mobility_pipeline.lib.make_matrix`)
+counts the cell phones that connect to tower ``i`` in the morning and tower
+``j`` in the evening. Carriers may instead give us the raw per-device
+connection events, which for a country can be hundreds of millions of rows per
+day. This module reduces those events to the ``(ORIGIN, DESTINATION, COUNT)``
+mobility format one chunk at a time.
+
+Only a compact state is kept for each device: the time and tower of its first
+event in the morning window and of its last event in the evening window. The
+state lives in a hash table from device identifier to a slot in a set of
+integer arrays, so memory is bounded by the number of devices, not the number
+of events.
+
+Timestamps are seconds since the epoch, which is in UTC, so the morning and
+evening windows are in UTC unless the aggregator is given the UTC offset of
+the country's local time.
+"""
+
+from typing import Dict, Hashable, Optional, Tuple
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+from scipy import sparse  # type: ignore
+
+
+SECONDS_PER_DAY = 24 * 60 * 60
+"""Number of seconds in a day, used to find an event's time of day"""
+
+_NO_TOWER = -1
+_MAX_TIME = np.iinfo(np.int64).max
+_MIN_TIME = np.iinfo(np.int64).min
+
+
+def _in_window(timestamps: np.ndarray, window: Optional[Tuple[int, int]],
+               utc_offset: int = 0) -> np.ndarray:
+    """Find which timestamps fall within a window of the day
+
+    Args:
+        timestamps: Event times in seconds since the epoch
+        window: ``(start, end)`` in seconds since midnight local time. The
+            start is inclusive and the end exclusive. If ``None``, every
+            timestamp is in the window.
+        utc_offset: Seconds that local time is ahead of UTC
+
+    Returns:
+        A boolean mask that is ``True`` for timestamps within the window
+    """
+    if window is None:
+        return np.ones(len(timestamps), dtype=bool)
+    start, end = window
+    time_of_day = (timestamps + utc_offset) % SECONDS_PER_DAY
+    return (time_of_day >= start) & (time_of_day < end)
+
+
+class TowerTowerAggregator:
+    # pylint: disable=too-many-instance-attributes
+    """Accumulates per-device first and last towers from event chunks
+
+    Feed chunks of events to :py:meth:`add_events` or :py:meth:`add_chunk` in
+    any order, then call :py:meth:`to_mobility` or
+    :py:meth:`to_sparse_matrix`. A device contributes one count from the
+    tower of its earliest morning event to the tower of its latest evening
+    event. Devices seen in only one of the two windows are not counted.
+
+    Args:
+        morning: Window ``(start, end)``, in seconds since midnight, from which
+            each device's origin tower is taken. ``None`` means the whole day.
+        evening: Window ``(start, end)``, in seconds since midnight, from which
+            each device's destination tower is taken. ``None`` means the whole
+            day.
+        initial_capacity: Number of device slots to allocate at first. The
+            state arrays double in size whenever they fill up.
+        utc_offset: Seconds that the local time the windows are in is ahead
+            of UTC, e.g. ``-3 * 3600`` for Brasilia. The default of ``0``
+            puts the windows in UTC.
+    """
+
+    def __init__(self, morning: Optional[Tuple[int, int]] = None,
+                 evening: Optional[Tuple[int, int]] = None,
+                 initial_capacity: int = 1024, utc_offset: int = 0) -> None:
+        self.morning = morning
+        self.evening = evening
+        self.utc_offset = utc_offset
+        self._slots: Dict[Hashable, int] = {}
+        self._first_time = np.full(initial_capacity, _MAX_TIME, dtype=np.int64)
+        self._first_tower = np.full(initial_capacity, _NO_TOWER,
+                                    dtype=np.int32)
+        self._last_time = np.full(initial_capacity, _MIN_TIME, dtype=np.int64)
+        self._last_tower = np.full(initial_capacity, _NO_TOWER, dtype=np.int32)
+
+    @property
+    def n_devices(self) -> int:
+        """Number of distinct devices seen so far"""
+        return len(self._slots)
+
+    def _grow(self, n_slots: int) -> None:
+        """Enlarge the state arrays so they can hold ``n_slots`` devices"""
+        capacity = len(self._first_time)
+        if n_slots <= capacity:
+            return
+        while capacity < n_slots:
+            capacity *= 2
+        extra = capacity - len(self._first_time)
+        self._first_time = np.append(
+            self._first_time, np.full(extra, _MAX_TIME, dtype=np.int64))
+        self._first_tower = np.append(
+            self._first_tower, np.full(extra, _NO_TOWER, dtype=np.int32))
+        self._last_time = np.append(
+            self._last_time, np.full(extra, _MIN_TIME, dtype=np.int64))
+        self._last_tower = np.append(
+            self._last_tower, np.full(extra, _NO_TOWER, dtype=np.int32))
+
+    def _lookup_slots(self, devices: np.ndarray) -> np.ndarray:
+        """Map device identifiers to state slots, creating any new slots
+
+        Args:
+            devices: Device identifier of each event
+
+        Returns:
+            The slot of each event's device
+        """
+        unique, inverse = np.unique(devices, return_inverse=True)
+        unique_slots = np.empty(len(unique), dtype=np.int64)
+        for k, device in enumerate(unique.tolist()):
+            slot = self._slots.get(device)
+            if slot is None:
+                slot = len(self._slots)
+                self._slots[device] = slot
+            unique_slots[k] = slot
+        self._grow(len(self._slots))
+        return unique_slots[inverse]
+
+    def add_events(self, devices: np.ndarray, timestamps: np.ndarray,
+                   towers: np.ndarray) -> None:
+        """Update the per-device state with a chunk of events
+
+        Args:
+            devices: Device identifier of each event
+            timestamps: Time of each event, in integer seconds since the epoch
+            towers: Index of the tower each event connected to
+
+        Returns:
+            None
+        """
+        devices = np.asarray(devices)
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        towers = np.asarray(towers, dtype=np.int32)
+        if len(devices) == 0:
+            return
+        slots = self._lookup_slots(devices)
+
+        # Sort by slot, then time, so each slot's events are contiguous and
+        # its earliest event comes first and its latest event comes last.
+        order = np.lexsort((timestamps, slots))
+        slots = slots[order]
+        timestamps = timestamps[order]
+        towers = towers[order]
+
+        morning = _in_window(timestamps, self.morning, self.utc_offset)
+        m_slots = slots[morning]
+        if len(m_slots):
+            is_first = np.r_[True, m_slots[1:] != m_slots[:-1]]
+            m_slots = m_slots[is_first]
+            m_times = timestamps[morning][is_first]
+            m_towers = towers[morning][is_first]
+            earlier = m_times < self._first_time[m_slots]
+            self._first_time[m_slots[earlier]] = m_times[earlier]
+            self._first_tower[m_slots[earlier]] = m_towers[earlier]
+
+        evening = _in_window(timestamps, self.evening, self.utc_offset)
+        e_slots = slots[evening]
+        if len(e_slots):
+            is_last = np.r_[e_slots[1:] != e_slots[:-1], True]
+            e_slots = e_slots[is_last]
+            e_times = timestamps[evening][is_last]
+            e_towers = towers[evening][is_last]
+            later = e_times >= self._last_time[e_slots]
+            self._last_time[e_slots[later]] = e_times[later]
+            self._last_tower[e_slots[later]] = e_towers[later]
+
+    def add_chunk(self, chunk: pd.DataFrame) -> None:
+        """Update the per-device state with a chunk of events
+
+        Args:
+            chunk: DataFrame with columns ``DEVICE``, ``TIMESTAMP``, and
+                ``TOWER`` as described for :py:meth:`add_events`.
+
+        Returns:
+            None
+        """
+        self.add_events(chunk['DEVICE'].values, chunk['TIMESTAMP'].values,
+                        chunk['TOWER'].values)
+
+    def _origin_destination(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the origin and destination tower of each counted device"""
+        n_slots = len(self._slots)
+        origins = self._first_tower[:n_slots]
+        destinations = self._last_tower[:n_slots]
+        counted = (origins != _NO_TOWER) & (destinations != _NO_TOWER)
+        return origins[counted], destinations[counted]
+
+    def to_mobility(self) -> pd.DataFrame:
+        """Produce the mobility counts for the events seen so far
+
+        Returns:
+            A :py:class:`pandas.DataFrame` with columns ``ORIGIN``,
+            ``DESTINATION``, and ``COUNT`` in the format returned by
+            :py:func:`data_interface.load_mobility`. Rows strictly increase in
+            ``ORIGIN``-major order, and pairs with no devices are omitted.
+        """
+        origins, destinations = self._origin_destination()
+        df = pd.DataFrame({'ORIGIN': origins, 'DESTINATION': destinations})
+        counts = df.groupby(['ORIGIN', 'DESTINATION']).size()
+        return counts.reset_index(name='COUNT')
+
+    def to_sparse_matrix(self, n_towers: int) -> sparse.csr_matrix:
+        """Produce the tower-to-tower matrix for the events seen so far
+
+        Args:
+            n_towers: Number of towers, which defines the length of each matrix
+                dimension
+
+        Returns:
+            A sparse matrix of shape ``(n_towers, n_towers)`` with the same
+            values as :py:func:`lib.make_matrix.make_tower_tower_matrix` would
+            produce from :py:meth:`to_mobility`.
+        """
+        origins, destinations = self._origin_destination()
+        ones = np.ones(len(origins), dtype=np.int64)
+        mat = sparse.coo_matrix((ones, (origins, destinations)),
+                                shape=(n_towers, n_towers))
+        return mat.tocsr()
@@ -0,0 +1,157 @@
+"""Compare each day's flows to a baseline kept as running statistics
+
+Spotting changes in mobility means comparing each day's admin-to-admin matrix
+to the flows of a baseline period. Rather than reloading the matrices of
+every day of that period, a :py:class:`Baseline` keeps, for every cell of the
+matrix, the number of days, the mean, and the sum of squared deviations from
+the mean, updated one day at a time with Welford's algorithm. Scoring a new
+day against the baseline and adding it to the baseline then each take time
+proportional to the size of one matrix, however many days the baseline has.
+
+Mobility differs between weekdays and weekends, so the statistics can be kept
+separately for each day of the week, and each day is then compared only to
+the days of the baseline on the same day of the week.
+
+The statistics are saved to a ``.npz`` state file, which is replaced
+atomically so an interrupted save leaves the previous state.
+"""
+
+from datetime import date
+import os
+from typing import NamedTuple, Optional
+import numpy as np  # type: ignore
+
+
+N_WEEKDAYS = 7
+"""Number of groups of days when the statistics are kept by day of week"""
+
+
+class Scores(NamedTuple):
+    """How a day's flows compare to the baseline
+
+    Attributes:
+        zscore: For each cell, the number of standard deviations of the
+            baseline that the day's flow is above the baseline mean. ``nan``
+            where the baseline has fewer than 2 days or no variation.
+        change: For each cell, the percent change of the day's flow from the
+            baseline mean. ``nan`` where the baseline mean is zero.
+        n_days: Number of baseline days the day was compared to
+    """
+    zscore: np.ndarray
+    change: np.ndarray
+    n_days: int
+
+
+class Baseline:
+    """Running statistics of daily admin-to-admin matrices
+
+    Args:
+        state_path: Path of the ``.npz`` state file. If it exists, the
+            statistics are loaded from it.
+        by_weekday: Whether to keep separate statistics for each day of the
+            week
+
+    Raises:
+        ValueError: If the state file was made with a different
+            ``by_weekday``
+    """
+
+    def __init__(self, state_path: str, by_weekday: bool = False) -> None:
+        self.state_path = state_path
+        self.by_weekday = by_weekday
+        self.counts = np.zeros(N_WEEKDAYS if by_weekday else 1,
+                               dtype=np.int64)
+        self.means: Optional[np.ndarray] = None
+        self.sq_devs: Optional[np.ndarray] = None
+        self.last_day: Optional[date] = None
+        if os.path.exists(state_path):
+            with np.load(state_path) as state:
+                if bool(state['by_weekday']) != by_weekday:
+                    kept = 'was' if state['by_weekday'] else 'was not'
+                    raise ValueError(f'Baseline {state_path} {kept} kept by '
+                                     f'day of week')
+                self.counts = state['counts']
+                self.means = state['means']
+                self.sq_devs = state['sq_devs']
+                self.last_day = date.fromordinal(int(state['last_day']))
+
+    def _group(self, day: date) -> int:
+        return day.weekday() if self.by_weekday else 0
+
+    def _check_shape(self, day: date, mat: np.ndarray) -> None:
+        if self.means is not None and mat.shape != self.means.shape[1:]:
+            raise ValueError(f'Matrix of {day} has shape {mat.shape}, but the '
+                             f'baseline has shape {self.means.shape[1:]}')
+
+    def score(self, day: date, mat: np.ndarray) -> Scores:
+        """Compare a day's matrix to the baseline
+
+        Args:
+            day: Date of the day
+            mat: The day's admin-to-admin matrix
+
+        Returns:
+            The day's scores. If the baseline has no days (on the same day of
+            the week, if kept by day of week), every score is ``nan``.
+
+        Raises:
+            ValueError: If the matrix has a different shape than the
+                baseline's matrices
+        """
+        self._check_shape(day, mat)
+        group = self._group(day)
+        n_days = int(self.counts[group])
+        if n_days == 0:
+            empty = np.full(mat.shape, np.nan)
+            return Scores(empty, empty.copy(), 0)
+        mean = self.means[group]
+        deviation = mat - mean
+        with np.errstate(divide='ignore', invalid='ignore'):
+            std = np.sqrt(self.sq_devs[group] / (n_days - 1)) \
+                if n_days > 1 else np.zeros(mat.shape)
+            zscore = np.where(std > 0, deviation / std, np.nan)
+            change = np.where(mean != 0, 100 * deviation / mean, np.nan)
+        return Scores(zscore, change, n_days)
+
+    def update(self, day: date, mat: np.ndarray) -> None:
+        """Add a day's matrix to the baseline
+
+        Args:
+            day: Date of the day, which must be after every day already added
+            mat: The day's admin-to-admin matrix
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If the day is not after the last day added, or the
+                matrix has a different shape than the baseline's matrices
+        """
+        self._check_shape(day, mat)
+        if self.last_day is not None and day <= self.last_day:
+            raise ValueError(f'Cannot add {day} after {self.last_day}; days '
+                             f'must be added in order')
+        if self.means is None:
+            self.means = np.zeros((len(self.counts),) + mat.shape)
+            self.sq_devs = np.zeros((len(self.counts),) + mat.shape)
+        group = self._group(day)
+        self.counts[group] += 1
+        delta = mat - self.means[group]
+        self.means[group] += delta / self.counts[group]
+        self.sq_devs[group] += delta * (mat - self.means[group])
+        self.last_day = day
+
+    def save(self) -> None:
+        """Write the statistics to the state file atomically
+
+        Returns:
+            None
+        """
+        if self.means is None:
+            return
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, by_weekday=self.by_weekday, counts=self.counts,
+                     means=self.means, sq_devs=self.sq_devs,
+                     last_day=self.last_day.toordinal())
+        os.replace(tmp_path, self.state_path)
@@ -0,0 +1,123 @@
+"""Map co-located and zero-area towers to a compact set of representatives
+
+Voronoi tessellations give towers that share a location with another tower an
+empty, zero-area cell (see :py:func:`lib.voronoi.load_cell`), and some
+tessellations give several towers the same cell. Such towers still take a row
+and a column in every tower-sized matrix, and their cells would make
+:py:func:`lib.overlap.compute_overlap` divide by zero.
+
+:py:func:`canonicalize` picks one representative tower for each distinct
+non-empty cell and builds a remap array from every original tower index to
+the index of its representative among the representatives. The tower-to-admin
+and admin-to-tower matrices are then computed from the representatives'
+cells only, and :py:func:`remap_mobility` merges the mobility of each tower
+into its representative before the tower-to-tower matrix is made.
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+from shapely.geometry import MultiPolygon  # type: ignore
+
+
+DROPPED = -1
+"""Remap value of a tower with no representative, whose mobility is dropped"""
+
+
+class Canonical(NamedTuple):
+    """Result of :py:func:`canonicalize`
+
+    Attributes:
+        remap: For each original tower index, the index of its representative
+            in ``representatives``, or :py:const:`DROPPED`
+        representatives: Original tower index of each representative, in
+            increasing order
+    """
+    remap: np.ndarray
+    representatives: np.ndarray
+
+
+def cell_key(cell: MultiPolygon) -> Tuple[tuple, ...]:
+    """Get a hashable key that is equal for cells with the same boundary
+
+    This is the key used by :py:func:`lib.make_matrix.generate_rtree`.
+
+    Args:
+        cell: The cell
+
+    Returns:
+        The exterior coordinates of each polygon in the cell
+    """
+    return tuple([tuple(p.exterior.coords) for p in cell])
+
+
+def canonicalize(cells: Sequence[MultiPolygon],
+                 towers: Optional[np.ndarray] = None) -> Canonical:
+    """Choose a representative tower for each distinct non-empty cell
+
+    Towers with identical non-empty cells share the representative with the
+    lowest index. If ``towers`` is given, each tower with an empty cell is
+    mapped to the representative of the first tower with a non-empty cell at
+    the same location, so the mobility of co-located towers is merged instead
+    of lost. All other towers with empty cells are mapped to
+    :py:const:`DROPPED`. Their columns in the tower-to-admin matrix would be
+    zero anyway, so dropping them does not change the admin-to-admin matrix.
+
+    Args:
+        cells: The Voronoi cell of each tower, in tower order
+        towers: Tower coordinates, one ``[x, y]`` row per tower, as returned by
+            :py:func:`data_interface.load_towers`
+
+    Returns:
+        The remap array and representatives
+    """
+    remap = np.full(len(cells), DROPPED, dtype=np.int32)
+    representatives: List[int] = []
+    key_to_rep: Dict[Tuple[tuple, ...], int] = {}
+    for i, cell in enumerate(cells):
+        if cell.area == 0:
+            continue
+        key = cell_key(cell)
+        if key not in key_to_rep:
+            key_to_rep[key] = len(representatives)
+            representatives.append(i)
+        remap[i] = key_to_rep[key]
+    if towers is not None:
+        location_to_rep: Dict[Tuple[float, ...], int] = {}
+        for i in np.flatnonzero(remap != DROPPED):
+            location_to_rep.setdefault(tuple(towers[i]), remap[i])
+        for i in np.flatnonzero(remap == DROPPED):
+            remap[i] = location_to_rep.get(tuple(towers[i]), DROPPED)
+    return Canonical(remap, np.array(representatives, dtype=np.int32))
+
+
+def remap_mobility(mobility: pd.DataFrame, remap: np.ndarray) -> pd.DataFrame:
+    """Express mobility data in terms of representative towers
+
+    Rows whose origin or destination is dropped or outside ``remap`` are
+    removed, and the counts of rows that map to the same pair of
+    representatives are summed.
+
+    Args:
+        mobility: DataFrame of mobility data with columns
+            ``[ORIGIN, DESTINATION, COUNT]``
+        remap: Remap array from :py:func:`canonicalize`
+
+    Returns:
+        DataFrame with columns ``[ORIGIN, DESTINATION, COUNT]``, sorted by
+        origin and destination, whose towers are representative indices.
+    """
+    origins = mobility['ORIGIN'].values
+    destinations = mobility['DESTINATION'].values
+    in_range = (origins >= 0) & (origins < len(remap)) & \
+        (destinations >= 0) & (destinations < len(remap))
+    origins = remap[origins[in_range]]
+    destinations = remap[destinations[in_range]]
+    kept = (origins != DROPPED) & (destinations != DROPPED)
+    remapped = pd.DataFrame({
+        'ORIGIN': origins[kept],
+        'DESTINATION': destinations[kept],
+        'COUNT': mobility['COUNT'].values[in_range][kept],
+    })
+    return remapped.groupby(['ORIGIN', 'DESTINATION'], as_index=False)['COUNT'] \
+        .sum()
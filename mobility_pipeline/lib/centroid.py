@@ -0,0 +1,143 @@
+"""Approximate overlap matrices from the admin containing each tower
+
+Instead of intersecting Voronoi cells with admins, each tower is assigned to
+the admin that contains the tower itself. The result is a quick-look
+approximation: each tower's whole cell is treated as lying in its admin, and
+each admin is treated as covered equally by the towers inside it.
+
+* admin-to-tower: one-hot, with a 1 at the tower's admin. Towers outside
+  every admin have all-zero rows.
+* tower-to-admin: each admin's row is ``1 / k`` at each of the ``k`` towers
+  inside it. An admin with no towers inside is assigned entirely to the tower
+  nearest its representative point, so every row still sums to 1.
+
+Both matrices are returned as :py:class:`scipy.sparse.csr_matrix`.
+:py:func:`compare_operators` measures how far they are from the exact
+matrices.
+"""
+
+from typing import Dict, List, Tuple
+import numpy as np  # type: ignore
+from scipy import sparse  # type: ignore
+from scipy.spatial import cKDTree  # type: ignore
+from shapely import vectorized  # type: ignore
+from shapely.geometry import MultiPolygon  # type: ignore
+
+
+UNASSIGNED = -1
+"""Admin index of a tower that is outside every admin"""
+
+
+def assign_towers(towers: np.ndarray,
+                  admin_cells: List[MultiPolygon]) -> np.ndarray:
+    """Find the admin containing each tower
+
+    The towers are sorted by longitude once, so the towers within each admin's
+    bounding box are found by binary search. Only those are tested against the
+    admin's shape, all at once with :py:func:`shapely.vectorized.contains`.
+
+    Args:
+        towers: Tower coordinates, one ``[x, y]`` row per tower, as returned by
+            :py:func:`data_interface.load_towers`
+        admin_cells: The admin cells
+
+    Returns:
+        The index of the admin containing each tower, or
+        :py:const:`UNASSIGNED`. A tower on a border shared by several admins
+        is assigned to the one with the lowest index.
+    """
+    order = np.argsort(towers[:, 0], kind='stable')
+    xs = towers[order, 0]
+    ys = towers[order, 1]
+    assignment = np.full(len(towers), UNASSIGNED, dtype=np.int32)
+    for i_admin, cell in enumerate(admin_cells):
+        min_x, min_y, max_x, max_y = cell.bounds
+        candidates = np.arange(np.searchsorted(xs, min_x, side='left'),
+                               np.searchsorted(xs, max_x, side='right'))
+        candidates = candidates[(ys[candidates] >= min_y)
+                                & (ys[candidates] <= max_y)]
+        candidates = candidates[
+            assignment[order[candidates]] == UNASSIGNED]
+        if len(candidates) == 0:
+            continue
+        inside = vectorized.contains(cell, xs[candidates], ys[candidates])
+        inside |= vectorized.touches(cell, xs[candidates], ys[candidates])
+        assignment[order[candidates[inside]]] = i_admin
+    return assignment
+
+
+def make_centroid_operators(towers: np.ndarray,
+                            admin_cells: List[MultiPolygon]) \
+        -> Tuple[sparse.csr_matrix, sparse.csr_matrix]:
+    """Make approximate tower-to-admin and admin-to-tower matrices
+
+    Args:
+        towers: Tower coordinates, one ``[x, y]`` row per tower
+        admin_cells: The admin cells
+
+    Returns:
+        The tower-to-admin matrix, of shape ``(n_admins, n_towers)``, and the
+        admin-to-tower matrix, of shape ``(n_towers, n_admins)``, as described
+        in the module documentation
+    """
+    n_towers, n_admins = len(towers), len(admin_cells)
+    assignment = assign_towers(towers, admin_cells)
+    assigned = np.flatnonzero(assignment != UNASSIGNED)
+    admin_tower = sparse.csr_matrix(
+        (np.ones(len(assigned)), (assigned, assignment[assigned])),
+        shape=(n_towers, n_admins))
+
+    admins = assignment[assigned]
+    towers_in_admin = np.bincount(admins, minlength=n_admins)
+    empty_admins = np.flatnonzero(towers_in_admin == 0)
+    nearest = np.zeros(0, dtype=np.int64)
+    if len(empty_admins) and n_towers:
+        points = np.array([admin_cells[i].representative_point().coords[0]
+                           for i in empty_admins])
+        _, nearest = cKDTree(towers).query(points)
+    else:
+        empty_admins = empty_admins[:0]
+    rows = np.concatenate([admins, empty_admins])
+    cols = np.concatenate([assigned, nearest])
+    values = np.concatenate([1 / towers_in_admin[admins],
+                             np.ones(len(empty_admins))])
+    tower_admin = sparse.csr_matrix((values, (rows, cols)),
+                                    shape=(n_admins, n_towers))
+    return tower_admin, admin_tower
+
+
+def compare_operators(approximate, exact: np.ndarray) -> Dict[str, float]:
+    """Measure how far an approximate overlap matrix is from the exact one
+
+    Each row of an overlap matrix distributes one cell among the other
+    cells, so errors are measured per row.
+
+    Args:
+        approximate: Approximate matrix, dense or sparse
+        exact: Exact matrix of the same shape
+
+    Returns:
+        Dictionary with keys ``max_abs_error`` (largest difference of an
+        entry), ``mean_row_l1_error`` and ``max_row_l1_error`` (mean and
+        largest sum of absolute differences in a row, between 0 and 2 for
+        rows summing to 1), and ``argmax_agreement`` (fraction of rows whose
+        largest entry is in the same column in both matrices)
+
+    Raises:
+        ValueError: If the matrices have different shapes
+    """
+    if sparse.issparse(approximate):
+        approximate = approximate.toarray()
+    if approximate.shape != exact.shape:
+        raise ValueError(f'Approximate matrix has shape {approximate.shape} '
+                         f'but exact matrix has shape {exact.shape}')
+    difference = np.abs(approximate - exact)
+    row_l1 = difference.sum(axis=1)
+    agreement = np.argmax(approximate, axis=1) == np.argmax(exact, axis=1)
+    return {
+        'max_abs_error': float(difference.max(initial=0)),
+        'mean_row_l1_error': float(row_l1.mean()) if len(row_l1) else 0.0,
+        'max_row_l1_error': float(row_l1.max(initial=0)),
+        'argmax_agreement': float(agreement.mean()) if len(agreement)
+                            else 1.0,
+    }
@@ -0,0 +1,178 @@
+"""Save the finished rows of a matrix periodically so a run can resume
+
+:py:func:`lib.make_matrix.make_a_to_b_matrix` computes its matrix one row at
+a time, which for a large country takes hours. Given a
+:py:class:`RowCheckpoint`, it saves the rows finished since its last save to
+a new segment file in a sidecar directory every so often, so each save only
+writes the new rows rather than the whole matrix. If the run is interrupted,
+the next run merges the finished rows of all the segments back into the
+matrix and only computes the rest.
+
+Each segment also holds a fingerprint of the input cells from
+:py:func:`fingerprint_cells`. Rows are only restored if every segment's
+fingerprint matches, so segments left behind by a run on different inputs are
+ignored, and deleted by that run's first save.
+"""
+
+from __future__ import annotations
+import hashlib
+import os
+import shutil
+import time
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, Sequence
+import numpy as np  # type: ignore
+
+if TYPE_CHECKING:
+    from shapely.geometry import MultiPolygon  # type: ignore
+
+
+DEFAULT_CHECKPOINT_SECONDS = 600.0
+"""Default minimum time between saves of a checkpoint"""
+
+
+def fingerprint_cells(*cell_lists: Sequence[MultiPolygon],
+                      extra: Any = ()) -> str:
+    """Compute a fingerprint of lists of cells
+
+    Args:
+        cell_lists: Lists of cells, in the order they are used
+        extra: Other inputs of the computation, such as the matrix type.
+            Their ``repr`` is part of the fingerprint.
+
+    Returns:
+        A hex digest that changes whenever any cell, the number or order of
+        cells, or ``extra`` changes
+    """
+    digest = hashlib.sha256()
+    digest.update(repr(extra).encode('utf-8'))
+    for cells in cell_lists:
+        digest.update(str(len(cells)).encode('utf-8'))
+        for cell in cells:
+            wkb = cell.wkb
+            digest.update(str(len(wkb)).encode('utf-8'))
+            digest.update(wkb)
+    return digest.hexdigest()
+
+
+class RowCheckpoint:
+    """The finished rows of a matrix, saved periodically to a sidecar directory
+
+    Args:
+        checkpoint_path: Path of the sidecar directory, which holds one
+            ``.npz`` segment file per save
+        fingerprint: Fingerprint of the inputs, from
+            :py:func:`fingerprint_cells`
+        every_seconds: Minimum time between saves
+        resume: Whether to restore the rows saved at ``checkpoint_path``. If
+            false, any existing segments are deleted by the first save.
+        log: Function to print messages with, or ``None`` for no messages
+    """
+
+    def __init__(self, checkpoint_path: str, fingerprint: str,
+                 every_seconds: float = DEFAULT_CHECKPOINT_SECONDS,
+                 resume: bool = True,
+                 log: Optional[Callable[[str], Any]] = print) -> None:
+        self.checkpoint_path = checkpoint_path
+        self.fingerprint = fingerprint
+        self.every_seconds = every_seconds
+        self.resume = resume
+        self.log = log
+        self.last_save = time.monotonic()
+        # Rows already in the segments of this run, or None before the first
+        # restore or save, when the existing segments may be stale
+        self._saved: Optional[np.ndarray] = None
+
+    def _log(self, message: str) -> None:
+        if self.log is not None:
+            self.log(message)
+
+    def _segment_paths(self) -> List[str]:
+        """List the segment files in the sidecar directory, in save order"""
+        if not os.path.isdir(self.checkpoint_path):
+            return []
+        return [os.path.join(self.checkpoint_path, name)
+                for name in sorted(os.listdir(self.checkpoint_path))
+                if name.endswith('.npz')]
+
+    def restore(self, mat: np.ndarray) -> np.ndarray:
+        """Merge the rows saved in the segments into a matrix
+
+        Args:
+            mat: The matrix being computed
+
+        Returns:
+            Boolean array that is true for each row of ``mat`` that was
+            restored. All false if there is nothing to resume from.
+        """
+        done = np.zeros(mat.shape[0], dtype=bool)
+        segment_paths = self._segment_paths()
+        if not self.resume or not segment_paths:
+            return done
+        # Check every segment before restoring any rows, so that rows from
+        # different inputs are never mixed in
+        for segment_path in segment_paths:
+            with np.load(segment_path) as segment:
+                if str(segment['fingerprint']) != self.fingerprint \
+                        or tuple(segment['shape']) != mat.shape \
+                        or str(segment['dtype']) != mat.dtype.str:
+                    self._log(f'Ignoring checkpoint {self.checkpoint_path}, '
+                              f'which was made from different inputs')
+                    return done
+        for segment_path in segment_paths:
+            with np.load(segment_path) as segment:
+                rows = segment['rows']
+                mat[rows] = segment['values']
+                done[rows] = True
+        self._saved = done.copy()
+        self._log(f'Resuming from {self.checkpoint_path} with '
+                  f'{np.count_nonzero(done)} of {len(done)} rows done')
+        return done
+
+    def due(self) -> bool:
+        """Check whether enough time has passed since the last save
+
+        Returns:
+            Whether to save now
+        """
+        return time.monotonic() - self.last_save >= self.every_seconds
+
+    def save(self, mat: np.ndarray, done: np.ndarray) -> None:
+        """Write the rows finished since the last save to a new segment
+
+        The segment is written atomically, so an interruption during a save
+        loses at most the rows of that save.
+
+        Args:
+            mat: The matrix being computed
+            done: Boolean array that is true for each finished row of ``mat``
+
+        Returns:
+            None
+        """
+        if self._saved is None:
+            self.remove()
+            self._saved = np.zeros(mat.shape[0], dtype=bool)
+        rows = np.flatnonzero(done & ~self._saved)
+        if len(rows):
+            os.makedirs(self.checkpoint_path, exist_ok=True)
+            segment_path = os.path.join(
+                self.checkpoint_path, f'{len(self._segment_paths()):06d}.npz')
+            tmp_path = segment_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, fingerprint=np.array(self.fingerprint),
+                         shape=np.array(mat.shape),
+                         dtype=np.array(mat.dtype.str), rows=rows,
+                         values=mat[rows])
+            os.replace(tmp_path, segment_path)
+            self._saved[rows] = True
+        self.last_save = time.monotonic()
+
+    def remove(self) -> None:
+        """Delete the sidecar, once the finished matrix has been saved
+
+        Returns:
+            None
+        """
+        if os.path.isdir(self.checkpoint_path):
+            shutil.rmtree(self.checkpoint_path)
+        self._saved = None
@@ -0,0 +1,169 @@
+"""Open input files that may be compressed
+
+Mobility data and GeoJSON exports often arrive compressed. Rather than
+decompressing them to disk first, :py:func:`open_compressed` returns a file
+object that decompresses while it is read, so the parsers that take file
+objects (:py:func:`pandas.read_csv`, :py:func:`numpy.genfromtxt`, and
+:py:func:`json.load`) can read them directly.
+
+The codec is detected from the first bytes of the file, which identify each
+supported format, so compressed files are read correctly whatever their
+names. Files whose first bytes match no codec are read by their extension if
+it names a codec, which only happens for damaged or empty compressed files,
+and otherwise as uncompressed. Besides paths, binary file objects such as a
+:py:class:`io.BytesIO` of a request body can be read, and their first bytes
+are peeked without consuming them.
+
+gzip, bzip2, and xz are supported by the standard library. zstd requires the
+optional ``zstandard`` package, which is only imported when a zstd file is
+opened.
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+from typing import IO, Optional, Tuple, Union
+
+
+MAGIC_BYTES = {
+    'gzip': b'\x1f\x8b',
+    'bz2': b'BZh',
+    'xz': b'\xfd7zXZ\x00',
+    'zstd': b'\x28\xb5\x2f\xfd',
+}
+"""First bytes of the files compressed with each codec"""
+
+EXTENSIONS = {
+    '.gz': 'gzip',
+    '.gzip': 'gzip',
+    '.bz2': 'bz2',
+    '.xz': 'xz',
+    '.lzma': 'xz',
+    '.zst': 'zstd',
+    '.zstd': 'zstd',
+}
+"""Codec of the files with each extension, in lowercase"""
+
+
+def _peek(stream: IO[bytes], size: int) -> Tuple[bytes, IO[bytes]]:
+    """Read the first bytes of a stream without consuming them
+
+    Args:
+        stream: Binary file object positioned at its start
+        size: Number of bytes to read
+
+    Returns:
+        Up to ``size`` bytes from the start of the stream, and a stream to
+        read all of it from. That is ``stream`` itself if it can seek or
+        peek, otherwise ``stream`` wrapped in a :py:class:`io.BufferedReader`.
+    """
+    if stream.seekable():
+        position = stream.tell()
+        start = stream.read(size)
+        stream.seek(position)
+        return start, stream
+    if not hasattr(stream, 'peek'):
+        stream = io.BufferedReader(stream)  # type: ignore
+    return stream.peek(size)[:size], stream  # type: ignore
+
+
+def _name(source: Union[str, IO[bytes]]) -> str:
+    """Get the path of a file, or ``''`` for file objects without one"""
+    if isinstance(source, str):
+        return source
+    name = getattr(source, 'name', '')
+    return name if isinstance(name, str) else ''
+
+
+def _detect(source: Union[str, IO[bytes]]) \
+        -> Tuple[Optional[str], Union[str, IO[bytes]]]:
+    """Find a file's codec, returning a source that still reads all of it
+
+    Args:
+        source: See :py:func:`detect_codec`
+
+    Returns:
+        The codec, as returned by :py:func:`detect_codec`, and the source to
+        read the file from
+    """
+    size = max(len(magic) for magic in MAGIC_BYTES.values())
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            start = f.read(size)
+    else:
+        start, source = _peek(source, size)
+    for codec, magic in MAGIC_BYTES.items():
+        if start.startswith(magic):
+            return codec, source
+    for extension, codec in EXTENSIONS.items():
+        if _name(source).lower().endswith(extension):
+            return codec, source
+    return None, source
+
+
+def detect_codec(source: Union[str, IO[bytes]]) -> Optional[str]:
+    """Find the codec a file is compressed with
+
+    Args:
+        source: Path to the file, or a binary file object positioned at its
+            start. The file object is left at its start if it can seek or
+            peek.
+
+    Returns:
+        One of the keys of :py:const:`MAGIC_BYTES`, or ``None`` if the file is
+        not compressed
+    """
+    return _detect(source)[0]
+
+
+def open_compressed(source: Union[str, IO[bytes]], mode: str = 'r',
+                    encoding: Optional[str] = None) -> IO:
+    """Open a file for reading, decompressing it while it is read
+
+    Args:
+        source: Path to the file, or a binary file object positioned at its
+            start, such as a :py:class:`io.BytesIO` of a request body. The
+            file may be uncompressed or compressed with any codec
+            :py:func:`detect_codec` detects.
+        mode: ``r`` or ``rt`` to read text, ``rb`` to read bytes
+        encoding: Encoding of the text when reading text. The default is the
+            same as for :py:func:`open`.
+
+    Returns:
+        The opened file. Closing it closes any file it opened from a path. A
+        file object passed as ``source`` may be left open or closed, so it
+        should not be used again.
+
+    Raises:
+        ValueError: If ``mode`` is not a mode for reading
+        ImportError: If the file is compressed with zstd and the
+            ``zstandard`` package is not installed
+    """
+    if mode not in ('r', 'rt', 'rb'):
+        raise ValueError(f'Compressed files can only be read, not opened '
+                         f'with mode {mode}')
+    codec, source = _detect(source)
+    binary: IO
+    if codec is None:
+        binary = open(source, 'rb') if isinstance(source, str) else source
+    elif codec == 'gzip':
+        binary = gzip.open(source, 'rb')
+    elif codec == 'bz2':
+        binary = bz2.open(source, 'rb')
+    elif codec == 'xz':
+        binary = lzma.open(source, 'rb')
+    else:
+        try:
+            # zstandard is optional, so only import it when it is needed
+            import zstandard  # type: ignore # pylint: disable=import-outside-toplevel
+        except ImportError as e:
+            raise ImportError(f'{_name(source) or "The input"} is compressed '
+                              f'with zstd, which requires the zstandard '
+                              f'package') from e
+        raw = open(source, 'rb') if isinstance(source, str) else source
+        binary = io.BufferedReader(
+            zstandard.ZstdDecompressor().stream_reader(raw, closefd=True))
+    if mode == 'rb':
+        return binary
+    return io.TextIOWrapper(binary, encoding=encoding)
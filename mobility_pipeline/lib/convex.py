@@ -0,0 +1,273 @@
+"""Intersect convex cells with arbitrary polygons without shapely
+
+Voronoi cells are convex, and the intersection of a convex polygon with any
+polygon can be found by clipping the polygon against each edge of the convex
+one in turn (the Sutherland-Hodgman algorithm). When the clipped polygon is
+not convex, the clipped ring can contain zero-width slivers along the convex
+polygon's edges. These add nothing to the shoelace area, so the area of the
+intersection is still exact.
+
+Clipping one pair of polygons takes a few array operations per edge of the
+convex polygon, which for small polygons costs more than a GEOS overlay. So
+:py:func:`convex_intersection_areas` clips many pairs at once: the rings of
+all the pairs are concatenated, and each step clips every ring against the
+corresponding edge of its own convex polygon. The number of array operations
+then depends only on the number of edges of the convex polygons.
+
+Most of a detailed admin border is usually far from any one Voronoi cell.
+Before clipping, every vertex that lies, along with both of its neighbors,
+outside the same side of the convex polygon's bounding box is dropped, and
+then likewise for the edges of the convex polygon itself. The dropped part of
+the ring and the chord that replaces it are both outside that side, so the
+area of the intersection does not change, but the ring left to clip is only
+as long as the part of the border near the cell.
+
+Cells of Voronoi tessellations clipped to the country border can be
+non-convex or split into several polygons, so :py:func:`convex_ring` checks
+each cell and returns ``None`` for those that the kernel cannot be used on.
+"""
+
+from typing import List, Optional, Sequence, Tuple, Union
+import numpy as np  # type: ignore
+from shapely.geometry import MultiPolygon, Polygon  # type: ignore
+
+
+Rings = List[Tuple[np.ndarray, bool]]
+"""The rings of a shape, as returned by :py:func:`polygon_rings`"""
+
+
+def ring_area(ring: np.ndarray) -> float:
+    """Compute the signed area of a ring with the shoelace formula
+
+    Args:
+        ring: Vertices of the ring, one ``[x, y]`` row per vertex, with or
+            without the first vertex repeated at the end
+
+    Returns:
+        The area, positive if the vertices are counterclockwise
+    """
+    if len(ring) < 3:
+        return 0.0
+    # Measuring from the first vertex avoids cancellation far from the
+    # origin, and makes the term of the edge back to it zero
+    xs, ys = ring[:, 0] - ring[0, 0], ring[:, 1] - ring[0, 1]
+    return float(np.dot(xs[:-1], ys[1:]) - np.dot(ys[:-1], xs[1:])) / 2
+
+
+def polygon_rings(shape: Union[Polygon, MultiPolygon]) -> Rings:
+    """Get the rings of a shape as coordinate arrays
+
+    Args:
+        shape: A polygon or multipolygon, possibly with holes
+
+    Returns:
+        One pair per ring of its vertices, without the first vertex repeated
+        at the end, and whether the ring is a hole
+    """
+    polygons = shape.geoms if isinstance(shape, MultiPolygon) else [shape]
+    rings = []
+    for polygon in polygons:
+        rings.append((np.asarray(polygon.exterior.coords,
+                                 dtype=np.float64)[:-1], False))
+        for interior in polygon.interiors:
+            rings.append((np.asarray(interior.coords,
+                                     dtype=np.float64)[:-1], True))
+    return rings
+
+
+def convex_ring(cell: Union[Polygon, MultiPolygon]) -> Optional[np.ndarray]:
+    """Get the vertices of a cell if it is a convex polygon
+
+    Args:
+        cell: The cell to check
+
+    Returns:
+        The vertices of the cell in counterclockwise order, without the first
+        vertex repeated at the end, or ``None`` if the cell is not a single
+        convex polygon without holes or has no area.
+    """
+    if isinstance(cell, MultiPolygon):
+        if len(cell.geoms) != 1:
+            return None
+        cell = cell.geoms[0]
+    if not isinstance(cell, Polygon) or cell.interiors or cell.area == 0:
+        return None
+    ring = np.asarray(cell.exterior.coords, dtype=np.float64)[:-1]
+    if ring_area(ring) < 0:
+        ring = ring[::-1]
+    edges = np.roll(ring, -1, axis=0) - ring
+    next_edges = np.roll(edges, -1, axis=0)
+    turns = edges[:, 0] * next_edges[:, 1] - edges[:, 1] * next_edges[:, 0]
+    if np.any(turns < 0):
+        return None
+    return ring
+
+
+def _neighbors(segments: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Find the previous and next point of each point in its own ring
+
+    Args:
+        segments: Ring of each point. The points of each ring must be
+            contiguous.
+
+    Returns:
+        The index of the previous point and of the next point, wrapping around
+        within each ring
+    """
+    n_points = len(segments)
+    is_start = np.ones(n_points, dtype=bool)
+    is_start[1:] = segments[1:] != segments[:-1]
+    starts = np.flatnonzero(is_start)
+    ends = np.append(starts[1:], n_points) - 1
+    previous = np.arange(-1, n_points - 1)
+    previous[starts] = ends
+    following = np.arange(1, n_points + 1)
+    following[ends] = starts
+    return previous, following
+
+
+def _drop_runs(region: np.ndarray, segments: np.ndarray) -> np.ndarray:
+    """Find the points to keep when dropping runs outside the same side
+
+    Args:
+        region: Index of a side each point is outside of, or -1 if none
+        segments: Ring of each point, as for :py:func:`_neighbors`
+
+    Returns:
+        Mask of the points that are not, along with both of their neighbors,
+        outside the same side
+    """
+    previous, following = _neighbors(segments)
+    return (region == -1) | (region != region[previous]) \
+        | (region != region[following])
+
+
+def convex_intersection_areas(convexes: Sequence[np.ndarray],
+                              shapes: Sequence[Rings]) -> np.ndarray:
+    """Compute the areas of the intersections of pairs of polygons
+
+    Args:
+        convexes: For each pair, the vertices of the convex polygon in
+            counterclockwise order, as returned by :py:func:`convex_ring`
+        shapes: For each pair, the rings of any polygon or multipolygon, as
+            returned by :py:func:`polygon_rings`. The same rings can be
+            passed for several pairs.
+
+    Returns:
+        The area of the intersection of each pair
+    """
+    n_pairs = len(convexes)
+    if n_pairs == 0:
+        return np.zeros(0)
+    # Pad every convex polygon to the same number of edges by repeating its
+    # last vertex. The extra edges have zero normals, so no point is ever
+    # outside them.
+    n_edges = max(len(convex) for convex in convexes)
+    padded = np.stack([np.concatenate(
+        [convex, np.repeat(convex[-1:], n_edges - len(convex), axis=0)])
+                       for convex in convexes])
+    edges = np.roll(padded, -1, axis=1) - padded
+    normals_x, normals_y = -edges[:, :, 1], edges[:, :, 0]
+    offsets = normals_x * padded[:, :, 0] + normals_y * padded[:, :, 1]
+
+    ring_pairs, ring_signs, points = [], [], []
+    for i_pair, rings in enumerate(shapes):
+        for ring, is_hole in rings:
+            ring_pairs.append(i_pair)
+            ring_signs.append(-1.0 if is_hole else 1.0)
+            points.append(ring)
+    ring_pairs = np.array(ring_pairs, dtype=np.int64)
+    ring_signs = np.array(ring_signs)
+    segments = np.repeat(np.arange(len(points)),
+                         [len(ring) for ring in points])
+    points = np.concatenate(points)
+    point_pairs = ring_pairs[segments]
+
+    # Cheaply drop the points far from each convex polygon's bounding box
+    xs, ys = points[:, 0], points[:, 1]
+    min_x, max_x = padded[:, :, 0].min(axis=1), padded[:, :, 0].max(axis=1)
+    min_y, max_y = padded[:, :, 1].min(axis=1), padded[:, :, 1].max(axis=1)
+    region = np.select(
+        [xs < min_x[point_pairs], xs > max_x[point_pairs],
+         ys < min_y[point_pairs], ys > max_y[point_pairs]], [0, 1, 2, 3], -1)
+    keep = _drop_runs(region, segments)
+    points, segments = points[keep], segments[keep]
+    point_pairs = point_pairs[keep]
+
+    # sides[i, e] is positive if point i is on the inner (left) side of edge e
+    # of its convex polygon
+    sides = points[:, :1] * normals_x[point_pairs] \
+        + points[:, 1:] * normals_y[point_pairs] - offsets[point_pairs]
+    outside = sides < 0
+    # Index of the first edge each point is outside of, or -1 if none
+    region = np.where(outside.any(axis=1), outside.argmax(axis=1), -1)
+    keep = _drop_runs(region, segments)
+    points, sides, segments = points[keep], sides[keep], segments[keep]
+
+    # Points between two points inside an edge are inside it too, so only the
+    # edges that some point is outside of can clip the rings
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for i_edge in np.flatnonzero(outside[keep].any(axis=0)):
+            inside = sides[:, i_edge] >= 0
+            if inside.all():
+                continue
+            previous, _ = _neighbors(segments)
+            crosses = inside != inside[previous]
+            # Only the crossings where the edge is crossed are kept
+            fraction = (sides[previous, i_edge] / (
+                sides[previous, i_edge] - sides[:, i_edge]))[:, None]
+            # Each point contributes the crossing into it, if any, then
+            # itself if it is inside, as in the sequential algorithm
+            kept = np.empty(2 * len(points), dtype=bool)
+            kept[0::2] = crosses
+            kept[1::2] = inside
+            new_points = np.empty((2 * len(points), 2))
+            new_points[0::2] = points[previous] \
+                + fraction * (points - points[previous])
+            new_points[1::2] = points
+            new_sides = np.empty((2 * len(points), n_edges))
+            new_sides[0::2] = sides[previous] \
+                + fraction * (sides - sides[previous])
+            new_sides[1::2] = sides
+            points, sides = new_points[kept], new_sides[kept]
+            segments = np.repeat(segments, 2)[kept]
+
+    areas = np.zeros(n_pairs)
+    if len(points) == 0:
+        return areas
+    # Shoelace formula for every ring at once, measured from the first point
+    # of each ring, which makes the term of the edge back to it zero
+    _, following = _neighbors(segments)
+    is_start = np.ones(len(segments), dtype=bool)
+    is_start[1:] = segments[1:] != segments[:-1]
+    starts = np.flatnonzero(is_start)
+    relative = points - np.repeat(points[starts], np.diff(
+        np.append(starts, len(points))), axis=0)
+    terms = relative[:, 0] * relative[following, 1] \
+        - relative[:, 1] * relative[following, 0]
+    ring_ids = segments[starts]
+    ring_areas = np.abs(np.add.reduceat(terms, starts)) / 2
+    np.add.at(areas, ring_pairs[ring_ids], ring_signs[ring_ids] * ring_areas)
+    return areas
+
+
+def convex_intersection_area(convex: np.ndarray,
+                             shape: Union[Polygon, MultiPolygon, Rings]) \
+        -> float:
+    """Compute the area of the intersection of a convex polygon and a shape
+
+    To intersect many pairs of polygons, :py:func:`convex_intersection_areas`
+    is much faster.
+
+    Args:
+        convex: Vertices of the convex polygon in counterclockwise order, as
+            returned by :py:func:`convex_ring`
+        shape: Any polygon or multipolygon, possibly with holes, or its rings
+            as returned by :py:func:`polygon_rings`
+
+    Returns:
+        The area of the intersection
+    """
+    if isinstance(shape, (Polygon, MultiPolygon)):
+        shape = polygon_rings(shape)
+    return float(convex_intersection_areas([convex], [shape])[0])
@@ -0,0 +1,246 @@
+"""Store daily admin-to-admin matrices as one appendable time series
+
+Daily matrices saved with :py:func:`data_interface.save_admin_admin` are one
+file per day, so analyzing trends means parsing every file again. A
+:py:class:`MobilityCube` instead keeps all the days in one directory:
+
+* ``days.bin``: The daily matrices, one after another, as raw values that are
+  read as a ``(days, admins, admins)`` :py:class:`numpy.memmap`
+* ``prefix.bin``: The running sums of the daily matrices, in double precision,
+  so that entry ``k`` is the sum of the first ``k + 1`` days
+* ``index.json``: The number of admins, the type of the daily matrices, and the
+  date of each day
+
+Days can only be appended, in chronological order, though days may be
+missing. The sum over any range of days is then the difference of two running
+sums, so weekly, monthly, and other rollups read two matrices however many
+days they cover.
+
+The index is replaced atomically after the matrices of a new day are written,
+so a crash while appending leaves the cube as it was before the append.
+"""
+
+from datetime import date, datetime, timedelta
+import json
+import os
+from typing import List, NamedTuple, Optional, Tuple
+import numpy as np  # type: ignore
+
+
+DAY_FORMATS = ('%Y%m%d', '%Y-%m-%d')
+"""Formats of the day identifiers that :py:func:`parse_day` accepts"""
+
+ROLLUP_PERIODS = ('week', 'month')
+"""Periods that :py:meth:`MobilityCube.rollup` can sum over"""
+
+
+def parse_day(day_id: str) -> date:
+    """Get the date of a day identifier
+
+    Args:
+        day_id: Identifier of a day in one of the :py:const:`DAY_FORMATS`,
+            like ``20150201`` or ``2015-02-01``
+
+    Returns:
+        The date
+
+    Raises:
+        ValueError: If ``day_id`` is not in any of the formats
+    """
+    for day_format in DAY_FORMATS:
+        try:
+            return datetime.strptime(day_id, day_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f'Day {day_id} is not a date like 20150201 or '
+                     f'2015-02-01')
+
+
+class Rollup(NamedTuple):
+    """The sum of the daily matrices over one period
+
+    Attributes:
+        label: Name of the period, like ``2015-W05`` or ``2015-02``
+        start: First date of the period
+        end: Last date of the period
+        n_days: Number of days of the period in the cube
+        total: Sum of the daily matrices over those days
+    """
+    label: str
+    start: date
+    end: date
+    n_days: int
+    total: np.ndarray
+
+
+class MobilityCube:
+    """Daily admin-to-admin matrices with running sums, stored in a directory
+
+    Args:
+        cube_dir: Directory of the cube. It is created on the first
+            :py:meth:`append` if it does not exist.
+    """
+
+    def __init__(self, cube_dir: str) -> None:
+        self.cube_dir = cube_dir
+        self.n_admins: Optional[int] = None
+        self.dtype: Optional[np.dtype] = None
+        self.dates: List[date] = []
+        index_path = os.path.join(cube_dir, 'index.json')
+        if os.path.exists(index_path):
+            with open(index_path, 'r') as f:
+                index = json.load(f)
+            self.n_admins = index['n_admins']
+            self.dtype = np.dtype(index['dtype'])
+            self.dates = [date.fromisoformat(day) for day in index['dates']]
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.cube_dir, name)
+
+    def _write_at(self, name: str, position: int, mat: np.ndarray) -> None:
+        """Write a matrix at a position of a file, dropping anything after"""
+        mode = 'r+b' if os.path.exists(self._path(name)) else 'wb'
+        with open(self._path(name), mode) as f:
+            f.seek(position * mat.nbytes)
+            f.write(np.ascontiguousarray(mat).tobytes())
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _read(self, name: str, dtype: np.dtype, position: int) -> np.ndarray:
+        """Read the matrix at a position of a file"""
+        mats = np.memmap(self._path(name), dtype=dtype, mode='r',
+                         shape=(len(self), self.n_admins, self.n_admins))
+        return np.array(mats[position])
+
+    def append(self, day: date, mat: np.ndarray) -> None:
+        """Append the matrix of a day
+
+        Args:
+            day: Date of the day, which must be after every day in the cube
+            mat: The day's admin-to-admin matrix
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If the day is not after the last day, or the matrix
+                has the wrong shape
+        """
+        if self.n_admins is None:
+            os.makedirs(self.cube_dir, exist_ok=True)
+            self.n_admins = mat.shape[0]
+            self.dtype = mat.dtype
+        if mat.shape != (self.n_admins, self.n_admins):
+            raise ValueError(f'Matrix of {day} has shape {mat.shape}, but the '
+                             f'cube has {self.n_admins} admins')
+        if self.dates and day <= self.dates[-1]:
+            raise ValueError(f'Cannot append {day} after {self.dates[-1]}; '
+                             f'days must be appended in order')
+        prefix = self.prefix_sum(len(self)) + mat
+        self._write_at('days.bin', len(self), mat.astype(self.dtype))
+        self._write_at('prefix.bin', len(self), prefix)
+        self.dates.append(day)
+        self._save_index()
+
+    def _save_index(self) -> None:
+        """Write the index atomically"""
+        index_path = self._path('index.json')
+        with open(index_path + '.tmp', 'w') as f:
+            json.dump({'n_admins': self.n_admins, 'dtype': self.dtype.str,
+                       'dates': [day.isoformat() for day in self.dates]}, f,
+                      indent=2)
+        os.replace(index_path + '.tmp', index_path)
+
+    def day(self, day: date) -> np.ndarray:
+        """Read the matrix of one day
+
+        Args:
+            day: Date of the day
+
+        Returns:
+            The day's matrix
+
+        Raises:
+            KeyError: If the day is not in the cube
+        """
+        position = int(np.searchsorted(self._ordinals(), day.toordinal()))
+        if position == len(self) or self.dates[position] != day:
+            raise KeyError(f'{day} is not in the cube')
+        return self._read('days.bin', self.dtype, position)
+
+    def prefix_sum(self, n_days: int) -> np.ndarray:
+        """Read the sum of the first days' matrices
+
+        Args:
+            n_days: Number of days to sum, from 0 to ``len(cube)``
+
+        Returns:
+            The sum, in double precision
+        """
+        if n_days == 0:
+            return np.zeros((self.n_admins, self.n_admins))
+        return self._read('prefix.bin', np.dtype(np.float64), n_days - 1)
+
+    def _ordinals(self) -> np.ndarray:
+        return np.array([day.toordinal() for day in self.dates],
+                        dtype=np.int64)
+
+    def range_sum(self, start: date, end: date) -> Tuple[np.ndarray, int]:
+        """Sum the matrices of the days in a range, reading two matrices
+
+        Args:
+            start: First date of the range
+            end: Last date of the range, inclusive
+
+        Returns:
+            The sum of the matrices of the days in the cube between ``start``
+            and ``end``, and the number of those days
+        """
+        ordinals = self._ordinals()
+        first = int(np.searchsorted(ordinals, start.toordinal(), 'left'))
+        stop = int(np.searchsorted(ordinals, end.toordinal(), 'right'))
+        stop = max(first, stop)
+        total = self.prefix_sum(stop)
+        if first > 0:
+            total = total - self.prefix_sum(first)
+        return total, stop - first
+
+    def rollup(self, period: str) -> List[Rollup]:
+        """Sum the matrices over every week or month with days in the cube
+
+        Args:
+            period: One of the :py:const:`ROLLUP_PERIODS`. Weeks start on
+                Monday and are labeled by ISO week, like ``2015-W05``.
+
+        Returns:
+            One :py:class:`Rollup` per period, in order
+
+        Raises:
+            ValueError: If ``period`` is not one of the
+                :py:const:`ROLLUP_PERIODS`
+        """
+        if period not in ROLLUP_PERIODS:
+            raise ValueError(f'Unknown period {period}; expected one of '
+                             f'{", ".join(ROLLUP_PERIODS)}')
+        rollups = []
+        day = self.dates[0] if self.dates else None
+        while day is not None and day <= self.dates[-1]:
+            if period == 'week':
+                start = day - timedelta(days=day.weekday())
+                end = start + timedelta(days=6)
+                year, week, _ = start.isocalendar()
+                label = f'{year}-W{week:02d}'
+            else:
+                start = day.replace(day=1)
+                end = (start + timedelta(days=31)).replace(day=1) \
+                    - timedelta(days=1)
+                label = f'{start.year}-{start.month:02d}'
+            total, n_days = self.range_sum(start, end)
+            if n_days:
+                rollups.append(Rollup(label, start, end, n_days, total))
+            day = end + timedelta(days=1)
+        return rollups
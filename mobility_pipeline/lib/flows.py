@@ -0,0 +1,86 @@
+"""Compact representations of the admin-to-admin matrix
+
+The admin-to-admin matrix is dense, but for a country with thousands of admins
+almost all of its entries are at or near zero. These functions convert it to
+forms that keep only the flows that matter:
+
+* An edge list of ``(ORIGIN, DESTINATION, COUNT)`` rows for every flow of at
+  least a threshold.
+* A :py:class:`scipy.sparse.csr_matrix` with the same entries.
+* A table of the ``k`` largest destinations for each origin.
+"""
+
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+from scipy import sparse  # type: ignore
+
+
+def admin_admin_to_edges(admin_admin: np.ndarray,
+                         threshold: float = 0) -> pd.DataFrame:
+    """Convert the admin-to-admin matrix to an edge list
+
+    Args:
+        admin_admin: The admin-to-admin matrix
+        threshold: Minimum flow to keep. Zero flows are always dropped.
+
+    Returns:
+        A DataFrame with columns ``ORIGIN``, ``DESTINATION``, and ``COUNT``
+        holding admin indices and the flow between them, in
+        ``ORIGIN``-major order.
+    """
+    origins, destinations = np.nonzero((admin_admin >= threshold)
+                                       & (admin_admin != 0))
+    return pd.DataFrame({
+        'ORIGIN': origins,
+        'DESTINATION': destinations,
+        'COUNT': admin_admin[origins, destinations],
+    })
+
+
+def admin_admin_to_csr(admin_admin: np.ndarray,
+                       threshold: float = 0) -> sparse.csr_matrix:
+    """Convert the admin-to-admin matrix to a sparse matrix
+
+    Args:
+        admin_admin: The admin-to-admin matrix
+        threshold: Minimum flow to keep. Zero flows are always dropped.
+
+    Returns:
+        A sparse matrix with the same shape as ``admin_admin`` that holds only
+        the flows of at least ``threshold``.
+    """
+    kept = np.where(admin_admin >= threshold, admin_admin, 0)
+    return sparse.csr_matrix(kept)
+
+
+def admin_admin_top_k(admin_admin: np.ndarray, k: int) -> pd.DataFrame:
+    """Find the largest destinations for each origin
+
+    Args:
+        admin_admin: The admin-to-admin matrix
+        k: Maximum number of destinations to keep for each origin
+
+    Returns:
+        A DataFrame with columns ``ORIGIN``, ``RANK``, ``DESTINATION``, and
+        ``COUNT``. For each origin, its ``k`` largest non-zero flows are listed
+        with ``RANK`` ``0`` for the largest. Equal flows are listed in order
+        of destination index.
+    """
+    n_origins, n_destinations = admin_admin.shape
+    k = min(k, n_destinations)
+    if k <= 0:
+        return pd.DataFrame(columns=['ORIGIN', 'RANK', 'DESTINATION', 'COUNT'])
+    # Partition to find the k largest in each row, then sort just those
+    candidates = np.argpartition(-admin_admin, k - 1, axis=1)[:, :k]
+    values = np.take_along_axis(admin_admin, candidates, axis=1)
+    order = np.lexsort((candidates, -values), axis=1)
+    destinations = np.take_along_axis(candidates, order, axis=1)
+    values = np.take_along_axis(values, order, axis=1)
+
+    df = pd.DataFrame({
+        'ORIGIN': np.repeat(np.arange(n_origins), k),
+        'RANK': np.tile(np.arange(k), n_origins),
+        'DESTINATION': destinations.ravel(),
+        'COUNT': values.ravel(),
+    })
+    return df[df['COUNT'] != 0].reset_index(drop=True)
@@ -0,0 +1,136 @@
+"""Aggregate the matrices of fine admins into those of coarser admins
+
+When each coarse admin (e.g. a GADM level 1 state) is the union of some fine
+admins (e.g. level 2 municipalities), its overlaps with the towers follow from
+the fine admins' overlaps, so no polygon intersections need to be recomputed.
+
+Let ``M`` be the membership matrix, of shape ``(n_parents, n_admins)``, where
+``M[p, a]`` is 1 if fine admin ``a`` is part of coarse admin ``p``, and let
+``D_A`` and ``D_P`` be diagonal matrices of the fine and coarse admins' areas,
+so that ``D_P = diag(M @ areas)``. Then:
+
+* The fraction of each tower's cell within a coarse admin is the sum of the
+  fractions within its children, so ``admin_tower_coarse = admin_tower @ M.T``.
+* The fraction of a coarse admin covered by each tower is the area-weighted
+  mean of the fractions of its children covered by that tower, so
+  ``tower_admin_coarse = W @ tower_admin`` with ``W = D_P^-1 @ M @ D_A``.
+* Since ``admin_admin = tower_admin @ tower_tower @ admin_tower``, the coarse
+  admin-to-admin matrix is ``W @ admin_admin @ M.T``. This is exactly what
+  the pipeline would compute from the coarse admins' shapes, but needs only
+  the fine admin-to-admin matrix.
+
+All three are sparse products costing time proportional to the number of
+non-zero entries.
+"""
+
+from typing import Hashable, List, Sequence, Tuple
+import numpy as np  # type: ignore
+from scipy import sparse  # type: ignore
+
+
+def membership_matrix(parent_keys: Sequence[Hashable]) \
+        -> Tuple[sparse.csr_matrix, List[Hashable]]:
+    """Build the sparse matrix of which fine admins make up each coarse admin
+
+    Args:
+        parent_keys: For each fine admin, in admin order, an identifier of the
+            coarse admin it belongs to, such as a shapefile's ``GID_1``
+            attribute
+
+    Returns:
+        A tuple of the membership matrix, which has shape
+        ``(n_parents, n_admins)`` and is 1 where the admin belongs to the
+        parent, and the identifier of each parent. Parents are in the order in
+        which they first appear in ``parent_keys``.
+    """
+    parents: List[Hashable] = []
+    parent_index = {}
+    rows = np.empty(len(parent_keys), dtype=np.int32)
+    for admin, key in enumerate(parent_keys):
+        if key not in parent_index:
+            parent_index[key] = len(parents)
+            parents.append(key)
+        rows[admin] = parent_index[key]
+    membership = sparse.csr_matrix(
+        (np.ones(len(parent_keys)), (rows, np.arange(len(parent_keys)))),
+        shape=(len(parents), len(parent_keys)))
+    return membership, parents
+
+
+def area_weights(membership: sparse.csr_matrix,
+                 admin_areas: np.ndarray) -> sparse.csr_matrix:
+    """Compute the area-weighted averaging matrix ``W = D_P^-1 @ M @ D_A``
+
+    Args:
+        membership: Membership matrix from :py:func:`membership_matrix`
+        admin_areas: Area of each fine admin
+
+    Returns:
+        Sparse matrix of shape ``(n_parents, n_admins)`` whose entry for a
+        parent and one of its admins is the fraction of the parent's area in
+        that admin. Parents with no area have all-zero rows.
+    """
+    weighted = membership @ sparse.diags(np.asarray(admin_areas, dtype=float))
+    parent_areas = np.asarray(weighted.sum(axis=1)).ravel()
+    inverse = np.divide(1.0, parent_areas, out=np.zeros_like(parent_areas),
+                        where=parent_areas != 0)
+    return sparse.csr_matrix(sparse.diags(inverse) @ weighted)
+
+
+def coarsen_tower_admin(tower_admin: np.ndarray,
+                        membership: sparse.csr_matrix,
+                        admin_areas: np.ndarray) -> np.ndarray:
+    """Derive the coarse tower-to-admin matrix from the fine one
+
+    Args:
+        tower_admin: Fine tower-to-admin matrix, of shape
+            ``(n_admins, n_towers)``
+        membership: Membership matrix from :py:func:`membership_matrix`
+        admin_areas: Area of each fine admin
+
+    Returns:
+        The coarse tower-to-admin matrix, of shape ``(n_parents, n_towers)``
+        and the type of ``tower_admin``
+    """
+    coarse = area_weights(membership, admin_areas) @ tower_admin
+    return np.asarray(coarse).astype(tower_admin.dtype, copy=False)
+
+
+def coarsen_admin_tower(admin_tower: np.ndarray,
+                        membership: sparse.csr_matrix) -> np.ndarray:
+    """Derive the coarse admin-to-tower matrix from the fine one
+
+    Args:
+        admin_tower: Fine admin-to-tower matrix, of shape
+            ``(n_towers, n_admins)``
+        membership: Membership matrix from :py:func:`membership_matrix`
+
+    Returns:
+        The coarse admin-to-tower matrix, of shape ``(n_towers, n_parents)``
+        and the type of ``admin_tower``
+    """
+    coarse = (membership @ admin_tower.T).T
+    return np.asarray(coarse).astype(admin_tower.dtype, copy=False)
+
+
+def coarsen_admin_admin(admin_admin: np.ndarray,
+                        membership: sparse.csr_matrix,
+                        admin_areas: np.ndarray) -> np.ndarray:
+    """Derive the coarse admin-to-admin matrix from the fine one
+
+    Args:
+        admin_admin: Fine admin-to-admin matrix, of shape
+            ``(n_admins, n_admins)``
+        membership: Membership matrix from :py:func:`membership_matrix`
+        admin_areas: Area of each fine admin
+
+    Returns:
+        The coarse admin-to-admin matrix, of shape ``(n_parents, n_parents)``.
+        It has the type of ``admin_admin`` if that is floating point, and is
+        ``float64`` otherwise, since averaging rounded counts does not give
+        whole numbers.
+    """
+    origins = area_weights(membership, admin_areas) @ admin_admin
+    coarse = (membership @ np.asarray(origins).T).T
+    dtype = np.promote_types(admin_admin.dtype, np.float32)
+    return np.asarray(coarse).astype(dtype, copy=False)
@@ -0,0 +1,270 @@
+"""Timing, memory, and progress instrumentation for long-running stages
+
+:py:class:`Metrics` records, for each named stage, the wall time, the CPU time
+of the thread running the stage, the peak resident set size of the process,
+and, if :py:mod:`tracemalloc` is tracing, the change in traced memory. Memory
+is measured for the whole process, so a stage's change in traced memory is
+only recorded if no other stage ran at the same time on another thread. It also
+keeps named counters that the library functions increment, such as the
+number of RTree candidates considered by
+:py:func:`lib.make_matrix.make_a_to_b_matrix`.
+
+:py:class:`ProgressReporter` periodically prints how far a loop has gotten and
+estimates how long it has left.
+
+:py:func:`profiled` runs a block of code under :py:mod:`cProfile`, including
+the threads it starts.
+"""
+
+from contextlib import contextmanager
+import cProfile
+import json
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # type: ignore
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Get the peak resident set size of this process so far
+
+    Returns:
+        The peak RSS in bytes, or ``None`` if the platform does not report it.
+    """
+    if resource is None:  # pragma: no cover
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, while macOS reports bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Metrics:
+    """Collects per-stage measurements and counters
+
+    Stages and counters may be recorded from several threads at once. Each
+    stage's record says whether another stage ran at the same time, in which
+    case its memory measurements include that stage's allocations.
+
+    Args:
+        log: Function called with a message when each stage starts and ends,
+            or ``None`` to record silently.
+    """
+
+    def __init__(self, log: Optional[Callable[[str], Any]] = print) -> None:
+        self.log = log
+        self.stages: List[Dict[str, Any]] = []
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._active: Dict[int, Dict[str, bool]] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Measure the code run within a ``with`` block as a stage
+
+        The stage's record has keys ``name``, ``wall_seconds``,
+        ``cpu_seconds`` (of the thread running the stage), ``overlapped``
+        (whether another stage ran at any time during this one), and
+        ``peak_rss_bytes`` (the peak RSS of the whole process so far). If
+        :py:mod:`tracemalloc` is tracing, it also has ``traced_peak_bytes``
+        (the peak traced memory of the whole process so far) and, unless the
+        stage overlapped another, ``traced_delta_bytes``.
+
+        Args:
+            name: Description of the stage
+
+        Returns:
+            A context manager
+        """
+        if self.log:
+            self.log(name)
+        state = {'overlapped': False}
+        with self._lock:
+            if self._active:
+                state['overlapped'] = True
+                for other in self._active.values():
+                    other['overlapped'] = True
+            self._active[id(state)] = state
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            traced_start, _ = tracemalloc.get_traced_memory()
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            with self._lock:
+                del self._active[id(state)]
+            record: Dict[str, Any] = {
+                'name': name,
+                'wall_seconds': time.perf_counter() - wall_start,
+                'cpu_seconds': time.thread_time() - cpu_start,
+                'overlapped': state['overlapped'],
+                'peak_rss_bytes': peak_rss_bytes(),
+            }
+            if tracing and tracemalloc.is_tracing():
+                traced_end, traced_peak = tracemalloc.get_traced_memory()
+                if not state['overlapped']:
+                    # Otherwise the change includes other stages' allocations
+                    record['traced_delta_bytes'] = traced_end - traced_start
+                record['traced_peak_bytes'] = traced_peak
+            with self._lock:
+                self.stages.append(record)
+            if self.log:
+                self.log(f"{name}: done in {record['wall_seconds']:.2f}s")
+
+    def increment(self, counter: str, amount: int = 1) -> None:
+        """Add to a named counter, starting it at zero if needed
+
+        Args:
+            counter: Name of the counter
+            amount: Amount to add
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the measurements as a JSON-serializable dictionary
+
+        Returns:
+            Dictionary with keys ``stages``, a list of per-stage records in the
+            order the stages finished, and ``counters``.
+        """
+        with self._lock:
+            return {'stages': list(self.stages),
+                    'counters': dict(self.counters)}
+
+    def save(self, metrics_path: str) -> None:
+        """Write the measurements to a JSON file
+
+        Args:
+            metrics_path: Path of the file to write
+
+        Returns:
+            None
+        """
+        with open(metrics_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+class ProgressReporter:
+    """Reports progress through a loop with an estimated time remaining
+
+    Args:
+        total: Number of steps in the loop
+        label: Description of the loop, printed with each report
+        interval: Minimum number of seconds between reports
+        log: Function called with each report
+    """
+
+    def __init__(self, total: int, label: str = 'Progress',
+                 interval: float = 10.0,
+                 log: Callable[[str], Any] = print) -> None:
+        self.total = total
+        self.label = label
+        self.interval = interval
+        self.log = log
+        self.done = 0
+        self._start = time.perf_counter()
+        self._last_report = self._start
+
+    def eta_seconds(self) -> Optional[float]:
+        """Estimate the seconds left, assuming the remaining steps take as long
+        as the completed ones on average
+
+        Returns:
+            The estimate, or ``None`` if no steps have completed.
+        """
+        if self.done == 0:
+            return None
+        elapsed = time.perf_counter() - self._start
+        return elapsed / self.done * (self.total - self.done)
+
+    def update(self, steps: int = 1) -> None:
+        """Record completed steps and report if enough time has passed
+
+        The final step is always reported.
+
+        Args:
+            steps: Number of steps just completed
+
+        Returns:
+            None
+        """
+        self.done += steps
+        now = time.perf_counter()
+        if now - self._last_report < self.interval and self.done < self.total:
+            return
+        self._last_report = now
+        percent = 100 * self.done / self.total if self.total else 100
+        eta = self.eta_seconds()
+        eta_str = time.strftime('%H:%M:%S', time.gmtime(eta)) \
+            if eta is not None else '?'
+        self.log(f'{self.label}: {self.done}/{self.total} ({percent:.1f}%), '
+                 f'ETA {eta_str}')
+
+
+@contextmanager
+def profiled(profile_path: Optional[str]) -> Iterator[None]:
+    """Run the code within a ``with`` block under :py:mod:`cProfile`
+
+    The calling thread and every thread started within the block are
+    profiled, each with its own profile, and the profiles are combined when
+    the block exits. Threads started within the block should finish before it
+    exits, as :py:func:`lib.pipeline.run_pipeline`'s threads do. While
+    profiling, :py:mod:`tracemalloc` also traces allocations in every thread
+    so that :py:meth:`Metrics.stage` can report memory.
+
+    Args:
+        profile_path: File to write the profile statistics to, readable with
+            :py:mod:`pstats`. If ``None``, the block runs without profiling.
+
+    Returns:
+        A context manager
+    """
+    if profile_path is None:
+        yield
+        return
+    profile = cProfile.Profile()
+    thread_profiles: List[cProfile.Profile] = []
+    lock = threading.Lock()
+
+    def start_thread_profile(*_):
+        """Replace this hook with a new profile on a thread's first event"""
+        thread_profile = cProfile.Profile()
+        try:
+            thread_profile.enable()
+        except ValueError:
+            # Profilers that already cover every thread refuse a second one
+            sys.setprofile(None)
+            return
+        with lock:
+            thread_profiles.append(thread_profile)
+
+    tracemalloc.start()
+    threading.setprofile(start_thread_profile)
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        threading.setprofile(None)
+        tracemalloc.stop()
+        stats = pstats.Stats(profile)
+        with lock:
+            for thread_profile in thread_profiles:
+                try:
+                    stats.add(thread_profile)
+                except TypeError:
+                    # Raised for profiles that recorded no calls
+                    continue
+        stats.dump_stats(profile_path)
@@ -0,0 +1,264 @@
+"""Run a graph of dependent jobs, skipping those whose inputs have not changed
+
+Each :py:class:`Job` names the files it reads and writes and the jobs it
+depends on. :py:func:`run_jobs` runs every job once all of its dependencies
+have finished, using a pool of parallel workers. Before running a job, it
+computes the job's fingerprint from the contents of its input files and its
+arguments. If the fingerprint matches the one recorded the last time the job
+succeeded and all of its outputs exist, the job is skipped.
+
+Fingerprints are written to a state file as soon as each job succeeds, so if
+the run crashes or is interrupted, the next run resumes where it stopped.
+"""
+
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    FIRST_COMPLETED,
+    wait,
+)
+import hashlib
+import json
+import os
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+
+HASH_CHUNK_BYTES = 2 ** 20
+"""Number of bytes of a file to hash at a time"""
+
+RAN = 'ran'
+"""Status of a job that was run and succeeded"""
+SKIPPED = 'skipped'
+"""Status of a job whose outputs were already up to date"""
+FAILED = 'failed'
+"""Status of a job that raised an exception"""
+BLOCKED = 'blocked'
+"""Status of a job that was not run because a dependency failed"""
+
+
+class Job(NamedTuple):
+    """A unit of work in the job graph
+
+    Attributes:
+        name: Unique name of the job
+        action: Function to run. When running on a process pool, this must be
+            a module-level function so that it can be pickled.
+        args: Positional arguments for ``action``. Their ``repr`` is part of
+            the fingerprint.
+        inputs: Paths of the files the job reads
+        outputs: Paths of the files the job writes
+        deps: Names of the jobs that must finish before this one starts
+    """
+    name: str
+    action: Callable[..., Any]
+    args: Tuple = ()
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    deps: Tuple[str, ...] = ()
+
+
+class JobState:
+    """Fingerprints of succeeded jobs and hashes of files, saved as JSON
+
+    File hashes are cached by path, size, and modification time, so unchanged
+    files are not re-read on every run.
+
+    Args:
+        state_path: Path of the JSON file. It is created if it does not exist.
+    """
+
+    def __init__(self, state_path: str) -> None:
+        self.state_path = state_path
+        self.jobs: Dict[str, str] = {}
+        self.files: Dict[str, List] = {}
+        if os.path.exists(state_path):
+            with open(state_path, 'r') as f:
+                raw = json.load(f)
+            self.jobs = raw['jobs']
+            self.files = raw['files']
+
+    def save(self) -> None:
+        """Write the state to disk atomically
+
+        Returns:
+            None
+        """
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'jobs': self.jobs, 'files': self.files}, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def file_hash(self, file_path: str) -> str:
+        """Hash the contents of a file
+
+        Args:
+            file_path: Path of the file
+
+        Returns:
+            The hex SHA-256 digest of the file, or ``'missing'`` if the file
+            does not exist.
+        """
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            return 'missing'
+        key = os.path.abspath(file_path)
+        cached = self.files.get(key)
+        if cached and cached[0] == stat.st_size \
+                and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+                digest.update(chunk)
+        self.files[key] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def fingerprint(self, job: Job) -> str:
+        """Compute a job's fingerprint from its inputs and arguments
+
+        Args:
+            job: The job
+
+        Returns:
+            A hex digest that changes whenever the job's action, arguments, or
+            the contents of its input files change.
+        """
+        digest = hashlib.sha256()
+        digest.update(getattr(job.action, '__qualname__', '').encode('utf-8'))
+        digest.update(repr(job.args).encode('utf-8'))
+        for input_path in job.inputs:
+            digest.update(input_path.encode('utf-8'))
+            digest.update(self.file_hash(input_path).encode('utf-8'))
+        return digest.hexdigest()
+
+    def is_current(self, job: Job, fingerprint: str) -> bool:
+        """Check whether a job's outputs are up to date
+
+        Args:
+            job: The job
+            fingerprint: The job's current fingerprint
+
+        Returns:
+            ``True`` if the job last succeeded with the same fingerprint and
+            all of its outputs exist.
+        """
+        return self.jobs.get(job.name) == fingerprint and \
+            all(os.path.exists(output) for output in job.outputs)
+
+
+def check_graph(jobs: List[Job]) -> Optional[str]:
+    """Check that job names are unique and dependencies exist and are acyclic
+
+    Args:
+        jobs: The jobs
+
+    Returns:
+        A description of a found error, or ``None`` if no error found.
+    """
+    by_name = {job.name: job for job in jobs}
+    if len(by_name) != len(jobs):
+        return 'Job names are not unique'
+    for job in jobs:
+        for dep in job.deps:
+            if dep not in by_name:
+                return f'Job {job.name} depends on unknown job {dep}'
+    # Kahn's algorithm: if some jobs never become ready, there is a cycle
+    n_waiting = {job.name: len(job.deps) for job in jobs}
+    ready = [name for name, n in n_waiting.items() if n == 0]
+    n_visited = 0
+    while ready:
+        name = ready.pop()
+        n_visited += 1
+        for job in jobs:
+            if name in job.deps:
+                n_waiting[job.name] -= 1
+                if n_waiting[job.name] == 0:
+                    ready.append(job.name)
+    if n_visited != len(jobs):
+        return 'Job dependencies contain a cycle'
+    return None
+
+
+def run_jobs(jobs: List[Job], state_path: str, n_workers: int = 1,
+             use_processes: bool = False,
+             log: Callable[[str], Any] = print) -> Dict[str, str]:
+    """Run the stale jobs in a graph, in dependency order
+
+    A job is run once all its dependencies have succeeded or been skipped. Its
+    fingerprint is computed at that point, after its dependencies have
+    written the files it reads. If a job fails, the jobs that depend on it,
+    directly or indirectly, are not run, but all other jobs are.
+
+    Args:
+        jobs: The jobs to run
+        state_path: Path of the JSON file that records succeeded jobs
+        n_workers: Maximum number of jobs to run at once
+        use_processes: Run jobs in separate processes instead of threads. Use
+            this for CPU-bound jobs.
+        log: Function called with a message when each job finishes
+
+    Returns:
+        Map from job name to its status: :py:const:`RAN`,
+        :py:const:`SKIPPED`, :py:const:`FAILED`, or :py:const:`BLOCKED`.
+
+    Raises:
+        ValueError: If the graph is invalid, as found by
+            :py:func:`check_graph`.
+    """
+    error = check_graph(jobs)
+    if error:
+        raise ValueError(error)
+    state = JobState(state_path)
+    status: Dict[str, str] = {}
+    pending = {job.name: job for job in jobs}
+    running: Dict[Future, Tuple[Job, str]] = {}
+    pool_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    pool: Executor = pool_class(max_workers=n_workers)
+
+    def schedule() -> None:
+        for name in list(pending):
+            job = pending[name]
+            dep_status = [status.get(dep) for dep in job.deps]
+            if any(s in (FAILED, BLOCKED) for s in dep_status):
+                status[name] = BLOCKED
+                log(f'{name}: blocked by a failed dependency')
+                del pending[name]
+            elif all(s in (RAN, SKIPPED) for s in dep_status):
+                del pending[name]
+                fingerprint = state.fingerprint(job)
+                if state.is_current(job, fingerprint):
+                    status[name] = SKIPPED
+                    log(f'{name}: up to date')
+                else:
+                    future = pool.submit(job.action, *job.args)
+                    running[future] = (job, fingerprint)
+
+    try:
+        while True:
+            # Skipping and blocking can make more jobs ready, so repeat
+            n_done = -1
+            while n_done != len(status):
+                n_done = len(status)
+                schedule()
+            if not running:
+                break
+            finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in finished:
+                job, fingerprint = running.pop(future)
+                exception = future.exception()
+                if exception is not None:
+                    status[job.name] = FAILED
+                    state.jobs.pop(job.name, None)
+                    log(f'{job.name}: failed with {exception!r}')
+                else:
+                    status[job.name] = RAN
+                    state.jobs[job.name] = fingerprint
+                    log(f'{job.name}: done')
+                state.save()
+    finally:
+        pool.shutdown(wait=True)
+        state.save()
+    return status
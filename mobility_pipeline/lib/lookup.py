@@ -0,0 +1,292 @@
+"""Find the Voronoi cell and admin containing each of many points
+
+A point's Voronoi cell is the cell of its nearest tower, so a
+:py:class:`PointLookup` finds the cells of all the points at once with a
+:py:class:`scipy.spatial.cKDTree` of the towers. Only towers with non-empty
+cells are in the tree, so each group of co-located towers is represented by
+the one that has the cell.
+
+The nearest tower's cell only needs checking if the cell was clipped by the
+edge of the tessellation, since a point beyond the edge still has a nearest
+tower. The lookup records which cells touch the boundary of the union of all
+the cells, and only the points whose nearest tower has such a cell are tested
+against it.
+
+For the admins, the lookup records for each tower the admins whose bounding
+boxes overlap its cell, and the one admin that contains the whole cell, if
+any. Points in such cells get that admin without any test. The rest are
+tested only against their tower's candidate admins, with one call to
+:py:func:`shapely.vectorized.contains` per admin for all the points that have
+it as a candidate.
+
+Building the lookup takes one containment test per tower and candidate admin,
+so it can be saved with :py:meth:`PointLookup.save` and reused. Each lookup
+keeps the :py:func:`fingerprint_inputs` of the towers and cells it was built
+from, so a saved lookup can be checked against the current inputs.
+"""
+
+import hashlib
+import pickle
+from typing import List, Sequence, Tuple
+import numpy as np  # type: ignore
+from scipy.spatial import cKDTree  # type: ignore
+from shapely import vectorized  # type: ignore
+from shapely.geometry import MultiPolygon  # type: ignore
+from shapely.ops import unary_union  # type: ignore
+from shapely.prepared import prep  # type: ignore
+from lib.checkpoint import fingerprint_cells
+
+
+NOT_FOUND = -1
+"""Index returned for points in no cell or no admin"""
+
+BOUNDS_CHUNK = 1000
+"""Number of cells whose bounding boxes are compared to all the admins' at
+once when building a lookup"""
+
+
+def _bounds(cells: Sequence[MultiPolygon]) -> np.ndarray:
+    """Get the bounding boxes of cells
+
+    Args:
+        cells: The cells
+
+    Returns:
+        One ``[min_x, min_y, max_x, max_y]`` row per cell. The rows of empty
+        cells are ``nan``, so they overlap nothing.
+    """
+    bounds = np.full((len(cells), 4), np.nan)
+    for i, cell in enumerate(cells):
+        if not cell.is_empty:
+            bounds[i] = cell.bounds
+    return bounds
+
+
+def _contained(cells: Sequence[MultiPolygon], cell_ids: np.ndarray,
+               points: np.ndarray, predicate=vectorized.contains) \
+        -> np.ndarray:
+    """Test each point against one cell, grouping the tests by cell
+
+    Args:
+        cells: The cells
+        cell_ids: Index of the cell to test each point against
+        points: One ``[x, y]`` row per point
+        predicate: Vectorized shapely predicate to test with
+
+    Returns:
+        Whether each point satisfies the predicate for its cell
+    """
+    result = np.zeros(len(cell_ids), dtype=bool)
+    order = np.argsort(cell_ids, kind='stable')
+    ids, starts = np.unique(cell_ids[order], return_index=True)
+    for cell_id, group in zip(ids, np.split(order, starts[1:])):
+        result[group] = predicate(cells[cell_id], points[group, 0],
+                                  points[group, 1])
+    return result
+
+
+def _expand(indptr: np.ndarray, indices: np.ndarray, rows: np.ndarray) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """List the entries of some rows of a compressed sparse structure
+
+    Args:
+        indptr: Start of each row's entries in ``indices``, and the end
+        indices: Entries of all the rows
+        rows: Row of each item to expand
+
+    Returns:
+        For each entry of each item's row, the position of the item in
+        ``rows`` and the entry
+    """
+    counts = indptr[rows + 1] - indptr[rows]
+    items = np.repeat(np.arange(len(rows)), counts)
+    offsets = np.arange(len(items)) - np.repeat(np.cumsum(counts) - counts,
+                                                counts)
+    return items, indices[np.repeat(indptr[rows], counts) + offsets]
+
+
+def fingerprint_inputs(towers: np.ndarray, tower_cells: List[MultiPolygon],
+                       admin_cells: List[MultiPolygon]) -> str:
+    """Compute a fingerprint of the inputs of a :py:class:`PointLookup`
+
+    Args:
+        towers: Tower coordinates, as for :py:class:`PointLookup`
+        tower_cells: The Voronoi cell of each tower
+        admin_cells: The admin cells
+
+    Returns:
+        A hex digest that changes whenever any tower, Voronoi cell, or admin
+        changes
+    """
+    towers = np.ascontiguousarray(towers, dtype=np.float64)
+    towers_digest = hashlib.sha256(towers.tobytes()).hexdigest()
+    return fingerprint_cells(tower_cells, admin_cells,
+                             extra=(towers.shape, towers_digest))
+
+
+class PointLookup:
+    """Index for finding the Voronoi cell and admin containing points
+
+    Args:
+        towers: Tower coordinates, one ``[longitude, latitude]`` row per
+            tower, as returned by :py:func:`data_interface.load_towers`
+        tower_cells: The Voronoi cell of each tower
+        admin_cells: The admin cells
+    """
+
+    def __init__(self, towers: np.ndarray, tower_cells: List[MultiPolygon],
+                 admin_cells: List[MultiPolygon]) -> None:
+        self.fingerprint = fingerprint_inputs(towers, tower_cells,
+                                              admin_cells)
+        self.tower_cells = list(tower_cells)
+        self.admin_cells = list(admin_cells)
+        self.tree_towers = np.flatnonzero(
+            [cell.area > 0 for cell in self.tower_cells])
+        self.tree = cKDTree(np.asarray(towers)[self.tree_towers])
+
+        outline = prep(unary_union(
+            [self.tower_cells[i] for i in self.tree_towers]).boundary)
+        self.clipped = np.array([cell.area > 0 and outline.intersects(cell)
+                                 for cell in self.tower_cells], dtype=bool)
+
+        # Candidate admins are those whose bounding boxes overlap the cell's
+        admin_bounds = _bounds(self.admin_cells)
+        tower_bounds = _bounds(self.tower_cells)
+        pairs = []
+        for start in range(0, len(self.tower_cells), BOUNDS_CHUNK):
+            chunk = tower_bounds[start:start + BOUNDS_CHUNK, None]
+            overlaps = (admin_bounds[:, 0] <= chunk[..., 2]) \
+                & (admin_bounds[:, 2] >= chunk[..., 0]) \
+                & (admin_bounds[:, 1] <= chunk[..., 3]) \
+                & (admin_bounds[:, 3] >= chunk[..., 1])
+            chunk_towers, chunk_admins = np.nonzero(overlaps)
+            pairs.append((chunk_towers + start, chunk_admins))
+        pair_towers = np.concatenate([towers for towers, _ in pairs])
+        pair_admins = np.concatenate([admins for _, admins in pairs])
+        self.candidates_indptr = np.concatenate([[0], np.cumsum(np.bincount(
+            pair_towers, minlength=len(self.tower_cells)))])
+        self.candidates = pair_admins
+
+        # Only an admin whose bounding box contains the cell's can contain it
+        pair_admin_bounds = admin_bounds[pair_admins]
+        pair_tower_bounds = tower_bounds[pair_towers]
+        encloses = np.all(pair_admin_bounds[:, :2] <= pair_tower_bounds[:, :2],
+                          axis=1) \
+            & np.all(pair_admin_bounds[:, 2:] >= pair_tower_bounds[:, 2:],
+                     axis=1)
+        prepared = {}
+        self.within_admin = np.full(len(self.tower_cells), NOT_FOUND,
+                                    dtype=np.int64)
+        for i_tower, i_admin in zip(pair_towers[encloses],
+                                    pair_admins[encloses]):
+            if self.within_admin[i_tower] != NOT_FOUND:
+                continue
+            if i_admin not in prepared:
+                prepared[i_admin] = prep(self.admin_cells[i_admin])
+            if prepared[i_admin].contains(self.tower_cells[i_tower]):
+                self.within_admin[i_tower] = i_admin
+
+    def towers_for(self, points: np.ndarray) -> np.ndarray:
+        """Find the tower whose Voronoi cell contains each point
+
+        Args:
+            points: One ``[longitude, latitude]`` row per point
+
+        Returns:
+            The index of the tower whose cell contains each point, or
+            :py:const:`NOT_FOUND` for points outside every cell or on the
+            border of the tessellation
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(points) == 0 or len(self.tree_towers) == 0:
+            return np.full(len(points), NOT_FOUND, dtype=np.int64)
+        _, nearest = self.tree.query(points)
+        towers = self.tree_towers[nearest]
+        check = np.flatnonzero(self.clipped[towers])
+        inside = _contained(self.tower_cells, towers[check], points[check])
+        towers[check[~inside]] = NOT_FOUND
+        return towers
+
+    def admins_for(self, points: np.ndarray) -> np.ndarray:
+        """Find the admin containing each point
+
+        Args:
+            points: One ``[longitude, latitude]`` row per point
+
+        Returns:
+            The index of the admin containing each point, or
+            :py:const:`NOT_FOUND` for points outside every admin. Points
+            outside every Voronoi cell are tested against every admin whose
+            bounding box contains them.
+        """
+        return self.lookup(points)[1]
+
+    def lookup(self, points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Find the tower and the admin containing each point
+
+        Args:
+            points: One ``[longitude, latitude]`` row per point
+
+        Returns:
+            The results of :py:meth:`towers_for` and :py:meth:`admins_for`
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        towers = self.towers_for(points)
+        admins = np.full(len(points), NOT_FOUND, dtype=np.int64)
+        in_cell = towers != NOT_FOUND
+        admins[in_cell] = self.within_admin[towers[in_cell]]
+
+        unknown = np.flatnonzero(in_cell & (admins == NOT_FOUND))
+        items, candidates = _expand(self.candidates_indptr, self.candidates,
+                                    towers[unknown])
+        item_points, item_candidates = [unknown[items]], [candidates]
+        # Fall back to the bounding boxes of all admins for points in no cell
+        outside = np.flatnonzero(~in_cell)
+        xs, ys = points[outside, 0], points[outside, 1]
+        for i_admin, admin in enumerate(self.admin_cells if len(outside)
+                                        else []):
+            min_x, min_y, max_x, max_y = admin.bounds
+            in_box = outside[(xs >= min_x) & (xs <= max_x) & (ys >= min_y)
+                             & (ys <= max_y)]
+            item_points.append(in_box)
+            item_candidates.append(np.full(len(in_box), i_admin,
+                                           dtype=np.int64))
+        item_points = np.concatenate(item_points)
+        candidates = np.concatenate(item_candidates)
+
+        # Points on a shared border are in neither admin's interior, so they
+        # are tested again for touching either admin's boundary
+        for predicate in (vectorized.contains, vectorized.touches):
+            pending = admins[item_points] == NOT_FOUND
+            item_points = item_points[pending]
+            candidates = candidates[pending]
+            found = _contained(self.admin_cells, candidates,
+                               points[item_points], predicate)
+            # Reversed so that the first candidate found wins
+            admins[item_points[found][::-1]] = candidates[found][::-1]
+        return towers, admins
+
+    def save(self, lookup_path: str) -> None:
+        """Save the lookup to a file
+
+        Args:
+            lookup_path: Path to save the lookup to
+
+        Returns:
+            None
+        """
+        with open(lookup_path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(lookup_path: str) -> 'PointLookup':
+        """Load a lookup saved by :py:meth:`save`
+
+        Args:
+            lookup_path: Path the lookup was saved to
+
+        Returns:
+            The lookup
+        """
+        with open(lookup_path, 'rb') as f:
+            return pickle.load(f)
@@ -34,16 +34,32 @@ https://medium.com/@mikefabrikant/cell-towers-chiefdoms-and-anonymized-call-deta
 """
 
 from collections.abc import Sequence
-from typing import Tuple, Dict, List
+from math import sqrt
+from typing import Tuple, Dict, List, Optional
 import numpy as np  # type: ignore
 import pandas as pd  # type: ignore
 from shapely.strtree import STRtree  # type: ignore
 from shapely.geometry import MultiPolygon  # type: ignore
 from lib.overlap import compute_overlap
+from lib.convex import (
+    Rings,
+    convex_ring,
+    convex_intersection_areas,
+    polygon_rings,
+    ring_area,
+)
+from lib.canonical import remap_mobility
+from lib.checkpoint import RowCheckpoint
+from lib.instrument import Metrics, ProgressReporter
 
 
-def make_tower_tower_matrix(mobility: pd.DataFrame, n_towers: int) \
-        -> np.ndarray:
+CONVEX_BATCH_POINTS = 100_000
+"""Number of polygon vertices to clip at once with the convex kernel"""
+
+
+def make_tower_tower_matrix(mobility: pd.DataFrame, n_towers: int,
+                            dtype: Optional[type] = None,
+                            remap: Optional[np.ndarray] = None) -> np.ndarray:
     """Make tower-to-tower mobility matrix
 
     Thank you to Tomas Bencomo (https://github.com/tjbencomo) for writing the
@@ -54,6 +70,12 @@ def make_tower_tower_matrix(mobility: pd.DataFrame, n_towers: int) \
             ``[ORIGIN, DESTINATION, COUNT]``. All values should be numeric.
         n_towers: Number of towers, which defines the length of each matrix
             dimension
+        dtype: Type of the returned matrix. If ``None``, the type is inferred
+            from the ``COUNT`` column.
+        remap: Remap array from :py:func:`lib.canonical.canonicalize`. If
+            given, the towers in ``mobility`` are mapped to their
+            representatives, and ``n_towers`` should be the number of
+            representatives.
 
     Returns:
         The tower-to-tower matrix, which has shape ``(n_towers, n_towers)`` and
@@ -61,6 +83,8 @@ def make_tower_tower_matrix(mobility: pd.DataFrame, n_towers: int) \
         origin ``i`` and destination ``j``.
 
     """
+    if remap is not None:
+        mobility = remap_mobility(mobility, remap)
     ori_indices = np.array([np.repeat(i, n_towers)
                             for i in np.arange(0, n_towers)]).flatten()
     dst_indices = np.tile(np.arange(0, n_towers), n_towers)
@@ -68,9 +92,43 @@ def make_tower_tower_matrix(mobility: pd.DataFrame, n_towers: int) \
     mobility = df.merge(mobility, how='left', on=['ORIGIN', 'DESTINATION'])
     mobility = mobility.fillna(0)
     np_array = mobility['COUNT'].values
+    if dtype is not None:
+        np_array = np_array.astype(dtype)
     return np.reshape(np_array, (n_towers, n_towers))
 
 
+def fill_tower_tower_matrix(mobility: pd.DataFrame, mat: np.ndarray,
+                            chunksize: int = 1_000_000) -> None:
+    """Write mobility counts into an existing tower-to-tower matrix
+
+    Unlike :py:func:`make_tower_tower_matrix`, this function never builds a
+    temporary of size ``n_towers ** 2``, so ``mat`` can be a
+    :py:class:`numpy.memmap` larger than memory. Entries of ``mat`` without
+    a row in ``mobility`` are left unchanged, so ``mat`` should be all zeros.
+    As in :py:func:`make_tower_tower_matrix`, rows of ``mobility`` whose towers
+    are outside the matrix are ignored.
+
+    Args:
+        mobility: DataFrame of mobility data with columns
+            ``[ORIGIN, DESTINATION, COUNT]``. All values should be numeric, and
+            each ``(ORIGIN, DESTINATION)`` pair should appear at most once.
+        mat: Square matrix to write the counts into
+        chunksize: Number of mobility rows to write at a time
+
+    Returns:
+        None
+    """
+    n_rows, n_cols = mat.shape
+    in_range = (mobility['ORIGIN'] < n_rows) & \
+        (mobility['DESTINATION'] < n_cols)
+    origins = mobility['ORIGIN'].values[in_range]
+    destinations = mobility['DESTINATION'].values[in_range]
+    counts = mobility['COUNT'].values[in_range]
+    for start in range(0, len(counts), chunksize):
+        rows = slice(start, start + chunksize)
+        mat[origins[rows], destinations[rows]] = counts[rows]
+
+
 def generate_rtree(polygons: Sequence) -> Tuple[STRtree,
                                                 Dict[Tuple[tuple, ...], int]]:
     """Helper function that builds an RTree from MultiPolygons
@@ -106,7 +164,13 @@ def generate_rtree(polygons: Sequence) -> Tuple[STRtree,
 
 
 def make_a_to_b_matrix(a_cells: List[MultiPolygon],
-                       b_cells: List[MultiPolygon]) -> np.ndarray:
+                       b_cells: List[MultiPolygon],
+                       dtype: type = np.float64,
+                       metrics: Optional[Metrics] = None,
+                       progress: Optional[ProgressReporter] = None,
+                       use_convex: bool = True,
+                       checkpoint: Optional[RowCheckpoint] = None) \
+        -> np.ndarray:
     """Create an overlap matrix from sequence A to B
 
     Computes for every pair of MultiPolygons between A and B, the fraction of
@@ -114,9 +178,26 @@ def make_a_to_b_matrix(a_cells: List[MultiPolygon],
     reduce the number of overlaps we have to compute by only computing overlaps
     between MultiPolygons that have overlapping bounding boxes.
 
+    Voronoi cells are usually convex. When either MultiPolygon of a pair is a
+    single convex polygon, the area of their intersection is computed with
+    :py:func:`lib.convex.convex_intersection_areas` instead of a shapely
+    overlay, in batches of about :py:const:`CONVEX_BATCH_POINTS` vertices.
+
     Args:
         a_cells: Sequence A of MultiPolygons
         b_cells: Sequence B of MultiPolygons
+        dtype: Type of the returned matrix
+        metrics: If provided, the counters ``rtree_candidates`` and
+            ``nonzero_overlaps`` are incremented by the number of overlaps
+            computed and the number of them that were non-zero.
+        progress: If provided, updated once for each MultiPolygon in B
+        use_convex: Whether to use the convex kernel for pairs where it
+            applies. If false, every overlap is computed with
+            :py:func:`lib.overlap.compute_overlap`.
+        checkpoint: If provided, the rows saved by an interrupted run are
+            restored from it and not computed again, and the finished rows
+            are saved to it whenever
+            :py:meth:`lib.checkpoint.RowCheckpoint.due` returns true.
 
     Returns:
         A matrix with row indices that correspond to the indices of B and column
@@ -125,19 +206,79 @@ def make_a_to_b_matrix(a_cells: List[MultiPolygon],
         MultiPolygon in B at index ``i`` that overlaps with the MultiPolygon in
         A at index ``j``.
     """
-    mat = np.zeros((len(b_cells), len(a_cells)))
+    mat = np.zeros((len(b_cells), len(a_cells)), dtype=dtype)
     a_rtree, tree_index_mapping = generate_rtree(a_cells)
+    a_convex = [convex_ring(acell) if use_convex else None
+                for acell in a_cells]
+    # Coordinate arrays of the cells, made when first needed
+    a_rings: Dict[int, Rings] = {}
+    # Pairs for the convex kernel, which are computed in batches
+    batch: List[Tuple[int, int, np.ndarray, Rings, float]] = []
+    batch_points = 0
+
+    def flush_batch():
+        nonlocal batch_points
+        areas = convex_intersection_areas([pair[2] for pair in batch],
+                                          [pair[3] for pair in batch])
+        for (i_b, j_a, _, _, b_area), area in zip(batch, areas):
+            mat[i_b][j_a] = area / b_area
+        batch.clear()
+        batch_points = 0
+
+    done = checkpoint.restore(mat) if checkpoint is not None \
+        else np.zeros(len(b_cells), dtype=bool)
     for i, bcell in enumerate(b_cells):
+        if done[i]:
+            if progress is not None:
+                progress.update()
+            continue
         overlapping_cells = a_rtree.query(bcell)
+        b_convex = convex_ring(bcell) if use_convex else None
+        # Measure B the same way as the intersection so that they cancel
+        b_area = ring_area(b_convex) if b_convex is not None else bcell.area
+        b_rings = None
         for acell in overlapping_cells:
             # compute true overlap and update corresponding entry in matrix
             coords = tuple([tuple(pol.exterior.coords) for pol in acell])
-            mat[i][tree_index_mapping[coords]] = compute_overlap(bcell, acell)
+            j = tree_index_mapping[coords]
+            if b_convex is not None:
+                if j not in a_rings:
+                    a_rings[j] = polygon_rings(acell)
+                batch.append((i, j, b_convex, a_rings[j], b_area))
+                batch_points += sum(len(ring) for ring, _ in a_rings[j])
+            elif a_convex[j] is not None and b_area > 0:
+                if b_rings is None:
+                    b_rings = polygon_rings(bcell)
+                batch.append((i, j, a_convex[j], b_rings, b_area))
+                batch_points += sum(len(ring) for ring, _ in b_rings)
+            else:
+                mat[i][j] = compute_overlap(bcell, acell)
+        if batch_points >= CONVEX_BATCH_POINTS:
+            flush_batch()
+        if metrics is not None:
+            metrics.increment('rtree_candidates', len(overlapping_cells))
+        if progress is not None:
+            progress.update()
+        if checkpoint is not None and checkpoint.due():
+            # Rows are only finished once their batched pairs are computed
+            flush_batch()
+            done[:i + 1] = True
+            checkpoint.save(mat, done)
+    flush_batch()
+    if checkpoint is not None:
+        done[:] = True
+        checkpoint.save(mat, done)
+    if metrics is not None:
+        metrics.increment('nonzero_overlaps', np.count_nonzero(mat))
     return mat
 
 
 def make_tower_to_admin_matrix(tower_cells: List[MultiPolygon],
-                               admin_cells: List[MultiPolygon])\
+                               admin_cells: List[MultiPolygon],
+                               dtype: type = np.float64,
+                               metrics: Optional[Metrics] = None,
+                               progress: Optional[ProgressReporter] = None,
+                               checkpoint: Optional[RowCheckpoint] = None) \
         -> np.ndarray:
     """Compute the tower-to-admin matrix.
 
@@ -147,15 +288,24 @@ def make_tower_to_admin_matrix(tower_cells: List[MultiPolygon],
     Args:
         admin_cells: Sequence of administrative regions; used as matrix A.
         tower_cells: Sequence of Voronoi cells; used as matrix B.
+        dtype: Type of the returned matrix
+        metrics: Passed to :py:meth:`make_a_to_b_matrix`
+        progress: Passed to :py:meth:`make_a_to_b_matrix`
+        checkpoint: Passed to :py:meth:`make_a_to_b_matrix`
 
     Returns:
         The tower-admin matrix.
     """
-    return make_a_to_b_matrix(tower_cells, admin_cells)
+    return make_a_to_b_matrix(tower_cells, admin_cells, dtype, metrics,
+                              progress, checkpoint=checkpoint)
 
 
 def make_admin_to_tower_matrix(admin_cells: List[MultiPolygon],
-                               tower_cells: List[MultiPolygon]) \
+                               tower_cells: List[MultiPolygon],
+                               dtype: type = np.float64,
+                               metrics: Optional[Metrics] = None,
+                               progress: Optional[ProgressReporter] = None,
+                               checkpoint: Optional[RowCheckpoint] = None) \
         -> np.ndarray:
     """Compute the admin-to-tower matrix.
 
@@ -165,11 +315,16 @@ def make_admin_to_tower_matrix(admin_cells: List[MultiPolygon],
     Args:
         tower_cells: Sequence of Voronoi cells; used as matrix A.
         admin_cells: Sequence of administrative regions; used as matrix B.
+        dtype: Type of the returned matrix
+        metrics: Passed to :py:meth:`make_a_to_b_matrix`
+        progress: Passed to :py:meth:`make_a_to_b_matrix`
+        checkpoint: Passed to :py:meth:`make_a_to_b_matrix`
 
     Returns:
         The admin-tower matrix.
     """
-    return make_a_to_b_matrix(admin_cells, tower_cells)
+    return make_a_to_b_matrix(admin_cells, tower_cells, dtype, metrics,
+                              progress, checkpoint=checkpoint)
 
 
 def make_admin_admin_matrix(tower_tower: np.ndarray, tower_admin: np.ndarray,
@@ -192,3 +347,83 @@ def make_admin_admin_matrix(tower_tower: np.ndarray, tower_admin: np.ndarray,
         that day from the admin with index ``i`` to the admin with index ``j``.
     """
     return (tower_admin @ tower_tower) @ admin_tower
+
+
+def block_size_for_budget(n_admins: int, n_towers: int, itemsize: int,
+                          memory_budget: int) -> int:
+    """Choose the tower block size for :py:func:`make_admin_admin_blocked`
+
+    Each step of the blocked multiplication holds a ``(block, block)`` tile of
+    the tower-to-tower matrix, an ``(n_admins, block)`` tile of the
+    tower-to-admin matrix, a ``(block, n_admins)`` tile of the admin-to-tower
+    matrix, and an ``(n_admins, block)`` intermediate product, on top of the
+    ``(n_admins, n_admins)`` result and an ``(n_admins, n_admins)`` scratch
+    matrix that each step's product is written to before it is added to the
+    result. We choose the largest block for which all of these fit within the
+    budget.
+
+    Args:
+        n_admins: Number of admins
+        n_towers: Number of towers
+        itemsize: Size in bytes of one matrix element
+        memory_budget: Maximum number of bytes to use
+
+    Returns:
+        The block size, between 1 and ``n_towers``.
+
+    Raises:
+        ValueError: If even a block size of 1 does not fit within the budget.
+    """
+    available = memory_budget // itemsize - 2 * n_admins ** 2
+    if available < 1 + 3 * n_admins:
+        raise ValueError(f'Memory budget of {memory_budget} bytes is too '
+                         f'small for {n_admins} admins')
+    # Largest block b such that b ** 2 + 3 * n_admins * b <= available
+    block = int((-3 * n_admins + sqrt(9 * n_admins ** 2 + 4 * available)) / 2)
+    return max(1, min(block, n_towers))
+
+
+def make_admin_admin_blocked(tower_tower: np.ndarray, tower_admin: np.ndarray,
+                             admin_tower: np.ndarray,
+                             memory_budget: int) -> np.ndarray:
+    """Compute the admin-to-admin matrix in blocks of towers
+
+    Computes the same matrix as :py:func:`make_admin_admin_matrix`, but as
+    the sum over blocks of towers ``I`` and ``J`` of
+    ``tower_admin[:, I] @ tower_tower[I, J] @ admin_tower[J, :]``. Only one
+    block of each operand is read into memory at a time, so the operands can
+    be :py:class:`numpy.memmap` objects larger than memory. Blocks of the
+    tower-to-tower matrix that are entirely zero are skipped.
+
+    Args:
+        tower_tower: The tower-to-tower mobility data
+        tower_admin: Stores the fraction of each admin that is covered by each
+            cell tower
+        admin_tower: Stores the fraction of each cell tower's range that is
+            within each admin
+        memory_budget: Maximum number of bytes to hold in memory at once. The
+            block size is chosen by :py:func:`block_size_for_budget`.
+
+    Returns:
+        The admin-to-admin matrix, as for :py:func:`make_admin_admin_matrix`.
+    """
+    n_admins, n_towers = tower_admin.shape
+    dtype = np.result_type(tower_tower.dtype, tower_admin.dtype,
+                           admin_tower.dtype)
+    block = block_size_for_budget(max(n_admins, admin_tower.shape[1]),
+                                  n_towers, dtype.itemsize, memory_budget)
+    admin_admin = np.zeros((n_admins, admin_tower.shape[1]), dtype=dtype)
+    scratch = np.empty_like(admin_admin)
+    for i_start in range(0, n_towers, block):
+        i_rows = slice(i_start, i_start + block)
+        tower_admin_block = np.asarray(tower_admin[:, i_rows])
+        for j_start in range(0, n_towers, block):
+            j_rows = slice(j_start, j_start + block)
+            tower_tower_block = np.asarray(tower_tower[i_rows, j_rows])
+            if not tower_tower_block.any():
+                continue
+            admin_tower_block = np.asarray(admin_tower[j_rows, :])
+            np.matmul(tower_admin_block @ tower_tower_block,
+                      admin_tower_block, out=scratch)
+            admin_admin += scratch
+    return admin_admin
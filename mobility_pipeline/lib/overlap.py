@@ -10,6 +10,8 @@ def compute_overlap(polygon_1: Union[Polygon, MultiPolygon],
     """Computes the fraction of the first polygon that intersects the second
 
     The returned fraction is ``(area of intersection) / (area of polygon_1)``.
+    If ``polygon_1`` has no area, as for the empty cells of co-located towers,
+    the fraction is 0.
 
     Args:
         polygon_1: The first polygon, whose total area will be the denominator
@@ -21,5 +23,7 @@ def compute_overlap(polygon_1: Union[Polygon, MultiPolygon],
 
     """
 
+    if polygon_1.area == 0:
+        return 0.0
     intersection = polygon_1.intersection(polygon_2)
     return intersection.area / polygon_1.area
@@ -0,0 +1,123 @@
+"""Overlap reading, computing, and writing across a sequence of items
+
+Processing a day of mobility data means reading files from disk, computing
+with numpy, and writing the result back to disk. Done one after another, the
+CPU idles while we wait on the disk and vice versa. :py:func:`run_pipeline`
+instead reads the next item on one thread and writes the previous item on
+another while the current item is computed. Bounded queues between the stages
+keep at most a few items in memory at once.
+"""
+
+from queue import Queue, Empty, Full
+from threading import Event, Thread
+from typing import Any, Callable, Iterable, List
+
+
+_DONE = object()
+"""Sentinel placed on a queue after its last item"""
+
+_POLL_SECONDS = 0.1
+"""How often blocked stages check whether another stage has failed"""
+
+
+def _put(queue: Queue, entry: Any, stop: Event) -> bool:
+    """Put onto a queue, giving up if ``stop`` is set
+
+    Returns:
+        ``True`` if the entry was put on the queue, ``False`` if we gave up.
+    """
+    while not stop.is_set():
+        try:
+            queue.put(entry, timeout=_POLL_SECONDS)
+            return True
+        except Full:
+            continue
+    return False
+
+
+def _get(queue: Queue, stop: Event) -> Any:
+    """Get from a queue, returning :py:const:`_DONE` if ``stop`` is set"""
+    while not stop.is_set():
+        try:
+            return queue.get(timeout=_POLL_SECONDS)
+        except Empty:
+            continue
+    return _DONE
+
+
+def run_pipeline(items: Iterable, read: Callable[[Any], Any],
+                 compute: Callable[[Any, Any], Any],
+                 write: Callable[[Any, Any], Any],
+                 queue_size: int = 1) -> List[Any]:
+    """Run read, compute, and write stages concurrently over items
+
+    For each item, this is equivalent to
+    ``write(item, compute(item, read(item)))``, but the stages for different
+    items overlap. ``read`` runs on a reader thread, ``compute`` on the
+    calling thread, and ``write`` on a writer thread. Items pass through
+    every stage in order.
+
+    If any stage raises an exception, the other stages stop at their next
+    item and the exception is re-raised from this function.
+
+    Args:
+        items: The items to process, such as day identifiers
+        read: Function that loads the data for an item
+        compute: Function that takes an item and its loaded data and returns
+            the result to write
+        write: Function that takes an item and its result and saves the result
+        queue_size: Maximum number of items waiting between two stages
+
+    Returns:
+        The values returned by ``write``, in the order of ``items``.
+    """
+    loaded: Queue = Queue(maxsize=queue_size)
+    computed: Queue = Queue(maxsize=queue_size)
+    stop = Event()
+    errors: List[BaseException] = []
+    written: List[Any] = []
+
+    def reader() -> None:
+        try:
+            for item in items:
+                if not _put(loaded, (item, read(item)), stop):
+                    return
+        except BaseException as e:  # pylint: disable=broad-except
+            errors.append(e)
+            stop.set()
+        _put(loaded, _DONE, stop)
+
+    def writer() -> None:
+        try:
+            while True:
+                entry = _get(computed, stop)
+                if entry is _DONE:
+                    return
+                item, result = entry
+                written.append(write(item, result))
+        except BaseException as e:  # pylint: disable=broad-except
+            errors.append(e)
+            stop.set()
+
+    threads = [Thread(target=reader, daemon=True),
+               Thread(target=writer, daemon=True)]
+    for thread in threads:
+        thread.start()
+    try:
+        while True:
+            entry = _get(loaded, stop)
+            if entry is _DONE:
+                break
+            item, data = entry
+            if not _put(computed, (item, compute(item, data)), stop):
+                break
+        _put(computed, _DONE, stop)
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+    return written
@@ -0,0 +1,85 @@
+"""Numeric types used for the matrices and the error they introduce
+
+By default every matrix is stored as :py:class:`numpy.float64`. The overlap
+fractions do not need 15 significant digits, and the counts are integers, so
+the pipeline can instead use :py:const:`FLOAT32_POLICY`, which halves the
+memory and bandwidth of the multiplication and storage.
+
+Error bounds for :py:const:`FLOAT32_POLICY`:
+
+Let ``u = 2 ** -24`` be the unit roundoff of float32 and ``T`` the number of
+towers. Every matrix in the product
+``(tower-to-admin) * (tower-to-tower) * (admin-to-tower)`` is non-negative, so
+the standard bound on floating point dot products is relative to the exact
+result itself. Rounding each overlap fraction to float32 contributes at most
+``u`` each, counts below ``2 ** 24`` are represented exactly (larger ones
+contribute at most ``u``), and each of the two products over ``T`` towers
+contributes at most ``T * u``. Altogether, each admin-to-admin entry is within
+a relative error of :py:func:`float32_error_bound` of the float64 result. This
+is a worst case; errors in pairwise or blocked summation, as done by BLAS,
+typically grow like ``sqrt(T) * u``.
+
+Rounding the output to integers adds an absolute error of at most ``0.5`` to
+each entry.
+"""
+
+from typing import NamedTuple
+import numpy as np  # type: ignore
+
+
+class DtypePolicy(NamedTuple):
+    """Choice of numeric types for the pipeline
+
+    Tower indices always use :py:const:`data_interface.INDEX_DTYPE`.
+
+    Attributes:
+        operator_dtype: Type of the tower-to-admin, admin-to-tower,
+            tower-to-tower, and admin-to-admin matrices
+        round_output: Whether to round the admin-to-admin matrix to integers
+            before saving it
+    """
+    operator_dtype: type
+    round_output: bool
+
+
+FLOAT64_POLICY = DtypePolicy(np.float64, False)
+"""Policy that keeps the full precision of float64"""
+
+FLOAT32_POLICY = DtypePolicy(np.float32, False)
+"""Policy that stores the matrices as float32"""
+
+
+def float32_error_bound(n_towers: int) -> float:
+    """Bound the relative error of float32 admin-to-admin entries
+
+    See the module documentation for the derivation.
+
+    Args:
+        n_towers: Number of towers
+
+    Returns:
+        The maximum relative difference between an admin-to-admin entry
+        computed under :py:const:`FLOAT32_POLICY` and the same entry computed
+        under :py:const:`FLOAT64_POLICY`.
+    """
+    unit_roundoff = 2.0 ** -24
+    n_roundings = 2 * n_towers + 3
+    return n_roundings * unit_roundoff / (1 - n_roundings * unit_roundoff)
+
+
+def round_counts(mat: np.ndarray) -> np.ndarray:
+    """Round a matrix of estimated counts to integers
+
+    Args:
+        mat: Matrix of non-negative counts, such as the admin-to-admin matrix
+
+    Returns:
+        The matrix rounded to the nearest integers, as the smallest of
+        :py:class:`numpy.int32` and :py:class:`numpy.int64` that holds every
+        value.
+    """
+    rounded = np.rint(mat)
+    dtype = np.int32
+    if rounded.size and rounded.max() > np.iinfo(np.int32).max:
+        dtype = np.int64
+    return rounded.astype(dtype)
@@ -0,0 +1,179 @@
+"""Compute single rows and columns of the overlap matrices on demand
+
+Checking the overlaps of one tower or one admin should not require computing
+the whole tower-to-admin or admin-to-tower matrix. An :py:class:`OverlapQuery`
+builds an RTree of the tower cells and of the admin cells the first time each
+is needed, and then computes any one row or column by intersecting a single
+cell with only the cells whose bounding boxes overlap it.
+
+The areas are computed as in :py:func:`lib.make_matrix.make_a_to_b_matrix`,
+using the convex kernel whenever either cell of a pair is convex, so the rows
+and columns match the full matrices.
+"""
+
+from typing import Dict, List, Sequence, Tuple
+import numpy as np  # type: ignore
+from shapely.geometry import MultiPolygon  # type: ignore
+from lib.convex import (
+    convex_ring,
+    convex_intersection_areas,
+    polygon_rings,
+    ring_area,
+)
+from lib.make_matrix import generate_rtree
+
+
+def cell_area(cell: MultiPolygon) -> float:
+    """Compute the area of a cell the same way as the overlaps are computed
+
+    Args:
+        cell: The cell
+
+    Returns:
+        The shoelace area of the cell's vertices if it is convex, otherwise
+        its shapely area
+    """
+    convex = convex_ring(cell)
+    return ring_area(convex) if convex is not None else cell.area
+
+
+def intersection_areas(cell: MultiPolygon,
+                       others: Sequence[MultiPolygon]) -> np.ndarray:
+    """Compute the areas of the intersections of a cell with other cells
+
+    Args:
+        cell: The cell to intersect
+        others: The cells to intersect it with
+
+    Returns:
+        The area of the intersection of ``cell`` with each of ``others``
+    """
+    areas = np.zeros(len(others))
+    convex = convex_ring(cell)
+    if convex is not None:
+        areas[:] = convex_intersection_areas(
+            [convex] * len(others), [polygon_rings(other) for other in others])
+        return areas
+    others_convex = [convex_ring(other) for other in others]
+    use_kernel = [i for i, other_convex in enumerate(others_convex)
+                  if other_convex is not None]
+    if use_kernel and cell.area > 0:
+        rings = polygon_rings(cell)
+        areas[use_kernel] = convex_intersection_areas(
+            [others_convex[i] for i in use_kernel], [rings] * len(use_kernel))
+    for i, other_convex in enumerate(others_convex):
+        if other_convex is None:
+            areas[i] = cell.intersection(others[i]).area
+    return areas
+
+
+def _fractions(numerators: np.ndarray, denominators: np.ndarray) \
+        -> np.ndarray:
+    """Divide, leaving zero where the denominator is zero"""
+    return np.divide(numerators, denominators,
+                     out=np.zeros_like(numerators), where=denominators != 0)
+
+
+class OverlapQuery:
+    """Compute single rows and columns of the overlap matrices
+
+    The rows and columns are those of the matrices from
+    :py:func:`lib.make_matrix.make_tower_to_admin_matrix`, whose entry at row
+    ``i`` and column ``j`` is the fraction of admin ``i`` covered by tower
+    ``j``, and :py:func:`lib.make_matrix.make_admin_to_tower_matrix`, whose
+    entry at row ``i`` and column ``j`` is the fraction of tower ``i``'s cell
+    within admin ``j``.
+
+    Args:
+        tower_cells: The Voronoi cell of each tower
+        admin_cells: The admin cells
+    """
+
+    def __init__(self, tower_cells: List[MultiPolygon],
+                 admin_cells: List[MultiPolygon]) -> None:
+        self.tower_cells = tower_cells
+        self.admin_cells = admin_cells
+        self._rtrees: Dict[str, Tuple] = {}
+
+    def _overlaps(self, cell: MultiPolygon, kind: str) \
+            -> Tuple[np.ndarray, np.ndarray]:
+        """Find the cells of a kind that overlap a cell
+
+        Args:
+            cell: The cell to query with
+            kind: ``tower`` or ``admin``, the kind of cells to search
+
+        Returns:
+            The indices of the cells of ``kind`` whose bounding boxes overlap
+            ``cell``, and the areas of their intersections with ``cell``
+        """
+        cells = self.tower_cells if kind == 'tower' else self.admin_cells
+        if kind not in self._rtrees:
+            self._rtrees[kind] = generate_rtree(cells)
+        rtree, index_mapping = self._rtrees[kind]
+        indices = np.array(
+            [index_mapping[tuple([tuple(pol.exterior.coords) for pol in other])]
+             for other in rtree.query(cell)], dtype=np.int64)
+        return indices, intersection_areas(cell, [cells[i] for i in indices])
+
+    def tower_admin_column(self, i_tower: int) -> np.ndarray:
+        """Compute the column of the tower-to-admin matrix for a tower
+
+        Args:
+            i_tower: Index of the tower
+
+        Returns:
+            The fraction of each admin covered by the tower
+        """
+        column = np.zeros(len(self.admin_cells))
+        admins, areas = self._overlaps(self.tower_cells[i_tower], 'admin')
+        column[admins] = _fractions(areas, np.array(
+            [cell_area(self.admin_cells[i]) for i in admins]))
+        return column
+
+    def tower_admin_row(self, i_admin: int) -> np.ndarray:
+        """Compute the row of the tower-to-admin matrix for an admin
+
+        Args:
+            i_admin: Index of the admin
+
+        Returns:
+            The fraction of the admin covered by each tower
+        """
+        row = np.zeros(len(self.tower_cells))
+        admin_cell = self.admin_cells[i_admin]
+        towers, areas = self._overlaps(admin_cell, 'tower')
+        row[towers] = _fractions(areas, np.full(len(areas),
+                                                cell_area(admin_cell)))
+        return row
+
+    def admin_tower_row(self, i_tower: int) -> np.ndarray:
+        """Compute the row of the admin-to-tower matrix for a tower
+
+        Args:
+            i_tower: Index of the tower
+
+        Returns:
+            The fraction of the tower's cell within each admin
+        """
+        row = np.zeros(len(self.admin_cells))
+        tower_cell = self.tower_cells[i_tower]
+        admins, areas = self._overlaps(tower_cell, 'admin')
+        row[admins] = _fractions(areas, np.full(len(areas),
+                                                cell_area(tower_cell)))
+        return row
+
+    def admin_tower_column(self, i_admin: int) -> np.ndarray:
+        """Compute the column of the admin-to-tower matrix for an admin
+
+        Args:
+            i_admin: Index of the admin
+
+        Returns:
+            The fraction of each tower's cell within the admin
+        """
+        column = np.zeros(len(self.tower_cells))
+        towers, areas = self._overlaps(self.admin_cells[i_admin], 'tower')
+        column[towers] = _fractions(areas, np.array(
+            [cell_area(self.tower_cells[i]) for i in towers]))
+        return column
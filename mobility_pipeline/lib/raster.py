@@ -0,0 +1,222 @@
+"""Approximate overlap matrices by rasterizing the cells onto a grid
+
+The admin cells and the Voronoi cells are each drawn onto the same grid of
+square pixels as arrays of integer labels, where each pixel holds the index
+of the cell containing its center, or :py:const:`NO_LABEL`. The area of the
+intersection of admin ``a`` and tower ``t`` is then approximately the number
+of pixels labeled ``a`` in the admin array and ``t`` in the tower array, which
+a single :py:func:`numpy.bincount` over the label pairs counts for every pair
+at once. No polygons are intersected, so the cost depends on the number of
+pixels, not on how detailed the borders are.
+
+Cells too small to contain a pixel center would get all-zero rows, so their
+rows are computed exactly with :py:func:`lib.make_matrix.make_a_to_b_matrix`.
+
+The error shrinks with the pixel size. :py:func:`estimate_raster_error`
+measures it by computing a random sample of rows exactly.
+"""
+
+from math import ceil
+from typing import Dict, List, NamedTuple, Tuple
+import numpy as np  # type: ignore
+from scipy import sparse  # type: ignore
+from shapely import vectorized  # type: ignore
+from shapely.geometry import MultiPolygon  # type: ignore
+from lib.centroid import compare_operators
+from lib.make_matrix import make_a_to_b_matrix
+
+
+NO_LABEL = -1
+"""Label of a pixel whose center is in no cell"""
+
+
+class Grid(NamedTuple):
+    """A grid of square pixels
+
+    Attributes:
+        min_x: Smallest x coordinate of the grid
+        min_y: Smallest y coordinate of the grid
+        resolution: Side length of each pixel
+        n_cols: Number of pixels along the x axis
+        n_rows: Number of pixels along the y axis
+    """
+    min_x: float
+    min_y: float
+    resolution: float
+    n_cols: int
+    n_rows: int
+
+
+def make_grid(cells: List[MultiPolygon], resolution: float) -> Grid:
+    """Make a grid that covers some cells
+
+    Args:
+        cells: The cells to cover
+        resolution: Side length of each pixel, in the cells' coordinate units
+
+    Returns:
+        The grid
+    """
+    bounds = np.array([cell.bounds for cell in cells if cell.area > 0])
+    min_x, min_y = bounds[:, 0].min(), bounds[:, 1].min()
+    max_x, max_y = bounds[:, 2].max(), bounds[:, 3].max()
+    return Grid(min_x, min_y, resolution,
+                max(1, ceil((max_x - min_x) / resolution)),
+                max(1, ceil((max_y - min_y) / resolution)))
+
+
+def rasterize(cells: List[MultiPolygon], grid: Grid) -> np.ndarray:
+    """Label each pixel of a grid with the cell containing its center
+
+    Each cell is tested only against the pixels within its bounding box, all
+    at once with :py:func:`shapely.vectorized.contains`.
+
+    Args:
+        cells: The cells to draw
+        grid: The grid to draw them on
+
+    Returns:
+        Array of shape ``(n_rows, n_cols)`` holding the index of the cell
+        containing each pixel's center, or :py:const:`NO_LABEL`. Where cells
+        overlap, the one with the lowest index is used.
+    """
+    labels = np.full((grid.n_rows, grid.n_cols), NO_LABEL, dtype=np.int32)
+    for i_cell, cell in enumerate(cells):
+        if cell.area == 0:
+            continue
+        min_x, min_y, max_x, max_y = cell.bounds
+        col_start = max(0, int((min_x - grid.min_x) / grid.resolution))
+        col_stop = min(grid.n_cols,
+                       int(ceil((max_x - grid.min_x) / grid.resolution)))
+        row_start = max(0, int((min_y - grid.min_y) / grid.resolution))
+        row_stop = min(grid.n_rows,
+                       int(ceil((max_y - grid.min_y) / grid.resolution)))
+        if col_start >= col_stop or row_start >= row_stop:
+            continue
+        xs = grid.min_x + (np.arange(col_start, col_stop) + 0.5) \
+            * grid.resolution
+        ys = grid.min_y + (np.arange(row_start, row_stop) + 0.5) \
+            * grid.resolution
+        window = labels[row_start:row_stop, col_start:col_stop]
+        grid_x, grid_y = np.meshgrid(xs, ys)
+        inside = vectorized.contains(cell, grid_x, grid_y) \
+            & (window == NO_LABEL)
+        window[inside] = i_cell
+    return labels
+
+
+def joint_counts(a_labels: np.ndarray, b_labels: np.ndarray,
+                 n_a: int, n_b: int) -> sparse.csr_matrix:
+    """Count the pixels with each pair of labels
+
+    Args:
+        a_labels: Labels from :py:func:`rasterize`
+        b_labels: Labels of the same grid for other cells
+        n_a: Number of cells labeled in ``a_labels``
+        n_b: Number of cells labeled in ``b_labels``
+
+    Returns:
+        Sparse matrix of shape ``(n_a, n_b)`` whose entry at row ``i`` and
+        column ``j`` is the number of pixels labeled ``i`` in ``a_labels`` and
+        ``j`` in ``b_labels``
+    """
+    a_flat = a_labels.ravel()
+    b_flat = b_labels.ravel()
+    both = (a_flat != NO_LABEL) & (b_flat != NO_LABEL)
+    pairs = a_flat[both].astype(np.int64) * n_b + b_flat[both]
+    # Only count the pairs that occur, since n_a * n_b can be huge
+    occurring, inverse = np.unique(pairs, return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(occurring))
+    return sparse.csr_matrix((counts, (occurring // n_b, occurring % n_b)),
+                             shape=(n_a, n_b))
+
+
+def _inverse(counts: np.ndarray) -> np.ndarray:
+    """Invert counts, leaving zeros as zeros"""
+    counts = counts.astype(np.float64)
+    return np.divide(1, counts, out=np.zeros_like(counts), where=counts != 0)
+
+
+def make_raster_operators(tower_cells: List[MultiPolygon],
+                          admin_cells: List[MultiPolygon],
+                          resolution: float,
+                          dtype: type = np.float64) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """Approximate the tower-to-admin and admin-to-tower matrices
+
+    Args:
+        tower_cells: The Voronoi cell of each tower
+        admin_cells: The admin cells
+        resolution: Side length of each pixel, in the cells' coordinate units
+        dtype: Type of the returned matrices
+
+    Returns:
+        The tower-to-admin matrix, of shape ``(n_admins, n_towers)``, and the
+        admin-to-tower matrix, of shape ``(n_towers, n_admins)``, in the same
+        form as :py:func:`lib.make_matrix.make_tower_to_admin_matrix` and
+        :py:func:`lib.make_matrix.make_admin_to_tower_matrix` return
+    """
+    grid = make_grid(list(tower_cells) + list(admin_cells), resolution)
+    admin_labels = rasterize(admin_cells, grid)
+    tower_labels = rasterize(tower_cells, grid)
+    joint = joint_counts(admin_labels, tower_labels, len(admin_cells),
+                         len(tower_cells))
+    admin_pixels = np.bincount(admin_labels[admin_labels != NO_LABEL],
+                               minlength=len(admin_cells))
+    tower_pixels = np.bincount(tower_labels[tower_labels != NO_LABEL],
+                               minlength=len(tower_cells))
+
+    tower_admin = (sparse.diags(_inverse(admin_pixels)) @ joint) \
+        .toarray().astype(dtype)
+    admin_tower = (sparse.diags(_inverse(tower_pixels)) @ joint.T) \
+        .toarray().astype(dtype)
+
+    # Cells with no area have all-zero rows in the exact matrices too
+    small_admins = np.flatnonzero((admin_pixels == 0) & np.array(
+        [cell.area > 0 for cell in admin_cells], dtype=bool))
+    if len(small_admins):
+        tower_admin[small_admins] = make_a_to_b_matrix(
+            tower_cells, [admin_cells[i] for i in small_admins], dtype)
+    small_towers = np.flatnonzero((tower_pixels == 0) & np.array(
+        [cell.area > 0 for cell in tower_cells], dtype=bool))
+    if len(small_towers):
+        admin_tower[small_towers] = make_a_to_b_matrix(
+            admin_cells, [tower_cells[i] for i in small_towers], dtype)
+    return tower_admin, admin_tower
+
+
+def estimate_raster_error(tower_cells: List[MultiPolygon],
+                          admin_cells: List[MultiPolygon],
+                          tower_admin: np.ndarray, admin_tower: np.ndarray,
+                          n_samples: int = 20, seed: int = 0) \
+        -> Dict[str, Dict[str, float]]:
+    """Estimate the error of approximate matrices from a sample of exact rows
+
+    Args:
+        tower_cells: The Voronoi cell of each tower
+        admin_cells: The admin cells
+        tower_admin: Approximate tower-to-admin matrix
+        admin_tower: Approximate admin-to-tower matrix
+        n_samples: Number of rows of each matrix to compute exactly
+        seed: Seed for choosing the rows
+
+    Returns:
+        Dictionary with keys ``tower_admin`` and ``admin_tower``, each holding
+        the errors of the sampled rows as measured by
+        :py:func:`lib.centroid.compare_operators`
+    """
+    rng = np.random.RandomState(seed)
+    admins = rng.choice(len(admin_cells),
+                        min(n_samples, len(admin_cells)), replace=False)
+    towers = rng.choice(len(tower_cells),
+                        min(n_samples, len(tower_cells)), replace=False)
+    exact_tower_admin = make_a_to_b_matrix(
+        tower_cells, [admin_cells[i] for i in admins])
+    exact_admin_tower = make_a_to_b_matrix(
+        admin_cells, [tower_cells[i] for i in towers])
+    return {
+        'tower_admin': compare_operators(tower_admin[admins],
+                                         exact_tower_admin),
+        'admin_tower': compare_operators(admin_tower[towers],
+                                         exact_admin_tower),
+    }
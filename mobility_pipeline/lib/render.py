@@ -0,0 +1,207 @@
+"""Draw many cells and towers quickly with matplotlib
+
+Adding one patch per cell and one ``plot`` call per tower makes matplotlib
+lay out and draw every artist separately, which for tens of thousands of
+cells takes minutes. Instead, :py:func:`add_cells` draws all the cells as one
+:py:class:`matplotlib.collections.PatchCollection`, and :py:func:`add_points`
+draws all the towers with one ``scatter`` call.
+
+Detailed admin borders also have far more vertices than the figure has
+pixels. Before drawing, each cell is simplified with a tolerance of half a
+pixel from :py:func:`pixel_size`, which drops the vertices that could not
+change the rendered image.
+
+:py:func:`make_figure` makes a figure drawn by the Agg backend when it is
+going to be saved to a file, so rendering to a PNG does not need a display.
+"""
+
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+import numpy as np  # type: ignore
+from matplotlib.backends.backend_agg import FigureCanvasAgg  # type: ignore
+from matplotlib.collections import PatchCollection  # type: ignore
+from matplotlib.figure import Figure  # type: ignore
+from matplotlib.patches import PathPatch  # type: ignore
+from matplotlib.path import Path  # type: ignore
+from shapely.geometry import MultiPolygon, Polygon  # type: ignore
+
+
+FIGURE_SIZE = (10.0, 10.0)
+"""Default width and height of figures, in inches"""
+
+Bounds = Tuple[float, float, float, float]
+"""Bounding box as ``(min_x, min_y, max_x, max_y)``"""
+
+
+def cells_bounds(cells: Iterable[Union[Polygon, MultiPolygon]]) -> Bounds:
+    """Find the bounding box of some cells
+
+    Args:
+        cells: The cells. Empty cells are ignored.
+
+    Returns:
+        The smallest bounding box containing every non-empty cell
+    """
+    bounds = np.array([cell.bounds for cell in cells if not cell.is_empty])
+    return (bounds[:, 0].min(), bounds[:, 1].min(), bounds[:, 2].max(),
+            bounds[:, 3].max())
+
+
+def pixel_size(bounds: Bounds, figure_size: Tuple[float, float] = FIGURE_SIZE,
+               dpi: float = 100) -> float:
+    """Find the side length of a pixel of a figure, in data units
+
+    Args:
+        bounds: Bounding box that the figure shows
+        figure_size: Width and height of the figure, in inches
+        dpi: Pixels per inch
+
+    Returns:
+        The larger of the widths and heights of a pixel, since the axes keep
+        an equal aspect ratio
+    """
+    min_x, min_y, max_x, max_y = bounds
+    return max((max_x - min_x) / (figure_size[0] * dpi),
+               (max_y - min_y) / (figure_size[1] * dpi))
+
+
+def cell_path(cell: Union[Polygon, MultiPolygon],
+              tolerance: float = 0) -> Optional[Path]:
+    """Convert a cell to a path, dropping vertices within a tolerance
+
+    Args:
+        cell: The cell, which may have holes and several parts
+        tolerance: Maximum distance by which the simplified borders may
+            deviate from the originals. No vertices are dropped if zero.
+
+    Returns:
+        One compound path of all the cell's rings, or ``None`` if the cell is
+        empty or vanishes when simplified
+    """
+    if tolerance > 0:
+        cell = cell.simplify(tolerance, preserve_topology=False)
+    if cell.is_empty:
+        return None
+    polygons = cell.geoms if hasattr(cell, 'geoms') else [cell]
+    vertices, codes = [], []
+    for polygon in polygons:
+        if not isinstance(polygon, Polygon) or polygon.is_empty:
+            continue
+        for ring in [polygon.exterior] + list(polygon.interiors):
+            coords = np.asarray(ring.coords)
+            ring_codes = np.full(len(coords), Path.LINETO, dtype=Path.code_type)
+            ring_codes[0] = Path.MOVETO
+            ring_codes[-1] = Path.CLOSEPOLY
+            vertices.append(coords)
+            codes.append(ring_codes)
+    if not vertices:
+        return None
+    return Path(np.concatenate(vertices), np.concatenate(codes))
+
+
+def add_cells(axes, cells: Sequence[Union[Polygon, MultiPolygon]],
+              facecolors=(0, 0, 0.5), edgecolor=(0, 0, 0), alpha: float = 0.5,
+              tolerance: float = 0) -> PatchCollection:
+    """Draw cells on axes as a single collection
+
+    Args:
+        axes: The matplotlib axes to draw on
+        cells: The cells to draw
+        facecolors: One color for every cell, or one color per cell
+        edgecolor: Color of the borders
+        alpha: Opacity of the cells
+        tolerance: Tolerance for :py:func:`cell_path`, usually half of
+            :py:func:`pixel_size`
+
+    Returns:
+        The collection added to ``axes``. Cells that vanish when simplified
+        are left out.
+    """
+    facecolors = np.asarray(facecolors, dtype=np.float64)
+    per_cell = facecolors.ndim == 2
+    patches, kept = [], []
+    for i, cell in enumerate(cells):
+        path = cell_path(cell, tolerance)
+        if path is not None:
+            patches.append(PathPatch(path))
+            kept.append(i)
+    collection = PatchCollection(
+        patches, facecolors=facecolors[kept] if per_cell else facecolors,
+        edgecolors=edgecolor, linewidths=0.5, alpha=alpha)
+    axes.add_collection(collection)
+    return collection
+
+
+def add_points(axes, points: np.ndarray, colors='red', size: float = 4,
+               alpha: float = 0.5):
+    """Draw points on axes with a single scatter
+
+    Args:
+        axes: The matplotlib axes to draw on
+        points: One ``[x, y]`` row per point
+        colors: One color for every point, or one color per point
+        size: Marker area, in points squared
+        alpha: Opacity of the markers
+
+    Returns:
+        The :py:class:`matplotlib.collections.PathCollection` added to
+        ``axes``
+    """
+    points = np.asarray(points)
+    return axes.scatter(points[:, 0], points[:, 1], s=size, c=colors,
+                        alpha=alpha, linewidths=0)
+
+
+def make_figure(output: Optional[str] = None,
+                figure_size: Tuple[float, float] = FIGURE_SIZE,
+                dpi: float = 100):
+    """Make a figure with one axes with an equal aspect ratio
+
+    Args:
+        output: Path the figure will be saved to with
+            :py:func:`show_or_save`, or ``None`` to show it in a window
+        figure_size: Width and height of the figure, in inches
+        dpi: Pixels per inch
+
+    Returns:
+        The figure and its axes
+    """
+    if output is None:
+        # pyplot is only needed to show windows, so we import it here to keep
+        # headless output from depending on a GUI backend
+        # pylint: disable=import-outside-toplevel
+        from matplotlib import pyplot as plt  # type: ignore
+        fig = plt.figure(figsize=figure_size, dpi=dpi)
+    else:
+        fig = Figure(figsize=figure_size, dpi=dpi)
+        FigureCanvasAgg(fig)
+    # (left, bottom, width, height) in units of fractions of figure dimensions
+    axes = fig.add_axes((0.05, 0.05, 0.9, 0.9))
+    axes.set_aspect(1)
+    return fig, axes
+
+
+def show_or_save(fig, axes, output: Optional[str] = None,
+                 legend_handles: Optional[List] = None) -> None:
+    """Fit the axes to their contents and display or save the figure
+
+    Args:
+        fig: Figure from :py:func:`make_figure`
+        axes: Axes of ``fig``
+        output: Path to save the figure to, with a format given by its
+            extension, or ``None`` to show it in a window
+        legend_handles: Artists to list in a legend, if any
+
+    Returns:
+        None
+    """
+    axes.autoscale_view()
+    if legend_handles:
+        axes.legend(handles=legend_handles)
+    if output is None:
+        # pyplot is only needed to show windows, so we import it here to keep
+        # headless output from depending on a GUI backend
+        # pylint: disable=import-outside-toplevel
+        from matplotlib import pyplot as plt  # type: ignore
+        plt.show()
+    else:
+        fig.savefig(output)
@@ -0,0 +1,159 @@
+"""Simplify cells before computing overlaps, and measure the effect
+
+Admin boundaries from shapefiles often have far more vertices than the
+overlap fractions need, and the cost of intersecting two cells grows with
+their number of vertices. :py:func:`simplify_cells` drops the vertices that
+are within a tolerance of the line through their neighbors, using the
+Douglas-Peucker algorithm with ``preserve_topology`` so that no ring becomes
+invalid or crosses another ring of the same cell.
+
+Each cell is simplified on its own, so the borders shared by neighboring
+cells can shift by up to the tolerance differently on either side, leaving
+slivers of overlap or gaps no wider than the tolerance.
+:py:func:`estimate_simplification_error` measures how much that changes the
+overlap fractions by computing a random sample of rows of both matrices from
+the original and the simplified cells.
+
+Simplifying a detailed country takes a while, so :py:func:`cached_simplify`
+saves the simplified cells to a cache file along with a fingerprint of the
+original cells and the tolerance, and reuses them while both are unchanged.
+"""
+
+import os
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import numpy as np  # type: ignore
+from shapely import wkb  # type: ignore
+from shapely.geometry import MultiPolygon, Polygon  # type: ignore
+from lib.centroid import compare_operators
+from lib.checkpoint import fingerprint_cells
+from lib.make_matrix import make_a_to_b_matrix
+
+
+def count_vertices(cells: Sequence[MultiPolygon]) -> int:
+    """Count the vertices of cells
+
+    Args:
+        cells: The cells
+
+    Returns:
+        The total number of vertices of all the rings of all the cells,
+        counting the repeated closing vertex of each ring
+    """
+    total = 0
+    for cell in cells:
+        polygons = cell.geoms if isinstance(cell, MultiPolygon) else [cell]
+        for polygon in polygons:
+            if polygon.is_empty:
+                continue
+            total += len(polygon.exterior.coords)
+            total += sum(len(interior.coords)
+                         for interior in polygon.interiors)
+    return total
+
+
+def simplify_cells(cells: Sequence[MultiPolygon], tolerance: float) \
+        -> List[MultiPolygon]:
+    """Simplify cells while keeping them valid
+
+    Args:
+        cells: The cells to simplify
+        tolerance: Maximum distance of a dropped vertex from the simplified
+            boundary, in the units of the cells' coordinates
+
+    Returns:
+        The simplified cells, in the same order, each as a MultiPolygon.
+        Empty cells stay empty.
+    """
+    simplified = []
+    for cell in cells:
+        if cell.is_empty:
+            simplified.append(MultiPolygon())
+            continue
+        simple = cell.simplify(tolerance, preserve_topology=True)
+        if isinstance(simple, Polygon):
+            simple = MultiPolygon([simple])
+        simplified.append(simple)
+    return simplified
+
+
+def cached_simplify(cells: Sequence[MultiPolygon], tolerance: float,
+                    cache_path: str,
+                    log: Optional[Callable[[str], Any]] = print) \
+        -> List[MultiPolygon]:
+    """Simplify cells, reusing the result saved for the same input
+
+    Args:
+        cells: The cells to simplify
+        tolerance: Tolerance for :py:func:`simplify_cells`
+        cache_path: Path of the ``.npz`` cache file. It is replaced if it
+            holds cells simplified from different cells or with a different
+            tolerance.
+        log: Function to print messages with, or ``None`` for no messages
+
+    Returns:
+        The result of :py:func:`simplify_cells`
+    """
+    fingerprint = fingerprint_cells(cells, extra=float(tolerance))
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as cache:
+            if str(cache['fingerprint']) == fingerprint:
+                if log is not None:
+                    log(f'Using the simplified cells in {cache_path}')
+                data, offsets = cache['wkb'].tobytes(), cache['offsets']
+                loaded = [wkb.loads(data[start:end]) for start, end
+                          in zip(offsets[:-1], offsets[1:])]
+                # Empty cells are read back as empty geometry collections
+                return [MultiPolygon() if cell.is_empty else cell
+                        for cell in loaded]
+    simplified = simplify_cells(cells, tolerance)
+    blobs = [cell.wkb for cell in simplified]
+    offsets = np.concatenate([[0], np.cumsum([len(blob) for blob in blobs])])
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, fingerprint=np.array(fingerprint),
+                 wkb=np.frombuffer(b''.join(blobs), dtype=np.uint8),
+                 offsets=offsets)
+    os.replace(tmp_path, cache_path)
+    if log is not None:
+        log(f'Simplified cells saved to {cache_path}')
+    return simplified
+
+
+def estimate_simplification_error(tower_cells: List[MultiPolygon],
+                                  admin_cells: List[MultiPolygon],
+                                  simple_tower_cells: List[MultiPolygon],
+                                  simple_admin_cells: List[MultiPolygon],
+                                  n_samples: int = 20, seed: int = 0) \
+        -> Dict[str, Dict[str, float]]:
+    """Estimate how much simplification changes the overlap matrices
+
+    Args:
+        tower_cells: The original Voronoi cell of each tower
+        admin_cells: The original admin cells
+        simple_tower_cells: The simplified Voronoi cells
+        simple_admin_cells: The simplified admin cells
+        n_samples: Number of rows of each matrix to compute both ways
+        seed: Seed for choosing the rows
+
+    Returns:
+        Dictionary with keys ``tower_admin`` and ``admin_tower``, each holding
+        the differences of the sampled rows as measured by
+        :py:func:`lib.centroid.compare_operators`. Its ``max_abs_error`` is
+        the largest change in any overlap fraction.
+    """
+    rng = np.random.RandomState(seed)
+    admins = rng.choice(len(admin_cells),
+                        min(n_samples, len(admin_cells)), replace=False)
+    towers = rng.choice(len(tower_cells),
+                        min(n_samples, len(tower_cells)), replace=False)
+    errors = {}
+    for name, a_cells, b_cells, simple_a, simple_b, rows in [
+            ('tower_admin', tower_cells, admin_cells, simple_tower_cells,
+             simple_admin_cells, admins),
+            ('admin_tower', admin_cells, tower_cells, simple_admin_cells,
+             simple_tower_cells, towers)]:
+        exact = make_a_to_b_matrix(a_cells, [b_cells[i] for i in rows])
+        simplified = make_a_to_b_matrix(simple_a,
+                                        [simple_b[i] for i in rows])
+        errors[name] = compare_operators(simplified, exact)
+    return errors
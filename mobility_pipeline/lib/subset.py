@@ -0,0 +1,172 @@
+"""Compute the admin-to-admin flows between a subset of admins
+
+The flows from origin admins ``O`` to destination admins ``D`` are
+
+.. code-block:: python
+
+    tower_admin[O, :] @ tower_tower @ admin_tower[:, D]
+
+Only the towers with a non-zero entry in ``tower_admin[O, :]`` (the towers
+covering the origins) and in ``admin_tower[:, D]`` (the towers whose cells are
+partly within the destinations) can contribute, so the product can be taken
+over just those towers:
+
+.. code-block:: python
+
+    tower_admin[O, T_o] @ tower_tower[T_o, T_d] @ admin_tower[T_d, D]
+
+This only needs the mobility rows from a tower in ``T_o`` to a tower in
+``T_d``, so the work scales with the size of the region instead of the size of
+the country.
+"""
+
+from typing import NamedTuple, Optional, Sequence
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+from lib.flows import admin_admin_to_edges
+
+
+class Subset(NamedTuple):
+    """The operators restricted to a subset of admins, from
+    :py:func:`make_subset`
+
+    Attributes:
+        origins: Indices of the origin admins
+        destinations: Indices of the destination admins
+        origin_towers: Indices of the towers covering an origin admin
+        destination_towers: Indices of the towers whose cells are partly
+            within a destination admin
+        tower_admin: ``tower_admin[origins, origin_towers]``
+        admin_tower: ``admin_tower[destination_towers, destinations]``
+    """
+    origins: np.ndarray
+    destinations: np.ndarray
+    origin_towers: np.ndarray
+    destination_towers: np.ndarray
+    tower_admin: np.ndarray
+    admin_tower: np.ndarray
+
+
+def make_subset(tower_admin: np.ndarray, admin_tower: np.ndarray,
+                origins: Optional[Sequence[int]] = None,
+                destinations: Optional[Sequence[int]] = None) -> Subset:
+    """Restrict the overlap operators to the towers that touch some admins
+
+    Args:
+        tower_admin: The tower-to-admin matrix
+        admin_tower: The admin-to-tower matrix
+        origins: Indices of the origin admins, or ``None`` for all admins
+        destinations: Indices of the destination admins, or ``None`` for all
+            admins
+
+    Returns:
+        The restricted operators
+    """
+    n_admins = tower_admin.shape[0]
+    origins = np.arange(n_admins) if origins is None \
+        else np.asarray(origins, dtype=np.int64)
+    destinations = np.arange(n_admins) if destinations is None \
+        else np.asarray(destinations, dtype=np.int64)
+    origin_rows = tower_admin[origins]
+    origin_towers = np.flatnonzero(np.any(origin_rows != 0, axis=0))
+    destination_cols = admin_tower[:, destinations]
+    destination_towers = np.flatnonzero(np.any(destination_cols != 0, axis=1))
+    return Subset(origins, destinations, origin_towers, destination_towers,
+                  origin_rows[:, origin_towers],
+                  destination_cols[destination_towers])
+
+
+def tower_mask(towers: np.ndarray, n_towers: int,
+               remap: Optional[np.ndarray] = None) -> np.ndarray:
+    """Make a mask of the towers in the mobility data that map to some towers
+
+    Args:
+        towers: Indices of the towers in the operators, as in
+            :py:attr:`Subset.origin_towers`
+        n_towers: Number of towers in the operators
+        remap: Remap array from :py:func:`lib.canonical.canonicalize` if the
+            operators are in terms of representative towers
+
+    Returns:
+        Boolean array that is true at each tower index of the mobility data
+        that maps to one of ``towers``
+    """
+    mask = np.zeros(n_towers, dtype=bool)
+    mask[towers] = True
+    if remap is None:
+        return mask
+    # Dropped towers are remapped to -1, which indexes the appended False
+    return np.concatenate([mask, [False]])[remap]
+
+
+def subset_tower_tower(mobility: pd.DataFrame, subset: Subset,
+                       dtype: Optional[type] = None) -> np.ndarray:
+    """Make the tower-to-tower matrix between a subset's towers
+
+    Args:
+        mobility: DataFrame of mobility data with columns
+            ``[ORIGIN, DESTINATION, COUNT]``, in terms of the same towers as
+            the operators. Rows for other towers are ignored.
+        subset: The subset from :py:func:`make_subset`
+        dtype: Type of the returned matrix. If ``None``, the type of the
+            ``COUNT`` column is used.
+
+    Returns:
+        Matrix of shape ``(len(origin_towers), len(destination_towers))``
+    """
+    origins = mobility['ORIGIN'].values
+    destinations = mobility['DESTINATION'].values
+    counts = mobility['COUNT'].values
+    n_towers = max(origins.max(initial=0), destinations.max(initial=0),
+                   subset.origin_towers.max(initial=0),
+                   subset.destination_towers.max(initial=0)) + 1
+    origin_local = np.full(n_towers, -1)
+    origin_local[subset.origin_towers] = np.arange(len(subset.origin_towers))
+    destination_local = np.full(n_towers, -1)
+    destination_local[subset.destination_towers] = \
+        np.arange(len(subset.destination_towers))
+    rows = origin_local[origins]
+    cols = destination_local[destinations]
+    kept = (rows >= 0) & (cols >= 0)
+    mat = np.zeros((len(subset.origin_towers), len(subset.destination_towers)),
+                   dtype=dtype if dtype is not None else counts.dtype)
+    np.add.at(mat, (rows[kept], cols[kept]), counts[kept])
+    return mat
+
+
+def make_admin_admin_subset(mobility: pd.DataFrame,
+                            subset: Subset) -> np.ndarray:
+    """Compute the admin-to-admin flows between a subset's admins
+
+    Args:
+        mobility: DataFrame of mobility data with columns
+            ``[ORIGIN, DESTINATION, COUNT]``, in terms of the same towers as
+            the operators. Only rows between the subset's towers are needed.
+        subset: The subset from :py:func:`make_subset`
+
+    Returns:
+        Matrix of shape ``(len(origins), len(destinations))`` equal to
+        ``admin_admin[np.ix_(origins, destinations)]``
+    """
+    tower_tower = subset_tower_tower(mobility, subset,
+                                     subset.tower_admin.dtype)
+    return subset.tower_admin @ tower_tower @ subset.admin_tower
+
+
+def subset_to_edges(admin_admin: np.ndarray, subset: Subset,
+                    threshold: float = 0) -> pd.DataFrame:
+    """Convert a subset's admin-to-admin matrix to an edge list
+
+    Args:
+        admin_admin: Matrix from :py:func:`make_admin_admin_subset`
+        subset: The subset
+        threshold: Minimum flow to keep. Zero flows are always dropped.
+
+    Returns:
+        A DataFrame as returned by :py:func:`lib.flows.admin_admin_to_edges`,
+        but with the indices of the admins in the full matrix.
+    """
+    edges = admin_admin_to_edges(admin_admin, threshold)
+    edges['ORIGIN'] = subset.origins[edges['ORIGIN'].values]
+    edges['DESTINATION'] = subset.destinations[edges['DESTINATION'].values]
+    return edges
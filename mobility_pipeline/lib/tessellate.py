@@ -0,0 +1,125 @@
+"""Compute the Voronoi tessellation of the towers, clipped to the country
+
+This replaces the externally computed Voronoi JSON. The cells are computed
+from the tower coordinates returned by
+:py:func:`data_interface.load_towers`, so cell ``i`` is always the cell of
+tower ``i`` and the cells can never be misaligned with the towers.
+
+As in the externally computed tessellations, towers that share a location with
+an earlier tower, and towers whose cells lie entirely outside the country, get
+an empty cell: a :py:class:`shapely.geometry.MultiPolygon` with one
+zero-area polygon, the same as :py:func:`lib.voronoi.load_cell` returns for a
+feature with no geometry.
+"""
+
+from typing import List, Sequence
+import numpy as np  # type: ignore
+from scipy.spatial import Voronoi  # type: ignore
+from shapely.geometry import MultiPolygon, Polygon  # type: ignore
+from shapely.ops import unary_union  # type: ignore
+from shapely.strtree import STRtree  # type: ignore
+
+
+def empty_cell() -> MultiPolygon:
+    """Make the cell used for towers that have no area
+
+    Returns:
+        A :py:class:`shapely.geometry.MultiPolygon` with one zero-area polygon
+    """
+    return MultiPolygon([Polygon([[0, 0], [0, 0], [0, 0]])])
+
+
+def to_multipolygon(geometry) -> MultiPolygon:
+    """Keep only the polygons of a geometry, as a MultiPolygon
+
+    Intersections of polygons can include points and lines where the polygons
+    only touch. These are dropped.
+
+    Args:
+        geometry: A shapely geometry
+
+    Returns:
+        A :py:class:`shapely.geometry.MultiPolygon` of the polygons in the
+        geometry, or :py:func:`empty_cell` if it has none.
+    """
+    if isinstance(geometry, Polygon):
+        polygons = [geometry]
+    elif hasattr(geometry, 'geoms'):
+        polygons = [part for part in geometry.geoms
+                    if isinstance(part, Polygon)]
+        polygons += [polygon for part in geometry.geoms
+                     if isinstance(part, MultiPolygon)
+                     for polygon in part.geoms]
+    else:
+        polygons = []
+    polygons = [polygon for polygon in polygons if polygon.area > 0]
+    if not polygons:
+        return empty_cell()
+    return MultiPolygon(polygons)
+
+
+def voronoi_regions(towers: np.ndarray) -> List[Polygon]:
+    """Compute a bounded Voronoi region for each of a set of distinct points
+
+    Four points are added far outside the towers so that every tower's region
+    is finite. The regions of towers on the edge of the set therefore extend
+    well beyond the towers and should be clipped.
+
+    Args:
+        towers: Distinct tower coordinates, one ``[x, y]`` row per tower. At
+            least one tower is needed.
+
+    Returns:
+        The Voronoi region of each tower, in tower order
+    """
+    min_xy = towers.min(axis=0)
+    max_xy = towers.max(axis=0)
+    center = (min_xy + max_xy) / 2
+    span = max(float((max_xy - min_xy).max()), 1.0)
+    far = center + 10 * span * np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]])
+    voronoi = Voronoi(np.vstack([towers, far]))
+    return [Polygon(voronoi.vertices[voronoi.regions[region_index]])
+            for region_index in voronoi.point_region[:len(towers)]]
+
+
+def tessellate(towers: np.ndarray,
+               outline_cells: Sequence[MultiPolygon]) -> List[MultiPolygon]:
+    """Compute the Voronoi cell of each tower, clipped to the country
+
+    The country outline is the union of ``outline_cells``, usually the admin
+    cells. Rather than computing that union, which is slow for detailed
+    borders, each Voronoi region is intersected only with the admin cells
+    an :py:class:`shapely.strtree.STRtree` finds near it.
+
+    Args:
+        towers: Tower coordinates, one ``[x, y]`` row per tower, as returned by
+            :py:func:`data_interface.load_towers`
+        outline_cells: Cells whose union is the area to tessellate
+
+    Returns:
+        The cell of each tower, in tower order. Towers located at the same
+        point as an earlier tower, and towers whose region lies outside the
+        outline, get :py:func:`empty_cell`.
+    """
+    if len(towers) == 0:
+        return []
+    unique_towers, first_index = np.unique(towers, axis=0, return_index=True)
+    # np.unique sorts the points, so restore tower order
+    order = np.argsort(first_index)
+    unique_towers = unique_towers[order]
+    first_index = first_index[order]
+    if len(unique_towers) < 3:
+        # scipy needs at least 3 points, so add distinct ones far away
+        regions = voronoi_regions(np.vstack([
+            unique_towers,
+            unique_towers[0] + np.array([[1e6, 0], [0, 1e6]])]))
+    else:
+        regions = voronoi_regions(unique_towers)
+
+    tree = STRtree(list(outline_cells))
+    cells = [empty_cell() for _ in range(len(towers))]
+    for region, tower_index in zip(regions, first_index):
+        pieces = [region.intersection(cell) for cell in tree.query(region)]
+        cells[tower_index] = to_multipolygon(unary_union(pieces)) \
+            if pieces else empty_cell()
+    return cells
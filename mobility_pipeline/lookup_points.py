@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+"""Find the Voronoi cell and admin containing each point in a CSV file"""
+
+from argparse import ArgumentParser
+from os import path
+
+from data_interface import (
+    load_admin_cells,
+    load_voronoi_cells,
+    load_towers,
+    open_input,
+    DATA_PATH,
+    LOOKUP_TEMPLATE,
+    TOWERS_PATH,
+    VORONOI_PATH,
+)
+
+
+DESCRIPTION = f"""Find the Voronoi cell and admin containing each point
+
+Reads points_path, a CSV file with a header whose --x-column and --y-column
+hold the longitude and latitude of each point, and writes it to output_path
+with two more columns: TOWER, the index of the tower whose Voronoi cell
+contains the point, and ADMIN, the index of the admin containing it. Either
+is -1 if no cell or admin contains the point.
+
+The lookup index is built from the towers, their Voronoi cells, and
+DATA_PATH/[country_id]-shape.json, where DATA_PATH =
+'{path.abspath(DATA_PATH)}'. It is saved to DATA_PATH/[country_id]-lookup.pkl
+and reused while the towers and cells it was built from are unchanged, unless
+--rebuild is given."""
+
+
+def load_lookup(country_id, voronoi_path, towers_path, rebuild):
+    """Load the saved lookup index, or build and save it if it is stale
+
+    The saved index is stale if the fingerprint of the towers and cells it
+    was built from differs from that of the current ones.
+
+    Args:
+        country_id: Country identifier
+        voronoi_path: Path to the Voronoi tessellation GeoJSON
+        towers_path: Path to the towers CSV
+        rebuild: Whether to build the index even if it is up to date
+
+    Returns:
+        The :py:class:`lib.lookup.PointLookup`
+    """
+    # lib.lookup uses shapely, so --help skips it
+    # pylint: disable=import-outside-toplevel
+    from lib.lookup import PointLookup, fingerprint_inputs
+
+    lookup_path = LOOKUP_TEMPLATE % country_id
+    towers = load_towers(towers_path)
+    tower_cells = load_voronoi_cells(voronoi_path)
+    admin_cells = load_admin_cells(country_id)
+    if not rebuild and path.exists(lookup_path):
+        lookup = PointLookup.load(lookup_path)
+        # Indices saved before fingerprints were kept have none
+        if getattr(lookup, 'fingerprint', None) == fingerprint_inputs(
+                towers, tower_cells, admin_cells):
+            print(f"Using the lookup index at {lookup_path}")
+            return lookup
+        print(f"The lookup index at {lookup_path} was built from different "
+              f"towers or cells")
+    print("Building the lookup index")
+    lookup = PointLookup(towers, tower_cells, admin_cells)
+    lookup.save(lookup_path)
+    print(f"Lookup index saved as {lookup_path}")
+    return lookup
+
+
+def main():
+    """Called when script run"""
+    parser = ArgumentParser(
+        description=DESCRIPTION,
+        epilog="""https://github.com/codethechange/mobility_pipeline""",
+    )
+    parser.add_argument("country_id", action="store",
+                        help="Uniquely identifies country data in DATA_PATH")
+    parser.add_argument("points_path", action="store",
+                        help="Path to the CSV file of points")
+    parser.add_argument("output_path", action="store",
+                        help="Path to write the points with their towers and "
+                             "admins to")
+    parser.add_argument("--voronoi-path", action="store",
+                        default=VORONOI_PATH,
+                        help="Path to the Voronoi tessellation GeoJSON")
+    parser.add_argument("--towers-path", action="store", default=TOWERS_PATH,
+                        help="Path to the towers CSV")
+    parser.add_argument("--x-column", action="store", default="lon",
+                        help="Column of the points' longitudes")
+    parser.add_argument("--y-column", action="store", default="lat",
+                        help="Column of the points' latitudes")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Build the lookup index even if it is up to "
+                             "date")
+    args = parser.parse_args()
+
+    # pandas is imported after parsing the arguments to keep --help fast
+    # pylint: disable=import-outside-toplevel
+    import pandas as pd  # type: ignore
+
+    with open_input(args.points_path) as f:
+        points = pd.read_csv(f)
+    for column in (args.x_column, args.y_column):
+        if column not in points.columns:
+            parser.error(f"{args.points_path} has no column {column}")
+    lookup = load_lookup(args.country_id, args.voronoi_path,
+                         args.towers_path, args.rebuild)
+    towers, admins = lookup.lookup(
+        points[[args.x_column, args.y_column]].values)
+    points['TOWER'] = towers
+    points['ADMIN'] = admins
+    points.to_csv(args.output_path, index=False)
+    print(f"Towers and admins of {len(points)} points saved as "
+          f"{args.output_path}")
+
+
+if __name__ == "__main__":
+    main()
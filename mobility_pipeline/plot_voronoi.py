@@ -8,9 +8,8 @@ of towers and number of cells. Towers without an associated cell are shown in
 green, while other towers are shown in red.
 """
 
-from matplotlib import pyplot as plt  # type: ignore
-from shapely.geometry import MultiPolygon  # type: ignore
-from descartes import PolygonPatch  # type: ignore
+from argparse import ArgumentParser
+import numpy as np  # type: ignore
 from data_interface import(
     load_voronoi_cells,
     load_towers,
@@ -19,49 +18,58 @@ from data_interface import(
 )
 
 
-def plot_polygon(axes: plt.axes, polygon: MultiPolygon) -> None:
-    """Add a polygon to an axes
+DESCRIPTION = """Plot the Voronoi tessellation and the towers
 
-    Args:
-        axes: The axes to add the polygon to
-        polygon: The polygon to add
+All the cells are drawn as one collection and all the towers with one
+scatter, with the cell borders simplified to the resolution of the figure
+(unless --full-detail is given). With --output, the plot is saved to that
+file, in the format given by its extension, without opening a window."""
 
-    Returns:
-        None
-    """
-    patch = PolygonPatch(polygon, facecolor=[0, 0, 0.5], edgecolor=[0, 0, 0],
-                         alpha=0.5)
-    axes.add_patch(patch)
 
+def main():
+    """Main function that generates the plot"""
+    parser = ArgumentParser(
+        description=DESCRIPTION,
+        epilog="""https://github.com/codethechange/mobility_pipeline""",
+    )
+    parser.add_argument("--voronoi-path", action="store",
+                        default=VORONOI_PATH,
+                        help="Path to the Voronoi tessellation GeoJSON")
+    parser.add_argument("--towers-path", action="store", default=TOWERS_PATH,
+                        help="Path to the towers CSV")
+    parser.add_argument("--output", action="store", metavar="PATH",
+                        help="Save the plot to PATH instead of showing it")
+    parser.add_argument("--dpi", action="store", type=float, default=100,
+                        help="Resolution of the plot in pixels per inch")
+    parser.add_argument("--full-detail", action="store_true",
+                        help="Draw every vertex of the cell borders")
+    args = parser.parse_args()
 
-if __name__ == '__main__':
-    # pragma pylint: disable=invalid-name
-    cells = load_voronoi_cells(VORONOI_PATH)
-    towers = load_towers(TOWERS_PATH)
-    print('Number of Cells: ', len(cells), 'Number of Towers: ', len(towers))
-
-    # Learned how to plot from:
-    # https://chrishavlin.com/2016/11/28/shapefiles-in-python-polygons/
-    plt.ioff()
+    # lib.render uses matplotlib and shapely, so we import it after parsing
+    # the arguments to keep --help fast
+    # pylint: disable=import-outside-toplevel
+    from lib.render import (
+        add_cells,
+        add_points,
+        cells_bounds,
+        make_figure,
+        pixel_size,
+        show_or_save,
+    )
 
-    fig = plt.figure()
-    # (left, bottom, width, height) in units of fractions of figure dimensions
-    ax = fig.add_axes((0.1, 0.1, 0.9, 0.9))
-    ax.set_aspect(1)
+    cells = load_voronoi_cells(args.voronoi_path)
+    towers = load_towers(args.towers_path)
+    print('Number of Cells: ', len(cells), 'Number of Towers: ', len(towers))
 
-    no_coor_indices = []
-    for i, cell in enumerate(cells):
-        plot_polygon(ax, cell)
-        if cell.area == 0:
-            no_coor_indices.append(i)
-    for i, (lat, lng) in enumerate(towers):
-        color = 'red'
-        if i in no_coor_indices:
-            color = 'green'
-        ax.plot(lat, lng, color=color, marker='o', markersize=2, alpha=0.5)
+    fig, axes = make_figure(args.output, dpi=args.dpi)
+    tolerance = 0 if args.full_detail \
+        else pixel_size(cells_bounds(cells), dpi=args.dpi) / 2
+    add_cells(axes, cells, tolerance=tolerance)
+    no_coords = np.zeros(len(towers), dtype=bool)
+    no_coords[:len(cells)] = [cell.area == 0 for cell in cells]
+    add_points(axes, towers, np.where(no_coords, 'green', 'red'))
+    show_or_save(fig, axes, args.output)
 
-    # Showed how to auto-resize axes: https://stackoverflow.com/a/11039268
-    ax.relim()
-    ax.autoscale_view()
 
-    plt.show()
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+"""Sum admin-to-admin matrices over ranges of days from a country's cube"""
+
+from argparse import ArgumentParser
+from os import path
+
+from data_interface import (
+    save_admin_admin,
+    ADMIN_ADMIN_TEMPLATES,
+    CUBE_TEMPLATE,
+    DATA_PATH,
+)
+from lib.cube import MobilityCube, parse_day, ROLLUP_PERIODS
+
+
+DESCRIPTION = f"""Sum admin-to-admin matrices over ranges of days
+
+Reads the time series that gen_day_mobility.py --cube appends to at
+DATA_PATH/[country_id]-cube, where DATA_PATH = '{path.abspath(DATA_PATH)}'.
+Because the cube stores running sums, each sum reads only two matrices, no
+matter how many days it covers.
+
+With --start and --end, the matrices of the days between them (inclusive)
+are summed and saved as day [start]-[end], where either defaults to the first
+or last day in the cube. With --rollup week or --rollup month, one sum is
+saved for every week (labeled by ISO week, like 2015-W05) or month (like
+2015-02) with days in the cube. With --mean, the sums are divided by the
+number of days in the cube they cover.
+
+The sums are saved like daily matrices, as
+DATA_PATH/[country_id]-[label]-admin-to-admin.csv or a similarly named file
+for the other formats."""
+
+
+def main():
+    """Called when script run"""
+    parser = ArgumentParser(
+        description=DESCRIPTION,
+        epilog="""https://github.com/codethechange/mobility_pipeline""",
+    )
+    parser.add_argument("country_id", action="store",
+                        help="Uniquely identifies country data in DATA_PATH")
+    parser.add_argument("--start", action="store", metavar="DAY_ID",
+                        help="First day of the range to sum")
+    parser.add_argument("--end", action="store", metavar="DAY_ID",
+                        help="Last day of the range to sum")
+    parser.add_argument("--rollup", action="store", choices=ROLLUP_PERIODS,
+                        help="Sum over every period instead of one range")
+    parser.add_argument("--mean", action="store_true",
+                        help="Divide each sum by its number of days")
+    parser.add_argument("--format", action="store", default="csv",
+                        choices=sorted(ADMIN_ADMIN_TEMPLATES),
+                        help="Format to save the matrices in")
+    parser.add_argument("--threshold", action="store", type=float, default=0,
+                        help="Minimum flow to save in the edges and npz "
+                             "formats")
+    parser.add_argument("--top-k", action="store", type=int, default=10,
+                        help="Destinations per origin in the top_k format")
+    args = parser.parse_args()
+    if args.rollup and (args.start or args.end):
+        parser.error("--rollup cannot be used with --start or --end")
+
+    cube = MobilityCube(CUBE_TEMPLATE % args.country_id)
+    if not len(cube):
+        parser.error(f"no days in the cube of {args.country_id}")
+    print(f"Cube has {len(cube)} days from {cube.dates[0]} to "
+          f"{cube.dates[-1]}")
+
+    if args.rollup:
+        sums = [(rollup.label, rollup.total, rollup.n_days)
+                for rollup in cube.rollup(args.rollup)]
+    else:
+        try:
+            start = parse_day(args.start) if args.start else cube.dates[0]
+            end = parse_day(args.end) if args.end else cube.dates[-1]
+        except ValueError as e:
+            parser.error(str(e))
+        total, n_days = cube.range_sum(start, end)
+        label = f"{start:%Y%m%d}-{end:%Y%m%d}"
+        sums = [(label, total, n_days)]
+
+    for label, total, n_days in sums:
+        if args.mean and n_days:
+            total = total / n_days
+        mat_path = save_admin_admin(args.country_id, label, total,
+                                    args.format, args.threshold, args.top_k)
+        print(f"Sum over {n_days} days saved as {mat_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+"""Benchmark the pipeline on synthetic countries of increasing size"""
+
+from argparse import ArgumentParser
+import json
+from tempfile import TemporaryDirectory
+
+from benchmarks.cases import CASES, run_case, sweep_sizes
+
+
+DESCRIPTION = """Benchmark the pipeline on seeded synthetic countries
+
+For every combination of tower count, admin grid size, and border vertex count,
+generates a synthetic country and measures the wall time, CPU time, and peak
+memory of each benchmark case. The results are written as a JSON list with one
+record per country size and case, so runs before and after a change can be
+compared."""
+
+
+def main():
+    """Called when script run"""
+    parser = ArgumentParser(
+        description=DESCRIPTION,
+        epilog="""https://github.com/codethechange/mobility_pipeline""",
+    )
+    parser.add_argument("output_path", action="store",
+                        help="Path to write the JSON results to")
+    parser.add_argument("--towers", action="store", type=int, nargs="+",
+                        default=[100, 1000], help="Tower counts to sweep")
+    parser.add_argument("--admins-side", action="store", type=int, nargs="+",
+                        default=[5, 10],
+                        help="Admin grid side lengths to sweep")
+    parser.add_argument("--vertices", action="store", type=int, nargs="+",
+                        default=[4, 32],
+                        help="Vertices per admin border segment to sweep")
+    parser.add_argument("--density", action="store", type=float, default=0.1,
+                        help="Fraction of tower pairs with mobility")
+    parser.add_argument("--cases", action="store", nargs="+",
+                        choices=sorted(CASES), default=sorted(CASES),
+                        help="Cases to run")
+    parser.add_argument("--repeat", action="store", type=int, default=3,
+                        help="Number of timed runs of each case")
+    parser.add_argument("--seed", action="store", type=int, default=0,
+                        help="Seed for generating the synthetic countries")
+    args = parser.parse_args()
+
+    # benchmarks.synthetic uses pandas and shapely, so we import it after
+    # parsing the arguments to keep --help fast
+    # pylint: disable=import-outside-toplevel
+    from benchmarks.synthetic import make_country
+
+    results = []
+    for sizes in sweep_sizes(args.towers, args.admins_side, args.vertices):
+        country = make_country(density=args.density, seed=args.seed, **sizes)
+        for case in args.cases:
+            with TemporaryDirectory() as scratch:
+                measurements = run_case(case, country, scratch, args.repeat)
+            record = dict(case=case, density=args.density, seed=args.seed,
+                          **sizes, **measurements)
+            print(json.dumps(record))
+            results.append(record)
+
+    with open(args.output_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved as {args.output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+
+"""Run the pipeline stages for several countries and days, skipping
+up-to-date outputs"""
+
+from argparse import ArgumentParser
+import json
+from os import path
+import sys
+from typing import Dict, List, Optional
+
+from data_interface import (
+    load_voronoi_cells,
+    convert_shape_to_json,
+    load_admin_cells,
+    save_admin_tower,
+    save_tower_admin,
+    load_mobility,
+    load_admin_tower,
+    load_tower_admin,
+    save_admin_admin,
+    load_tower_remap,
+    save_tower_remap,
+    load_towers,
+    ADMIN_GEOJSON_TEMPLATE,
+    ADMIN_ADMIN_TEMPLATES,
+    ADMIN_TOWER_TEMPLATE,
+    TOWER_ADMIN_TEMPLATE,
+    TOWER_REMAP_TEMPLATE,
+    DATA_PATH,
+)
+from lib.jobs import Job, run_jobs, RAN, SKIPPED
+from lib.precision import FLOAT32_POLICY, FLOAT64_POLICY
+
+
+DESCRIPTION = f"""Run the pipeline for the countries and days in a config file
+
+The config file is JSON with a list of countries, for example:
+
+    {{"countries": [
+        {{"country_id": "br2",
+          "shapefile": "data/gadm36_BRA_2",
+          "voronoi": "data/brazil-voronoi.json",
+          "float32": false,
+          "canonicalize": false,
+          "towers": "data/towers_br.csv",
+          "days": {{"20150201": "data/mobility_matrix_20150201.csv"}}}}
+    ]}}
+
+For each country, this converts the shapefile to GeoJSON (skipped if
+"shapefile" is omitted and DATA_PATH/[country_id]-shape.json exists), computes
+the tower-to-admin and admin-to-tower matrices as gen_country_matrices.py
+does, and computes the admin-to-admin matrix for each day as
+gen_day_mobility.py does. "canonicalize" and "towers" have the same meaning
+as gen_country_matrices.py's --canonicalize and --towers options. Here,
+DATA_PATH = '{path.abspath(DATA_PATH)}'.
+
+Each output is fingerprinted by the contents of the files it was computed
+from. Outputs whose inputs have not changed since they were last computed are
+skipped, so re-running after adding days or after a crash only does the
+remaining work. Fingerprints are stored in the --state file. Independent
+stages, like different countries or days, run in parallel on --workers
+processes."""
+
+
+def shape_job(shapefile_path_prefix: str, country_id: str) -> None:
+    """Convert a country's shapefile to GeoJSON
+
+    Args:
+        shapefile_path_prefix: Path to the shapefile, without file extension
+        country_id: Uniquely identifies the country and admin level
+
+    Returns:
+        None
+    """
+    convert_shape_to_json(shapefile_path_prefix, country_id)
+
+
+def overlaps_job(country_id: str, voronoi_path: str, float32: bool,
+                 canonical: bool = False,
+                 towers_path: Optional[str] = None) -> None:
+    """Compute and save a country's tower-to-admin and admin-to-tower matrices
+
+    Args:
+        country_id: Uniquely identifies the country and admin level
+        voronoi_path: Path to the Voronoi tessellation
+        float32: Whether to compute in single precision
+        canonical: Whether to compute the matrices for representative towers
+        towers_path: Path to the towers CSV, used to merge co-located towers
+            when ``canonical`` is true
+
+    Returns:
+        None
+    """
+    # These use shapely, so only the jobs import them, keeping --help fast
+    # pylint: disable=import-outside-toplevel
+    from lib.canonical import canonicalize
+    from lib.make_matrix import (
+        make_tower_to_admin_matrix,
+        make_admin_to_tower_matrix,
+    )
+
+    policy = FLOAT32_POLICY if float32 else FLOAT64_POLICY
+    tower_cells = load_voronoi_cells(voronoi_path)
+    admin_cells = load_admin_cells(country_id)
+    remap = None
+    if canonical:
+        towers = load_towers(towers_path) if towers_path else None
+        remap, representatives = canonicalize(tower_cells, towers)
+        tower_cells = [tower_cells[i] for i in representatives]
+    save_tower_admin(country_id, make_tower_to_admin_matrix(
+        tower_cells, admin_cells, policy.operator_dtype))
+    save_admin_tower(country_id, make_admin_to_tower_matrix(
+        admin_cells, tower_cells, policy.operator_dtype))
+    save_tower_remap(country_id, remap)
+
+
+def day_job(country_id: str, day_id: str, mobility_path: str,
+            float32: bool) -> None:
+    """Compute and save a country's admin-to-admin matrix for one day
+
+    Args:
+        country_id: Uniquely identifies the country and admin level
+        day_id: Uniquely identifies the day
+        mobility_path: Path to the day's mobility data
+        float32: Whether to compute in single precision
+
+    Returns:
+        None
+    """
+    # pylint: disable=import-outside-toplevel
+    from lib.make_matrix import (
+        make_tower_tower_matrix,
+        make_admin_admin_matrix,
+    )
+
+    policy = FLOAT32_POLICY if float32 else FLOAT64_POLICY
+    tower_admin_mat = load_tower_admin(country_id, policy.operator_dtype)
+    admin_tower_mat = load_admin_tower(country_id, policy.operator_dtype)
+    tower_tower_mat = make_tower_tower_matrix(load_mobility(mobility_path),
+                                              len(admin_tower_mat),
+                                              policy.operator_dtype,
+                                              load_tower_remap(country_id))
+    save_admin_admin(country_id, day_id, make_admin_admin_matrix(
+        tower_tower_mat, tower_admin_mat, admin_tower_mat))
+
+
+def make_jobs(config: Dict) -> List[Job]:
+    """Build the job graph described by a config
+
+    Args:
+        config: Parsed config file, as described in the script's help
+
+    Returns:
+        The jobs for every country and day in the config
+    """
+    jobs = []
+    for country in config['countries']:
+        country_id = country['country_id']
+        float32 = country.get('float32', False)
+        canonical = country.get('canonicalize', False)
+        towers_path = country.get('towers')
+        geojson_path = ADMIN_GEOJSON_TEMPLATE % country_id
+        overlaps_deps = ()
+        shapefile = country.get('shapefile')
+        if shapefile:
+            shapefile = path.splitext(shapefile)[0]
+            jobs.append(Job(
+                name=f'shape:{country_id}', action=shape_job,
+                args=(shapefile, country_id),
+                inputs=(f'{shapefile}.shp', f'{shapefile}.dbf'),
+                outputs=(geojson_path,)))
+            overlaps_deps = (f'shape:{country_id}',)
+        matrix_paths = (TOWER_ADMIN_TEMPLATE % country_id,
+                        ADMIN_TOWER_TEMPLATE % country_id)
+        overlaps_inputs = (country['voronoi'], geojson_path)
+        if canonical:
+            matrix_paths += (TOWER_REMAP_TEMPLATE % country_id,)
+            if towers_path:
+                overlaps_inputs += (towers_path,)
+        jobs.append(Job(
+            name=f'overlaps:{country_id}', action=overlaps_job,
+            args=(country_id, country['voronoi'], float32, canonical,
+                  towers_path if canonical else None),
+            inputs=overlaps_inputs, outputs=matrix_paths,
+            deps=overlaps_deps))
+        for day_id, mobility_path in sorted(country.get('days', {}).items()):
+            jobs.append(Job(
+                name=f'day:{country_id}:{day_id}', action=day_job,
+                args=(country_id, day_id, mobility_path, float32),
+                inputs=(mobility_path,) + matrix_paths,
+                outputs=(ADMIN_ADMIN_TEMPLATES['csv'] % (country_id, day_id),),
+                deps=(f'overlaps:{country_id}',)))
+    return jobs
+
+
+def main():
+    """Called when script run"""
+    parser = ArgumentParser(
+        description=DESCRIPTION,
+        epilog="""https://github.com/codethechange/mobility_pipeline""",
+    )
+    parser.add_argument("config_path", action="store",
+                        help="Path to the JSON config file")
+    parser.add_argument("--state", action="store",
+                        default=path.join(DATA_PATH, "jobs-state.json"),
+                        help="Path to the file recording completed jobs")
+    parser.add_argument("--workers", action="store", type=int, default=1,
+                        help="Maximum number of jobs to run at once")
+    args = parser.parse_args()
+
+    with open(args.config_path, 'r') as f:
+        config = json.load(f)
+    status = run_jobs(make_jobs(config), args.state, args.workers,
+                      use_processes=True)
+    n_ok = sum(s in (RAN, SKIPPED) for s in status.values())
+    print(f"{n_ok} of {len(status)} jobs up to date")
+    if n_ok != len(status):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+
+"""Long-running service that computes admin-to-admin matrices on request
+
+The tower-to-admin and admin-to-tower matrices for each country are loaded
+once when the service starts, so each request only pays for building the
+tower-to-tower matrix and multiplying.
+
+Endpoints:
+
+* ``GET /countries``: JSON list of the country identifiers being served.
+* ``POST /admin-admin/[country_id]``: Compute the admin-to-admin matrix for
+  one day of mobility data. The body is either a mobility CSV in the format
+  read by :py:func:`mobility_pipeline.data_interface.load_mobility` or, with
+  ``Content-Type: application/json``, an edge list of
+  ``[origin, destination, count]`` triples of tower indices. If the
+  ``day_id`` query parameter is given, which must match
+  :py:const:`DAY_ID_PATTERN`, the matrix is saved with
+  :py:func:`mobility_pipeline.data_interface.save_admin_admin` and the saved
+  path is returned as JSON, with the ``format``, ``threshold``, and ``top_k``
+  query parameters passed on to ``save_admin_admin``. Otherwise the matrix is
+  returned as CSV.
+"""
+
+from __future__ import annotations
+from argparse import ArgumentParser
+from io import BytesIO, StringIO
+import json
+import re
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import numpy as np  # type: ignore
+from waitress import serve  # type: ignore
+from webob import Request, Response  # type: ignore
+from webob.dec import wsgify  # type: ignore
+from webob import exc  # type: ignore
+
+from data_interface import (
+    load_mobility,
+    load_admin_tower,
+    load_tower_admin,
+    load_tower_remap,
+    save_admin_admin,
+    ADMIN_ADMIN_TEMPLATES,
+    INDEX_DTYPE,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd  # type: ignore
+
+# pandas and lib.make_matrix are imported by the functions that use them, so
+# that --help does not wait for them
+# pylint: disable=import-outside-toplevel
+
+
+DESCRIPTION = """Serve admin-to-admin matrix computations over HTTP
+
+The tower-to-admin and admin-to-tower matrices for each country_id are loaded
+once at startup. POST one day of mobility data to /admin-admin/[country_id] to
+get the admin-to-admin matrix back as CSV, or add ?day_id=[day_id] to save it
+under DATA_PATH instead. Requests are handled concurrently by a pool of
+threads."""
+
+DAY_ID_PATTERN = re.compile(r'[A-Za-z0-9][A-Za-z0-9_.-]*')
+"""Pattern the ``day_id`` query parameter must match, so that the paths it is
+substituted into stay within DATA_PATH"""
+
+
+def parse_edge_list(body: bytes) -> pd.DataFrame:
+    """Parse a JSON edge list into mobility data
+
+    Args:
+        body: JSON list of ``[origin, destination, count]`` triples, where
+            origin and destination are tower indices
+
+    Returns:
+        A DataFrame in the format returned by
+        :py:func:`mobility_pipeline.data_interface.load_mobility`
+
+    Raises:
+        ValueError: If ``body`` is not JSON, is not a list of triples, or
+            holds a count that is not a finite number or an origin or
+            destination that is not a non-negative integer
+    """
+    import pandas as pd  # type: ignore
+    try:
+        edges = np.array(json.loads(body.decode('utf-8')), dtype=float)
+    except TypeError as e:
+        raise ValueError(f'Edges must be lists of numbers: {e}') from e
+    if edges.size == 0:
+        edges = edges.reshape(0, 3)
+    if edges.ndim != 2 or edges.shape[1] != 3:
+        raise ValueError('Expected a list of [origin, destination, count] '
+                         'triples')
+    if not np.isfinite(edges).all():
+        raise ValueError('Edges must be finite numbers')
+    towers = edges[:, :2]
+    if ((towers < 0) | (towers != np.floor(towers))).any():
+        raise ValueError('Origins and destinations must be tower indices')
+    towers = towers.astype(INDEX_DTYPE)
+    return pd.DataFrame({'ORIGIN': towers[:, 0], 'DESTINATION': towers[:, 1],
+                         'COUNT': edges[:, 2]})
+
+
+class MatrixService:
+    """WSGI application that holds country matrices in memory
+
+    Args:
+        country_ids: Identifiers of the countries whose tower-to-admin and
+            admin-to-tower matrices should be loaded
+    """
+
+    def __init__(self, country_ids: List[str]) -> None:
+        self.operators: Dict[str, Tuple[np.ndarray, np.ndarray,
+                                        Optional[np.ndarray]]] = {}
+        for country_id in country_ids:
+            print(f"Loading matrices for {country_id}")
+            self.operators[country_id] = (load_tower_admin(country_id),
+                                          load_admin_tower(country_id),
+                                          load_tower_remap(country_id))
+
+    def compute(self, country_id: str, mobility: pd.DataFrame) -> np.ndarray:
+        """Compute the admin-to-admin matrix for one day of mobility data
+
+        Args:
+            country_id: Identifier of a loaded country
+            mobility: Mobility data as returned by
+                :py:func:`mobility_pipeline.data_interface.load_mobility`
+
+        Returns:
+            The admin-to-admin matrix
+        """
+        from lib.make_matrix import (
+            make_tower_tower_matrix,
+            make_admin_admin_matrix,
+        )
+        tower_admin_mat, admin_tower_mat, remap = self.operators[country_id]
+        tower_tower_mat = make_tower_tower_matrix(mobility,
+                                                  len(admin_tower_mat),
+                                                  remap=remap)
+        return make_admin_admin_matrix(tower_tower_mat, tower_admin_mat,
+                                       admin_tower_mat)
+
+    @wsgify
+    def __call__(self, request: Request) -> Response:
+        """Route a request to the matching endpoint"""
+        parts = request.path_info.strip('/').split('/')
+        if parts == ['countries'] and request.method == 'GET':
+            return Response(json_body=sorted(self.operators))
+        if len(parts) == 2 and parts[0] == 'admin-admin':
+            if request.method != 'POST':
+                raise exc.HTTPMethodNotAllowed()
+            return self.admin_admin(request, parts[1])
+        raise exc.HTTPNotFound()
+
+    def admin_admin(self, request: Request, country_id: str) -> Response:
+        """Handle a request for an admin-to-admin matrix"""
+        if country_id not in self.operators:
+            raise exc.HTTPNotFound(f'Country {country_id} is not loaded')
+        day_id = request.params.get('day_id')
+        if day_id:
+            if not DAY_ID_PATTERN.fullmatch(day_id):
+                raise exc.HTTPBadRequest(
+                    f'Invalid day_id {day_id!r}: it may only contain letters, '
+                    f'digits, and "_.-", and must start with a letter or '
+                    f'digit')
+            output_format = request.params.get('format', 'csv')
+            if output_format not in ADMIN_ADMIN_TEMPLATES:
+                raise exc.HTTPBadRequest(f'Unknown format {output_format}')
+            try:
+                threshold = float(request.params.get('threshold', 0))
+                top_k = int(request.params.get('top_k', 10))
+            except ValueError as e:
+                raise exc.HTTPBadRequest(f'Invalid parameter: {e!r}')
+        try:
+            if request.content_type == 'application/json':
+                mobility = parse_edge_list(request.body)
+            else:
+                mobility = load_mobility(BytesIO(request.body))
+        except (ValueError, KeyError) as e:
+            raise exc.HTTPBadRequest(f'Invalid mobility data: {e!r}')
+
+        admin_admin_mat = self.compute(country_id, mobility)
+        if day_id:
+            mat_path = save_admin_admin(country_id, day_id, admin_admin_mat,
+                                        output_format, threshold, top_k)
+            return Response(json_body={'path': mat_path})
+        buffer = StringIO()
+        np.savetxt(buffer, admin_admin_mat, delimiter=',')
+        return Response(body=buffer.getvalue().encode('utf-8'),
+                        content_type='text/csv')
+
+
+def main():
+    """Called when script run"""
+    parser = ArgumentParser(
+        description=DESCRIPTION,
+        epilog="""https://github.com/codethechange/mobility_pipeline""",
+    )
+    parser.add_argument("country_ids", action="store", nargs="+",
+                        help="Countries whose matrices should be served")
+    parser.add_argument("--host", action="store", default="127.0.0.1",
+                        help="Host to listen on")
+    parser.add_argument("--port", action="store", type=int, default=8080,
+                        help="Port to listen on")
+    parser.add_argument("--unix-socket", action="store",
+                        help="Listen on this unix socket instead of a port")
+    parser.add_argument("--threads", action="store", type=int, default=4,
+                        help="Number of requests to handle concurrently")
+    args = parser.parse_args()
+
+    app = MatrixService(args.country_ids)
+    if args.unix_socket:
+        serve(app, unix_socket=args.unix_socket, threads=args.threads)
+    else:
+        serve(app, host=args.host, port=args.port, threads=args.threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,11 +6,8 @@ values from the tower-to-admin matrix printed. This lets you check that the
 matrix values seem reasonable.
 """
 
-from random import uniform as rand
-from matplotlib import pyplot as plt  # type: ignore
-from shapely.geometry import MultiPolygon  # type: ignore
-from descartes import PolygonPatch  # type: ignore
-from lib.make_matrix import make_a_to_b_matrix
+from argparse import ArgumentParser
+import numpy as np  # type: ignore
 from data_interface import (
     load_admin_cells,
     load_voronoi_cells,
@@ -22,51 +19,69 @@ from data_interface import (
 I_TOWER_TO_COLOR = 1
 """Index of Voronoi cell to show."""
 
+DESCRIPTION = """Plot one Voronoi cell over the admins it overlaps
 
-def plot_polygon(axes: plt.axes, polygon: MultiPolygon, color, _label="") \
-        -> None:
-    """Plot a polygon (or multipolygon) with matplotlib
-
-    Args:
-        axes: The matplotlib axes to plot on
-        polygon: The polygon to plot
-        color: Color to use for shading the polygon
-        _label: Label for the polygon that will be displayed in the legend
-
-    Returns:
-        None
-    """
-    patch = PolygonPatch(polygon, facecolor=color, edgecolor=[0, 0, 0],
-                         alpha=0.3, label=_label)
-    axes.add_patch(patch)
+Prints the tower-to-admin matrix values of the cell, computing only the
+overlaps of that one cell, and draws all the admins, coloring the ones the
+cell overlaps. The admins are drawn as one collection, with their borders
+simplified to the resolution of the figure (unless --full-detail is given).
+With --output, the plot is saved to that file, in the format given by its
+extension, without opening a window."""
 
 
 def main():
     """Main function that generates the plot"""
-    admin_cells = load_admin_cells(COUNTRY_ID)
-    tower_cells = load_voronoi_cells(VORONOI_PATH)
-    mat = make_a_to_b_matrix(tower_cells, admin_cells)
-    for i in range(len(mat[:, I_TOWER_TO_COLOR])):
-        if mat[i, I_TOWER_TO_COLOR] != 0:
-            print(str(i), mat[i, I_TOWER_TO_COLOR])
-    plt.ioff()
-    fig = plt.figure()
-    # (left, bottom, width, height) in units of fractions of figure dimensions
-    axes = fig.add_axes((0.1, 0.1, 0.9, 0.9))
-    axes.set_aspect(1)
+    parser = ArgumentParser(
+        description=DESCRIPTION,
+        epilog="""https://github.com/codethechange/mobility_pipeline""",
+    )
+    parser.add_argument("--tower", action="store", type=int,
+                        default=I_TOWER_TO_COLOR,
+                        help="Index of the Voronoi cell to show")
+    parser.add_argument("--country-id", action="store", default=COUNTRY_ID,
+                        help="Uniquely identifies the admins in DATA_PATH")
+    parser.add_argument("--voronoi-path", action="store",
+                        default=VORONOI_PATH,
+                        help="Path to the Voronoi tessellation GeoJSON")
+    parser.add_argument("--output", action="store", metavar="PATH",
+                        help="Save the plot to PATH instead of showing it")
+    parser.add_argument("--dpi", action="store", type=float, default=100,
+                        help="Resolution of the plot in pixels per inch")
+    parser.add_argument("--full-detail", action="store_true",
+                        help="Draw every vertex of the admin borders")
+    args = parser.parse_args()
+
+    # These use matplotlib and shapely, so we import them after parsing the
+    # arguments to keep --help fast
+    # pylint: disable=import-outside-toplevel
+    from matplotlib.patches import Patch  # type: ignore
+    from lib.query import OverlapQuery
+    from lib.render import (
+        add_cells,
+        cells_bounds,
+        make_figure,
+        pixel_size,
+        show_or_save,
+    )
 
-    for i, admin in enumerate(admin_cells):
-        if mat[i, I_TOWER_TO_COLOR] != 0:
-            plot_polygon(axes, admin, [rand(0, 1), rand(0, 1), rand(0, 1)],
-                         str(i))
-        else:
-            plot_polygon(axes, admin, [0.1, 0, 0])
-    plot_polygon(axes, tower_cells[I_TOWER_TO_COLOR], [0, 0, 0])
+    admin_cells = load_admin_cells(args.country_id)
+    tower_cells = load_voronoi_cells(args.voronoi_path)
+    column = OverlapQuery(tower_cells, admin_cells).tower_admin_column(
+        args.tower)
+    overlapping = np.flatnonzero(column)
+    for i in overlapping:
+        print(str(i), column[i])
 
-    axes.relim()
-    axes.autoscale_view()
-    plt.legend()
-    plt.show()
+    fig, axes = make_figure(args.output, dpi=args.dpi)
+    tolerance = 0 if args.full_detail \
+        else pixel_size(cells_bounds(admin_cells), dpi=args.dpi) / 2
+    colors = np.tile([0.1, 0, 0], (len(admin_cells), 1))
+    colors[overlapping] = np.random.uniform(0, 1, (len(overlapping), 3))
+    add_cells(axes, admin_cells, colors, alpha=0.3, tolerance=tolerance)
+    add_cells(axes, [tower_cells[args.tower]], [0, 0, 0], alpha=0.3)
+    handles = [Patch(facecolor=colors[i], edgecolor=[0, 0, 0], alpha=0.3,
+                     label=str(i)) for i in overlapping]
+    show_or_save(fig, axes, args.output, handles)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,86 @@
+# pragma pylint: disable=missing-docstring
+
+import numpy as np
+import pandas as pd
+from mobility_pipeline.lib.aggregate import TowerTowerAggregator
+from mobility_pipeline.lib.make_matrix import make_tower_tower_matrix
+
+
+HOUR = 3600
+
+
+def test_aggregate_simple():
+    agg = TowerTowerAggregator()
+    agg.add_events(['a', 'a', 'b', 'b', 'c'],
+                   [1, 5, 2, 3, 4],
+                   [0, 1, 1, 1, 2])
+    mobility = agg.to_mobility()
+    expected = [[0, 1, 1],
+                [1, 1, 1],
+                [2, 2, 1]]
+    assert mobility.values.tolist() == expected
+    assert agg.n_devices == 3
+
+
+def test_aggregate_across_chunks():
+    agg = TowerTowerAggregator(initial_capacity=1)
+    agg.add_chunk(pd.DataFrame({'DEVICE': [7, 8],
+                                'TIMESTAMP': [10, 10],
+                                'TOWER': [2, 0]}))
+    agg.add_chunk(pd.DataFrame({'DEVICE': [7, 8, 7],
+                                'TIMESTAMP': [20, 5, 1],
+                                'TOWER': [1, 1, 0]}))
+    mobility = agg.to_mobility()
+    expected = [[0, 1, 1],
+                [1, 0, 1]]
+    assert mobility.values.tolist() == expected
+
+
+def test_aggregate_windows():
+    agg = TowerTowerAggregator(morning=(6 * HOUR, 10 * HOUR),
+                               evening=(17 * HOUR, 23 * HOUR))
+    agg.add_events(['a', 'a', 'a', 'a', 'b'],
+                   [2 * HOUR, 7 * HOUR, 18 * HOUR, 23 * HOUR + 1, 8 * HOUR],
+                   [3, 0, 2, 3, 1])
+    mobility = agg.to_mobility()
+    # Device b never appears in the evening window, so it is not counted
+    assert mobility.values.tolist() == [[0, 2, 1]]
+
+
+def test_aggregate_windows_in_local_time():
+    # At UTC-3, 9:00 and 20:00 local time are 12:00 and 23:00 UTC
+    timestamps = [12 * HOUR, 23 * HOUR]
+    utc = TowerTowerAggregator(morning=(8 * HOUR, 10 * HOUR),
+                               evening=(19 * HOUR, 21 * HOUR))
+    utc.add_events(['a', 'a'], timestamps, [0, 1])
+    assert utc.to_mobility().values.tolist() == []
+
+    local = TowerTowerAggregator(morning=(8 * HOUR, 10 * HOUR),
+                                 evening=(19 * HOUR, 21 * HOUR),
+                                 utc_offset=-3 * HOUR)
+    local.add_events(['a', 'a'], timestamps, [0, 1])
+    assert local.to_mobility().values.tolist() == [[0, 1, 1]]
+
+    # Local time can wrap past midnight: 2:00 at UTC+5 is 21:00 UTC
+    east = TowerTowerAggregator(evening=(1 * HOUR, 3 * HOUR),
+                                utc_offset=5 * HOUR)
+    east.add_events(['b'], [21 * HOUR], [2])
+    assert east.to_mobility().values.tolist() == [[2, 2, 1]]
+
+
+def test_aggregate_sparse_matches_dense():
+    rng = np.random.RandomState(0)
+    n_towers = 5
+    devices = rng.randint(0, 50, size=1000)
+    timestamps = rng.randint(0, 24 * HOUR, size=1000)
+    towers = rng.randint(0, n_towers, size=1000)
+    agg = TowerTowerAggregator()
+    for start in range(0, 1000, 128):
+        end = start + 128
+        agg.add_events(devices[start:end], timestamps[start:end],
+                       towers[start:end])
+
+    dense = make_tower_tower_matrix(agg.to_mobility(), n_towers)
+    sparse = agg.to_sparse_matrix(n_towers)
+    assert np.all(sparse.toarray() == dense)
+    assert sparse.sum() == len(np.unique(devices))
@@ -0,0 +1,67 @@
+# pragma pylint: disable=missing-docstring
+
+from datetime import date, timedelta
+import numpy as np
+import pytest
+from mobility_pipeline.lib.baseline import Baseline
+
+
+def make_days(n_days, seed=0):
+    rng = np.random.RandomState(seed)
+    start = date(2015, 2, 2)
+    return [(start + timedelta(days=i), rng.uniform(1, 10, size=(3, 3)))
+            for i in range(n_days)]
+
+
+def test_matches_batch_statistics(tmp_path):
+    days = make_days(10)
+    baseline = Baseline(str(tmp_path / 'baseline.npz'))
+    for day, mat in days:
+        baseline.update(day, mat)
+    baseline.save()
+    baseline = Baseline(str(tmp_path / 'baseline.npz'))
+
+    history = np.array([mat for _, mat in days])
+    mean, std = history.mean(axis=0), history.std(axis=0, ddof=1)
+    new = np.full((3, 3), 5.0)
+    scores = baseline.score(date(2015, 3, 1), new)
+    assert scores.n_days == 10
+    assert np.allclose(scores.zscore, (new - mean) / std)
+    assert np.allclose(scores.change, 100 * (new - mean) / mean)
+
+
+def test_by_weekday(tmp_path):
+    days = make_days(21)
+    baseline = Baseline(str(tmp_path / 'baseline.npz'), by_weekday=True)
+    for day, mat in days:
+        baseline.update(day, mat)
+    mondays = np.array([mat for day, mat in days if day.weekday() == 0])
+    scores = baseline.score(date(2015, 2, 23), mondays[0])
+    assert scores.n_days == 3
+    assert np.allclose(scores.change,
+                       100 * (mondays[0] - mondays.mean(axis=0))
+                       / mondays.mean(axis=0))
+    baseline.save()
+    with pytest.raises(ValueError):
+        Baseline(str(tmp_path / 'baseline.npz'))
+
+
+def test_undefined_scores(tmp_path):
+    baseline = Baseline(str(tmp_path / 'baseline.npz'))
+    scores = baseline.score(date(2015, 2, 1), np.ones((2, 2)))
+    assert scores.n_days == 0 and np.isnan(scores.zscore).all()
+    baseline.update(date(2015, 2, 1), np.array([[0, 1], [2, 3]]))
+    scores = baseline.score(date(2015, 2, 2), np.ones((2, 2)))
+    # One day has no variation, and a zero mean has no percent change
+    assert np.isnan(scores.zscore).all()
+    assert np.isnan(scores.change[0, 0])
+    assert np.allclose(scores.change[1], [-50, -100 * 2 / 3])
+
+
+def test_rejects_out_of_order(tmp_path):
+    baseline = Baseline(str(tmp_path / 'baseline.npz'))
+    baseline.update(date(2015, 2, 2), np.ones((2, 2)))
+    with pytest.raises(ValueError):
+        baseline.update(date(2015, 2, 2), np.ones((2, 2)))
+    with pytest.raises(ValueError):
+        baseline.score(date(2015, 2, 3), np.ones((3, 3)))
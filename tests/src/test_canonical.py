@@ -0,0 +1,55 @@
+# pragma pylint: disable=missing-docstring
+
+import numpy as np
+import pandas as pd
+from shapely.geometry import MultiPolygon, Polygon, box
+from mobility_pipeline.lib.canonical import (
+    canonicalize,
+    remap_mobility,
+    DROPPED,
+)
+from mobility_pipeline.lib.make_matrix import make_tower_tower_matrix
+
+
+def empty():
+    return MultiPolygon([Polygon([[0, 0], [0, 0], [0, 0]])])
+
+
+def test_canonicalize_duplicates_and_empty():
+    cells = [MultiPolygon([box(0, 0, 1, 1)]), empty(),
+             MultiPolygon([box(1, 0, 2, 1)]), MultiPolygon([box(0, 0, 1, 1)]),
+             empty()]
+    remap, representatives = canonicalize(cells)
+    assert remap.tolist() == [0, DROPPED, 1, 0, DROPPED]
+    assert representatives.tolist() == [0, 2]
+
+
+def test_canonicalize_merges_co_located_towers():
+    cells = [MultiPolygon([box(0, 0, 1, 1)]), empty(),
+             MultiPolygon([box(1, 0, 2, 1)]), empty()]
+    towers = np.array([[0.5, 0.5], [1.5, 0.5], [1.5, 0.5], [9, 9]])
+    remap, representatives = canonicalize(cells, towers)
+    assert remap.tolist() == [0, 1, 1, DROPPED]
+    assert representatives.tolist() == [0, 2]
+
+
+def test_remap_mobility_sums_and_drops():
+    mobility = pd.DataFrame({
+        'ORIGIN': [0, 0, 1, 2, 3, 5],
+        'DESTINATION': [1, 2, 2, 3, 0, 0],
+        'COUNT': [1, 2, 4, 8, 16, 32],
+    })
+    remap = np.array([0, 1, 1, DROPPED])
+    remapped = remap_mobility(mobility, remap)
+    assert remapped.values.tolist() == [[0, 1, 3], [1, 1, 4]]
+
+
+def test_make_tower_tower_matrix_remap():
+    mobility = pd.DataFrame({
+        'ORIGIN': [0, 1, 2],
+        'DESTINATION': [2, 0, 1],
+        'COUNT': [1, 2, 4],
+    })
+    remap = np.array([0, 1, 1])
+    mat = make_tower_tower_matrix(mobility, 2, remap=remap)
+    assert mat.tolist() == [[0, 1], [2, 4]]
@@ -0,0 +1,56 @@
+# pragma pylint: disable=missing-docstring
+
+import numpy as np
+import pytest
+from shapely.geometry import MultiPolygon, box
+from mobility_pipeline.benchmarks.synthetic import make_country
+from mobility_pipeline.lib.centroid import (
+    assign_towers,
+    make_centroid_operators,
+    compare_operators,
+    UNASSIGNED,
+)
+from mobility_pipeline.lib.make_matrix import make_admin_to_tower_matrix
+
+
+def grid_admins():
+    return [MultiPolygon([box(0, 0, 1, 1)]), MultiPolygon([box(1, 0, 2, 1)]),
+            MultiPolygon([box(2, 0, 3, 1)])]
+
+
+def test_assign_towers():
+    towers = np.array([[0.5, 0.5], [1.5, 0.2], [0.1, 0.9], [5, 5], [1, 0.5]])
+    assert assign_towers(towers, grid_admins()).tolist() == \
+        [0, 1, 0, UNASSIGNED, 0]
+
+
+def test_make_centroid_operators():
+    towers = np.array([[0.5, 0.5], [1.5, 0.2], [0.1, 0.9], [5, 5]])
+    tower_admin, admin_tower = make_centroid_operators(towers, grid_admins())
+    assert admin_tower.toarray().tolist() == [
+        [1, 0, 0],
+        [0, 1, 0],
+        [1, 0, 0],
+        [0, 0, 0],
+    ]
+    # The third admin has no towers, so it goes to the nearest one
+    assert tower_admin.toarray().tolist() == [
+        [0.5, 0, 0.5, 0],
+        [0, 1, 0, 0],
+        [0, 1, 0, 0],
+    ]
+
+
+def test_compare_operators_synthetic():
+    country = make_country(n_towers=50, n_admins_side=3, n_vertices=2,
+                           density=0.1, seed=3)
+    _, admin_tower = make_centroid_operators(country.towers,
+                                             country.admin_cells)
+    exact = make_admin_to_tower_matrix(country.admin_cells,
+                                       country.tower_cells)
+    errors = compare_operators(admin_tower, exact)
+    assert errors['argmax_agreement'] > 0.5
+    assert 0 < errors['mean_row_l1_error'] <= errors['max_row_l1_error'] <= 2
+    assert compare_operators(exact, exact)['max_abs_error'] == 0
+    with pytest.raises(ValueError):
+        compare_operators(exact, exact.T)
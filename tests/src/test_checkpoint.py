@@ -0,0 +1,117 @@
+# pragma pylint: disable=missing-docstring
+
+import os
+import numpy as np
+import pytest
+from mobility_pipeline.benchmarks.synthetic import make_country
+from mobility_pipeline.lib.checkpoint import RowCheckpoint, fingerprint_cells
+from mobility_pipeline.lib.instrument import Metrics
+from mobility_pipeline.lib.make_matrix import make_a_to_b_matrix
+
+
+class Preempted(Exception):
+    pass
+
+
+class PreemptingProgress:
+    """Progress reporter that raises after some rows, like a preemption"""
+
+    def __init__(self, n_rows):
+        self.n_rows = n_rows
+
+    def update(self):
+        self.n_rows -= 1
+        if self.n_rows == 0:
+            raise Preempted()
+
+
+def test_resume_after_interruption(tmp_path):
+    country = make_country(n_towers=30, n_admins_side=3, n_vertices=4,
+                           density=0.1, seed=1)
+    a_cells, b_cells = country.tower_cells, country.admin_cells
+    expected = make_a_to_b_matrix(a_cells, b_cells)
+    checkpoint_path = str(tmp_path / 'mat.checkpoint')
+    fingerprint = fingerprint_cells(a_cells, b_cells)
+
+    with pytest.raises(Preempted):
+        make_a_to_b_matrix(
+            a_cells, b_cells, progress=PreemptingProgress(5),
+            checkpoint=RowCheckpoint(checkpoint_path, fingerprint, 0,
+                                     log=None))
+
+    metrics = Metrics(log=None)
+    checkpoint = RowCheckpoint(checkpoint_path, fingerprint, 0, log=None)
+    mat = make_a_to_b_matrix(a_cells, b_cells, metrics=metrics,
+                             checkpoint=checkpoint)
+    assert np.array_equal(mat, expected)
+    full_metrics = Metrics(log=None)
+    make_a_to_b_matrix(a_cells, b_cells, metrics=full_metrics)
+    # The rows saved before the interruption were not computed again
+    assert metrics.counters['rtree_candidates'] < \
+        full_metrics.counters['rtree_candidates']
+
+    checkpoint.remove()
+    checkpoint.remove()
+    assert not (tmp_path / 'mat.checkpoint').exists()
+
+
+def test_restore_checks_fingerprint(tmp_path):
+    country = make_country(n_towers=10, n_admins_side=2, n_vertices=2,
+                           density=0.1, seed=0)
+    fingerprint = fingerprint_cells(country.tower_cells, country.admin_cells)
+    assert fingerprint != fingerprint_cells(country.admin_cells,
+                                            country.tower_cells)
+    assert fingerprint != fingerprint_cells(
+        country.tower_cells, country.admin_cells, extra='float32')
+
+    checkpoint_path = str(tmp_path / 'mat.checkpoint')
+    mat = np.arange(6, dtype=float).reshape(3, 2)
+    done = np.array([True, False, True])
+    RowCheckpoint(checkpoint_path, fingerprint, log=None).save(mat, done)
+
+    restored = np.zeros((3, 2))
+    assert RowCheckpoint(checkpoint_path, fingerprint, log=None) \
+        .restore(restored).tolist() == [True, False, True]
+    assert restored.tolist() == [[0, 1], [0, 0], [4, 5]]
+
+    messages = []
+    restored = np.zeros((3, 2))
+    assert not RowCheckpoint(checkpoint_path, 'other', log=messages.append) \
+        .restore(restored).any()
+    assert not restored.any()
+    assert 'different inputs' in messages[0]
+    assert not RowCheckpoint(checkpoint_path, fingerprint, resume=False,
+                             log=None).restore(restored).any()
+
+
+def test_save_writes_only_new_rows(tmp_path):
+    checkpoint_path = str(tmp_path / 'mat.checkpoint')
+    mat = np.arange(8, dtype=np.float32).reshape(4, 2)
+    checkpoint = RowCheckpoint(checkpoint_path, 'inputs', log=None)
+    checkpoint.save(mat, np.array([True, True, False, False]))
+    checkpoint.save(mat, np.array([True, True, False, False]))
+    checkpoint.save(mat, np.array([True, True, True, False]))
+    segments = sorted(os.listdir(checkpoint_path))
+    assert segments == ['000000.npz', '000001.npz']
+    with np.load(os.path.join(checkpoint_path, segments[1])) as segment:
+        assert segment['rows'].tolist() == [2]
+        assert segment['values'].tolist() == [[4, 5]]
+
+    # Resuming merges the segments and appends after them
+    restored = np.zeros((4, 2), dtype=np.float32)
+    resumed = RowCheckpoint(checkpoint_path, 'inputs', log=None)
+    assert resumed.restore(restored).tolist() == [True, True, True, False]
+    assert restored.tolist() == [[0, 1], [2, 3], [4, 5], [0, 0]]
+    resumed.save(mat, np.ones(4, dtype=bool))
+    assert len(os.listdir(checkpoint_path)) == 3
+
+    # A run on other inputs ignores the segments, then replaces them
+    other = RowCheckpoint(checkpoint_path, 'other', log=None)
+    assert not other.restore(np.zeros((4, 2), dtype=np.float32)).any()
+    other.save(mat, np.array([False, False, False, True]))
+    assert os.listdir(checkpoint_path) == ['000000.npz']
+    restored = np.zeros((4, 2), dtype=np.float32)
+    assert RowCheckpoint(checkpoint_path, 'other', log=None) \
+        .restore(restored).tolist() == [False, False, False, True]
+    assert not RowCheckpoint(checkpoint_path, 'other', log=None).restore(
+        np.zeros((4, 2))).any()
@@ -0,0 +1,98 @@
+# pragma pylint: disable=missing-docstring
+
+import bz2
+import gzip
+import io
+import lzma
+import sys
+import pandas as pd
+import pytest
+from mobility_pipeline.lib.compression import detect_codec, open_compressed
+
+
+TEXT = 'ORIGIN,DESTINATION,COUNT\n' + ''.join(
+    f'br{i},br{i + 1},{i * 2}\n' for i in range(1000))
+
+COMPRESSORS = {
+    'gzip': gzip.compress,
+    'bz2': bz2.compress,
+    'xz': lzma.compress,
+}
+
+
+def write(tmp_path, name, data):
+    file_path = str(tmp_path / name)
+    with open(file_path, 'wb') as f:
+        f.write(data)
+    return file_path
+
+
+@pytest.mark.parametrize('codec', sorted(COMPRESSORS))
+def test_reads_compressed_text_and_bytes(tmp_path, codec):
+    file_path = write(tmp_path, 'mobility.csv',
+                      COMPRESSORS[codec](TEXT.encode()))
+    assert detect_codec(file_path) == codec
+    with open_compressed(file_path) as f:
+        assert f.read() == TEXT
+    with open_compressed(file_path, 'rb') as f:
+        assert f.read() == TEXT.encode()
+
+
+def test_streams_into_chunked_csv_reader(tmp_path):
+    file_path = write(tmp_path, 'mobility.csv.gz', gzip.compress(TEXT.encode()))
+    with open_compressed(file_path) as f:
+        chunks = list(pd.read_csv(f, chunksize=300))
+    assert [len(chunk) for chunk in chunks] == [300, 300, 300, 100]
+    assert pd.concat(chunks)['COUNT'].sum() == sum(range(0, 2000, 2))
+
+
+def test_uncompressed_and_extension_fallback(tmp_path):
+    plain = write(tmp_path, 'mobility.csv', TEXT.encode())
+    assert detect_codec(plain) is None
+    with open_compressed(plain) as f:
+        assert f.read() == TEXT
+    assert detect_codec(write(tmp_path, 'empty.json.GZ', b'')) == 'gzip'
+    assert detect_codec(write(tmp_path, 'empty.json.zst', b'')) == 'zstd'
+
+
+def test_zstd(tmp_path, monkeypatch):
+    file_path = write(tmp_path, 'cells.json', b'\x28\xb5\x2f\xfd' + b'\0' * 8)
+    assert detect_codec(file_path) == 'zstd'
+    monkeypatch.setitem(sys.modules, 'zstandard', None)
+    with pytest.raises(ImportError, match='zstandard'):
+        open_compressed(file_path)
+    monkeypatch.undo()
+
+    zstandard = pytest.importorskip('zstandard')
+    file_path = write(tmp_path, 'cells.json',
+                      zstandard.ZstdCompressor().compress(TEXT.encode()))
+    with open_compressed(file_path) as f:
+        assert f.read() == TEXT
+
+
+def test_rejects_writing(tmp_path):
+    file_path = write(tmp_path, 'mobility.csv', TEXT.encode())
+    with pytest.raises(ValueError):
+        open_compressed(file_path, 'w')
+
+
+class Unseekable(io.RawIOBase):
+    def __init__(self, data):
+        self.data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self.data.readinto(buffer)
+
+
+@pytest.mark.parametrize('codec', [None, 'gzip'])
+def test_reads_file_objects(codec):
+    data = COMPRESSORS[codec](TEXT.encode()) if codec else TEXT.encode()
+    for stream in (io.BytesIO(data), Unseekable(data)):
+        with open_compressed(stream) as f:
+            assert f.read() == TEXT
+    stream = io.BytesIO(data)
+    assert detect_codec(stream) == codec
+    assert stream.tell() == 0
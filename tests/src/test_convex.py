@@ -0,0 +1,53 @@
+# pragma pylint: disable=missing-docstring
+
+import numpy as np
+from shapely.geometry import MultiPolygon, Point, Polygon, box
+from mobility_pipeline.benchmarks.synthetic import make_country
+from mobility_pipeline.lib.convex import (
+    ring_area,
+    convex_ring,
+    polygon_rings,
+    convex_intersection_area,
+    convex_intersection_areas,
+)
+from mobility_pipeline.lib.make_matrix import make_a_to_b_matrix
+
+
+def test_convex_ring():
+    ring = convex_ring(MultiPolygon([Polygon([(0, 0), (0, 1), (1, 1),
+                                              (1, 0)])]))
+    # Reoriented counterclockwise
+    assert ring_area(ring) == 1
+    assert convex_ring(Polygon([(0, 0), (2, 0), (1, 0.5), (1, 2)])) is None
+    assert convex_ring(MultiPolygon([box(0, 0, 1, 1),
+                                     box(2, 0, 3, 1)])) is None
+    assert convex_ring(box(0, 0, 3, 3).difference(box(1, 1, 2, 2))) is None
+    assert convex_ring(Polygon([[0, 0], [0, 0], [0, 0]])) is None
+
+
+def test_convex_intersection_areas_nonconvex():
+    # A U shape whose arms both cross the first box
+    u_shape = MultiPolygon([Polygon([(0, 0), (3, 0), (3, 3), (2, 3), (2, 1),
+                                     (1, 1), (1, 3), (0, 3)])])
+    rings = polygon_rings(u_shape)
+    areas = convex_intersection_areas(
+        [convex_ring(box(-1, 2, 4, 4)), convex_ring(box(5, 5, 6, 6)),
+         convex_ring(box(0.5, -1, 2.5, 0.5))], [rings, rings, rings])
+    assert np.allclose(areas, [2, 0, 1])
+
+
+def test_convex_intersection_area_holes():
+    shape = Point(0, 0).buffer(3).difference(Point(0.5, 0).buffer(1))
+    convex = box(-1, -1, 2, 2)
+    assert np.isclose(convex_intersection_area(convex_ring(convex), shape),
+                      convex.intersection(shape).area)
+
+
+def test_make_a_to_b_matrix_convex_matches_shapely():
+    country = make_country(n_towers=40, n_admins_side=3, n_vertices=8,
+                           density=0.1, seed=2)
+    for a_cells, b_cells in [(country.tower_cells, country.admin_cells),
+                             (country.admin_cells, country.tower_cells)]:
+        assert np.allclose(
+            make_a_to_b_matrix(a_cells, b_cells),
+            make_a_to_b_matrix(a_cells, b_cells, use_convex=False))
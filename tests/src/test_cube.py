@@ -0,0 +1,71 @@
+# pragma pylint: disable=missing-docstring
+
+from datetime import date, timedelta
+import numpy as np
+import pytest
+from mobility_pipeline.lib.cube import MobilityCube, parse_day
+
+
+def make_days(n_days, n_admins=3, seed=0):
+    rng = np.random.RandomState(seed)
+    start = date(2015, 1, 26)
+    return [(start + timedelta(days=i), rng.uniform(size=(n_admins,
+                                                          n_admins)))
+            for i in range(n_days) if i != 10]
+
+
+def test_parse_day():
+    assert parse_day('20150201') == date(2015, 2, 1)
+    assert parse_day('2015-02-01') == date(2015, 2, 1)
+    with pytest.raises(ValueError):
+        parse_day('day1')
+
+
+def test_range_sum_and_reopen(tmp_path):
+    cube_dir = str(tmp_path / 'br-cube')
+    days = make_days(20)
+    cube = MobilityCube(cube_dir)
+    for day, mat in days:
+        cube.append(day, mat)
+
+    cube = MobilityCube(cube_dir)
+    assert cube.dates == [day for day, _ in days]
+    assert np.array_equal(cube.day(days[3][0]), days[3][1])
+    total, n_days = cube.range_sum(date(2015, 1, 30), date(2015, 2, 8))
+    expected = [mat for day, mat in days
+                if date(2015, 1, 30) <= day <= date(2015, 2, 8)]
+    assert n_days == len(expected) == 9
+    assert np.allclose(total, np.sum(expected, axis=0))
+    # Ranges outside the cube are empty
+    assert cube.range_sum(date(2014, 1, 1), date(2014, 2, 1))[1] == 0
+    with pytest.raises(KeyError):
+        cube.day(date(2015, 2, 5))
+
+
+def test_append_rejects_out_of_order(tmp_path):
+    cube = MobilityCube(str(tmp_path / 'cube'))
+    cube.append(date(2015, 2, 1), np.ones((2, 2)))
+    with pytest.raises(ValueError):
+        cube.append(date(2015, 2, 1), np.ones((2, 2)))
+    with pytest.raises(ValueError):
+        cube.append(date(2015, 2, 2), np.ones((3, 3)))
+    assert len(MobilityCube(str(tmp_path / 'cube'))) == 1
+
+
+def test_rollup(tmp_path):
+    cube = MobilityCube(str(tmp_path / 'cube'))
+    days = make_days(40)
+    for day, mat in days:
+        cube.append(day, mat)
+    weeks = cube.rollup('week')
+    assert weeks[0].label == '2015-W05'
+    assert weeks[0].start == date(2015, 1, 26)
+    assert sum(week.n_days for week in weeks) == len(days)
+    months = cube.rollup('month')
+    assert [month.label for month in months] == \
+        ['2015-01', '2015-02', '2015-03']
+    february = [mat for day, mat in days if day.month == 2]
+    assert months[1].n_days == len(february)
+    assert np.allclose(months[1].total, np.sum(february, axis=0))
+    with pytest.raises(ValueError):
+        cube.rollup('year')
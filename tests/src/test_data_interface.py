@@ -0,0 +1,24 @@
+# pragma pylint: disable=missing-docstring
+
+import numpy as np
+import pytest
+from mobility_pipeline.data_interface import (
+    deserialize_mat,
+    deserialize_mat_memmap,
+    serialize_mat,
+)
+
+
+@pytest.mark.parametrize('shape', [(3, 5), (5, 3), (1, 4)])
+@pytest.mark.parametrize('dtype', [np.float64, np.float32])
+def test_deserialize_mat_memmap(tmp_path, shape, dtype):
+    mat = np.random.RandomState(0).uniform(size=shape).astype(dtype)
+    mat_path = str(tmp_path / 'mat.csv')
+    serialize_mat(mat, mat_path)
+    loaded = deserialize_mat_memmap(mat_path, str(tmp_path / 'mat.npy'),
+                                    dtype)
+    assert isinstance(loaded, np.memmap)
+    assert loaded.dtype == dtype
+    assert np.array_equal(loaded, mat)
+    assert np.array_equal(loaded,
+                          deserialize_mat(mat_path, dtype).reshape(shape))
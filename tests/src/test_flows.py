@@ -0,0 +1,47 @@
+# pragma pylint: disable=missing-docstring
+
+import numpy as np
+from mobility_pipeline.lib.flows import admin_admin_to_edges, \
+    admin_admin_to_csr, admin_admin_top_k
+
+
+ADMIN_ADMIN = np.array([[5.0, 0.5, 0.0],
+                        [2.0, 7.0, 2.0],
+                        [0.0, 0.0, 0.0]])
+
+
+def test_admin_admin_to_edges():
+    edges = admin_admin_to_edges(ADMIN_ADMIN, threshold=1)
+    expected = [[0, 0, 5.0],
+                [1, 0, 2.0],
+                [1, 1, 7.0],
+                [1, 2, 2.0]]
+    assert edges[['ORIGIN', 'DESTINATION', 'COUNT']].values.tolist() == \
+        expected
+
+
+def test_admin_admin_to_edges_drops_zeros():
+    edges = admin_admin_to_edges(ADMIN_ADMIN)
+    assert len(edges) == 5
+
+
+def test_admin_admin_to_csr():
+    csr = admin_admin_to_csr(ADMIN_ADMIN, threshold=1)
+    expected = np.where(ADMIN_ADMIN >= 1, ADMIN_ADMIN, 0)
+    assert csr.nnz == 4
+    assert np.all(csr.toarray() == expected)
+
+
+def test_admin_admin_top_k():
+    top = admin_admin_top_k(ADMIN_ADMIN, 2)
+    expected = [[0, 0, 0, 5.0],
+                [0, 1, 1, 0.5],
+                [1, 0, 1, 7.0],
+                [1, 1, 0, 2.0]]
+    assert top[['ORIGIN', 'RANK', 'DESTINATION', 'COUNT']].values.tolist() \
+        == expected
+
+
+def test_admin_admin_top_k_more_than_destinations():
+    top = admin_admin_top_k(ADMIN_ADMIN, 10)
+    assert len(top) == 5
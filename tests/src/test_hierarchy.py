@@ -0,0 +1,72 @@
+# pragma pylint: disable=missing-docstring
+
+import numpy as np
+from shapely.geometry import MultiPolygon
+from shapely.ops import unary_union
+from mobility_pipeline.benchmarks.synthetic import make_country
+from mobility_pipeline.lib.hierarchy import (
+    membership_matrix,
+    coarsen_tower_admin,
+    coarsen_admin_tower,
+    coarsen_admin_admin,
+)
+from mobility_pipeline.lib.make_matrix import (
+    make_tower_to_admin_matrix,
+    make_admin_to_tower_matrix,
+    make_tower_tower_matrix,
+    make_admin_admin_matrix,
+)
+
+
+def test_membership_matrix():
+    membership, parents = membership_matrix(['b', 'a', 'b', 'c'])
+    assert parents == ['b', 'a', 'c']
+    assert membership.toarray().tolist() == [
+        [1, 0, 1, 0],
+        [0, 1, 0, 0],
+        [0, 0, 0, 1],
+    ]
+
+
+def test_coarsen_matches_exact():
+    country = make_country(n_towers=30, n_admins_side=4, n_vertices=3,
+                           density=0.3, seed=2)
+    n_parents = country.parent_ids.max() + 1
+    parent_cells = [
+        MultiPolygon([unary_union([
+            cell for cell, parent in zip(country.admin_cells,
+                                         country.parent_ids)
+            if parent == i_parent])])
+        for i_parent in range(n_parents)]
+    tower_tower = make_tower_tower_matrix(country.mobility, 30)
+
+    tower_admin = make_tower_to_admin_matrix(country.tower_cells,
+                                             country.admin_cells)
+    admin_tower = make_admin_to_tower_matrix(country.admin_cells,
+                                             country.tower_cells)
+    admin_admin = make_admin_admin_matrix(tower_tower, tower_admin,
+                                          admin_tower)
+    exact_tower_admin = make_tower_to_admin_matrix(country.tower_cells,
+                                                   parent_cells)
+    exact_admin_tower = make_admin_to_tower_matrix(parent_cells,
+                                                   country.tower_cells)
+    exact_admin_admin = make_admin_admin_matrix(
+        tower_tower, exact_tower_admin, exact_admin_tower)
+
+    membership, parents = membership_matrix(country.parent_ids)
+    assert parents == list(range(n_parents))
+    areas = np.array([cell.area for cell in country.admin_cells])
+    assert np.allclose(coarsen_tower_admin(tower_admin, membership, areas),
+                       exact_tower_admin)
+    assert np.allclose(coarsen_admin_tower(admin_tower, membership),
+                       exact_admin_tower)
+    assert np.allclose(coarsen_admin_admin(admin_admin, membership, areas),
+                       exact_admin_admin)
+
+
+def test_coarsen_admin_admin_integer_counts():
+    membership, _ = membership_matrix([0, 0])
+    coarse = coarsen_admin_admin(np.array([[1, 2], [3, 4]]), membership,
+                                 np.array([1.0, 3.0]))
+    assert coarse.dtype == np.float64
+    assert np.allclose(coarse, [[0.25 * 3 + 0.75 * 7]])
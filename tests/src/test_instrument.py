@@ -0,0 +1,110 @@
+# pragma pylint: disable=missing-docstring
+
+import json
+import pstats
+import threading
+from shapely.geometry import MultiPolygon, Polygon
+from mobility_pipeline.lib.instrument import Metrics, ProgressReporter, \
+    profiled
+from mobility_pipeline.lib.make_matrix import make_a_to_b_matrix
+
+
+def test_metrics_stage():
+    messages = []
+    metrics = Metrics(log=messages.append)
+    with metrics.stage('first'):
+        sum(range(1000))
+    stages = metrics.to_dict()['stages']
+    assert [s['name'] for s in stages] == ['first']
+    assert stages[0]['wall_seconds'] >= 0
+    assert stages[0]['cpu_seconds'] >= 0
+    assert messages[0] == 'first'
+    assert messages[1].startswith('first: done in')
+
+
+def test_metrics_counters_and_save(tmp_path):
+    metrics = Metrics(log=None)
+    metrics.increment('a')
+    metrics.increment('a', 4)
+    metrics_path = tmp_path / 'metrics.json'
+    metrics.save(str(metrics_path))
+    assert json.loads(metrics_path.read_text()) == {
+        'stages': [], 'counters': {'a': 5}}
+
+
+def test_progress_reporter():
+    messages = []
+    progress = ProgressReporter(4, 'Cells', interval=3600,
+                                log=messages.append)
+    assert progress.eta_seconds() is None
+    for _ in range(4):
+        progress.update()
+    # Only the final step is reported within the interval
+    assert len(messages) == 1
+    assert messages[0].startswith('Cells: 4/4 (100.0%)')
+    assert progress.eta_seconds() == 0
+
+
+def test_make_a_to_b_matrix_counters():
+    a_cells = [MultiPolygon([Polygon([(0, 0), (0, 1), (1, 1), (1, 0)])]),
+               MultiPolygon([Polygon([(1, 0), (1, 1), (2, 1), (2, 0)])])]
+    b_cells = [MultiPolygon([Polygon([(0, 0), (0, 1), (0.5, 1), (0.5, 0)])])]
+    metrics = Metrics(log=None)
+    progress = ProgressReporter(1, log=lambda _: None)
+    make_a_to_b_matrix(a_cells, b_cells, metrics=metrics, progress=progress)
+    assert metrics.counters['rtree_candidates'] == 1
+    assert metrics.counters['nonzero_overlaps'] == 1
+    assert progress.done == 1
+
+
+def test_profiled(tmp_path):
+    profile_path = str(tmp_path / 'out.prof')
+    metrics = Metrics(log=None)
+    with profiled(profile_path):
+        with metrics.stage('traced'):
+            _ = [0] * 1000
+    assert pstats.Stats(profile_path).total_calls > 0
+    assert 'traced_delta_bytes' in metrics.stages[0]
+    assert not metrics.stages[0]['overlapped']
+
+
+def work_in_thread():
+    return sum(range(1000))
+
+
+def test_profiled_includes_threads(tmp_path):
+    profile_path = str(tmp_path / 'out.prof')
+    with profiled(profile_path):
+        thread = threading.Thread(target=work_in_thread)
+        thread.start()
+        thread.join()
+    functions = [function for _, _, function
+                 in pstats.Stats(profile_path).stats]
+    assert 'work_in_thread' in functions
+
+
+def test_overlapping_stages_omit_memory_delta(tmp_path):
+    metrics = Metrics(log=None)
+    started, finish = threading.Event(), threading.Event()
+
+    def other_stage():
+        with metrics.stage('other'):
+            started.set()
+            finish.wait()
+
+    with profiled(str(tmp_path / 'out.prof')):
+        thread = threading.Thread(target=other_stage)
+        thread.start()
+        started.wait()
+        with metrics.stage('main'):
+            _ = [0] * 1000
+        finish.set()
+        thread.join()
+        with metrics.stage('after'):
+            pass
+    stages = {stage['name']: stage for stage in metrics.stages}
+    assert stages['main']['overlapped'] and stages['other']['overlapped']
+    assert 'traced_delta_bytes' not in stages['main']
+    assert 'traced_peak_bytes' in stages['main']
+    assert not stages['after']['overlapped']
+    assert 'traced_delta_bytes' in stages['after']
@@ -0,0 +1,112 @@
+# pragma pylint: disable=missing-docstring
+
+import os
+import pytest
+from mobility_pipeline.lib.jobs import (
+    Job,
+    check_graph,
+    run_jobs,
+    RAN,
+    SKIPPED,
+    FAILED,
+    BLOCKED,
+)
+
+
+class Calls(list):
+    # Keep the recorded calls out of the fingerprinted arguments
+    def __repr__(self):
+        return 'Calls()'
+
+
+def copy_upper(src, dst, calls):
+    calls.append(dst)
+    with open(src) as f:
+        text = f.read()
+    with open(dst, 'w') as f:
+        f.write(text.upper())
+
+
+def fail():
+    raise RuntimeError('boom')
+
+
+def make_chain(tmp_path, calls):
+    src = str(tmp_path / 'a.txt')
+    mid = str(tmp_path / 'b.txt')
+    dst = str(tmp_path / 'c.txt')
+    with open(src, 'w') as f:
+        f.write('hello')
+    return src, dst, [
+        Job('first', copy_upper, (src, mid, calls), (src,), (mid,)),
+        Job('second', copy_upper, (mid, dst, calls), (mid,), (dst,),
+            ('first',)),
+    ]
+
+
+def quiet(_):
+    pass
+
+
+def test_run_jobs_runs_in_order_then_skips(tmp_path):
+    calls = Calls()
+    _, dst, jobs = make_chain(tmp_path, calls)
+    state = str(tmp_path / 'state.json')
+    assert run_jobs(jobs, state, 2, log=quiet) == \
+        {'first': RAN, 'second': RAN}
+    with open(dst) as f:
+        assert f.read() == 'HELLO'
+    calls.clear()
+    assert run_jobs(jobs, state, 2, log=quiet) == \
+        {'first': SKIPPED, 'second': SKIPPED}
+    assert calls == []
+
+
+def test_run_jobs_reruns_when_input_changes(tmp_path):
+    calls = Calls()
+    src, dst, jobs = make_chain(tmp_path, calls)
+    state = str(tmp_path / 'state.json')
+    run_jobs(jobs, state, log=quiet)
+    with open(src, 'w') as f:
+        f.write('bye!!')
+    assert run_jobs(jobs, state, log=quiet) == \
+        {'first': RAN, 'second': RAN}
+    with open(dst) as f:
+        assert f.read() == 'BYE!!'
+
+
+def test_run_jobs_reruns_missing_output(tmp_path):
+    calls = Calls()
+    _, dst, jobs = make_chain(tmp_path, calls)
+    state = str(tmp_path / 'state.json')
+    run_jobs(jobs, state, log=quiet)
+    os.remove(dst)
+    assert run_jobs(jobs, state, log=quiet) == \
+        {'first': SKIPPED, 'second': RAN}
+
+
+def test_run_jobs_resumes_after_failure(tmp_path):
+    calls = Calls()
+    _, _, jobs = make_chain(tmp_path, calls)
+    state = str(tmp_path / 'state.json')
+    broken = jobs + [Job('bad', fail, deps=('first',)),
+                     Job('after_bad', fail, deps=('bad',))]
+    assert run_jobs(broken, state, log=quiet) == \
+        {'first': RAN, 'second': RAN, 'bad': FAILED, 'after_bad': BLOCKED}
+    assert run_jobs(jobs, state, log=quiet) == \
+        {'first': SKIPPED, 'second': SKIPPED}
+
+
+@pytest.mark.parametrize('jobs', [
+    [Job('a', fail), Job('a', fail)],
+    [Job('a', fail, deps=('b',))],
+    [Job('a', fail, deps=('b',)), Job('b', fail, deps=('a',))],
+])
+def test_check_graph_errors(jobs, tmp_path):
+    assert check_graph(jobs) is not None
+    with pytest.raises(ValueError):
+        run_jobs(jobs, str(tmp_path / 'state.json'), log=quiet)
+
+
+def test_check_graph_valid():
+    assert check_graph([Job('a', fail), Job('b', fail, deps=('a',))]) is None
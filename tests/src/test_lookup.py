@@ -0,0 +1,76 @@
+# pragma pylint: disable=missing-docstring
+
+import numpy as np
+from shapely.geometry import MultiPolygon, Point
+from mobility_pipeline.benchmarks.synthetic import make_country
+from mobility_pipeline.lib.lookup import NOT_FOUND, PointLookup, \
+    fingerprint_inputs
+
+
+def brute_force(cells, points):
+    found = np.full(len(points), NOT_FOUND)
+    for i, point in enumerate(points):
+        for j, cell in enumerate(cells):
+            if cell.contains(Point(*point)):
+                found[i] = j
+                break
+    return found
+
+
+def make_lookup():
+    country = make_country(n_towers=60, n_admins_side=3, n_vertices=8,
+                           density=0.0, seed=4)
+    # A tower co-located with tower 0, which has an empty cell
+    towers = np.vstack([country.towers, country.towers[:1]])
+    tower_cells = country.tower_cells + [MultiPolygon()]
+    return PointLookup(towers, tower_cells, country.admin_cells), \
+        tower_cells, country.admin_cells
+
+
+def test_matches_brute_force():
+    lookup, tower_cells, admin_cells = make_lookup()
+    points = np.random.RandomState(0).uniform(-10, 110, size=(500, 2))
+    towers, admins = lookup.lookup(points)
+    assert np.array_equal(towers, brute_force(tower_cells, points))
+    assert np.array_equal(admins, brute_force(admin_cells, points))
+    assert np.array_equal(lookup.towers_for(points), towers)
+    assert np.array_equal(lookup.admins_for(points), admins)
+    # Some cells are wholly within one admin, and some points are outside
+    assert np.any(lookup.within_admin != NOT_FOUND)
+    assert np.any(towers == NOT_FOUND)
+
+
+def test_shared_border_and_empty():
+    lookup, _, _ = make_lookup()
+    # The admins are a 3x3 grid whose outer borders are straight, so this
+    # point is on the outer border of the bottom left admin
+    towers, admins = lookup.lookup(np.array([[0.0, 10.0]]))
+    assert admins[0] == 0
+    towers, admins = lookup.lookup(np.zeros((0, 2)))
+    assert len(towers) == len(admins) == 0
+
+
+def test_save_load(tmp_path):
+    lookup, _, _ = make_lookup()
+    lookup.save(str(tmp_path / 'lookup.pkl'))
+    loaded = PointLookup.load(str(tmp_path / 'lookup.pkl'))
+    points = np.random.RandomState(1).uniform(0, 100, size=(50, 2))
+    assert np.array_equal(loaded.lookup(points)[1], lookup.lookup(points)[1])
+    assert loaded.fingerprint == lookup.fingerprint
+
+
+def test_fingerprint_inputs():
+    country = make_country(n_towers=20, n_admins_side=2, n_vertices=4,
+                           density=0.0, seed=5)
+    inputs = (country.towers, country.tower_cells, country.admin_cells)
+    fingerprint = fingerprint_inputs(*inputs)
+    assert PointLookup(*inputs).fingerprint == fingerprint
+    assert fingerprint_inputs(country.towers.copy(), list(country.tower_cells),
+                              list(country.admin_cells)) == fingerprint
+    moved = country.towers.copy()
+    moved[3, 0] += 1e-9
+    assert fingerprint_inputs(moved, *inputs[1:]) != fingerprint
+    assert fingerprint_inputs(country.towers, country.tower_cells[::-1],
+                              country.admin_cells) != fingerprint
+    assert fingerprint_inputs(country.towers, country.tower_cells,
+                              country.admin_cells[:-1]) != fingerprint
@@ -0,0 +1,32 @@
+# pragma pylint: disable=missing-docstring
+
+from os import path
+import subprocess
+import sys
+import pytest
+from mobility_pipeline.__main__ import PACKAGE_DIR, SUBCOMMANDS
+
+
+HEAVY_MODULES = ('pandas', 'scipy', 'shapely')
+
+# Prints the heavy modules imported while showing a subcommand's help
+HELP_SCRIPT = f"""
+import sys
+from mobility_pipeline.__main__ import main
+try:
+    main([sys.argv[1], '--help'])
+except SystemExit:
+    pass
+print(','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules),
+      file=sys.stderr)
+"""
+
+
+@pytest.mark.parametrize('subcommand', sorted(SUBCOMMANDS))
+def test_help_skips_heavy_imports(subcommand):
+    result = subprocess.run(
+        [sys.executable, '-c', HELP_SCRIPT, subcommand],
+        cwd=path.dirname(PACKAGE_DIR), stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    assert 'usage:' in result.stdout
+    assert result.stderr.strip() == ''
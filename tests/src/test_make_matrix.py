@@ -1,6 +1,8 @@
 # pragma pylint: disable=missing-docstring
 
 from math import sqrt
+import tracemalloc
+import pytest
 from hypothesis import given
 from hypothesis.strategies import lists, integers
 import numpy as np
@@ -8,7 +10,8 @@ import pandas as pd
 from shapely.geometry import MultiPolygon, Polygon
 from mobility_pipeline.lib.make_matrix import make_tower_tower_matrix, \
     make_admin_admin_matrix, make_admin_to_tower_matrix, \
-    make_tower_to_admin_matrix
+    make_tower_to_admin_matrix, fill_tower_tower_matrix, \
+    make_admin_admin_blocked, block_size_for_budget
 
 
 PANDAS_COLUMNS = ['ORIGIN', 'DESTINATION', 'COUNT']
@@ -101,3 +104,63 @@ def test_make_admin_to_tower():
     actual = make_admin_to_tower_matrix(admins, towers)
 
     assert np.all(actual == expected)
+
+
+def test_fill_tower_tower_matrix_matches_make():
+    raw_mat = [PANDAS_COLUMNS,
+               [0, 0, 5],
+               [0, 2, 3],
+               [2, 1, 2]]
+    mobility = pd.DataFrame(raw_mat[1:], columns=raw_mat[0])
+    mat = np.zeros((3, 3))
+    fill_tower_tower_matrix(mobility, mat, chunksize=2)
+    assert np.all(mat == make_tower_tower_matrix(mobility, 3))
+
+
+def test_make_admin_admin_blocked_matches_unblocked(tmp_path):
+    rng = np.random.RandomState(0)
+    n_admins, n_towers = 3, 17
+    tower_admin = rng.rand(n_admins, n_towers)
+    admin_tower = rng.rand(n_towers, n_admins)
+    tower_tower = np.lib.format.open_memmap(
+        str(tmp_path / 'tower-tower.npy'), mode='w+', dtype=np.float64,
+        shape=(n_towers, n_towers))
+    tower_tower[:] = rng.randint(0, 10, size=(n_towers, n_towers))
+    tower_tower[:8, :8] = 0
+
+    expected = make_admin_admin_matrix(np.asarray(tower_tower), tower_admin,
+                                       admin_tower)
+    # 1 KB leaves room for blocks of 6 towers
+    actual = make_admin_admin_blocked(tower_tower, tower_admin, admin_tower,
+                                      1024)
+    assert block_size_for_budget(n_admins, n_towers, 8, 1024) == 6
+    assert np.allclose(actual, expected)
+
+
+def test_block_size_for_budget():
+    assert block_size_for_budget(2, 100, 8, 10 ** 9) == 100
+    # The result and the scratch matrix, then a block of 1
+    assert block_size_for_budget(2, 100, 8, 8 * (2 * 4 + 1 + 6)) == 1
+    with pytest.raises(ValueError):
+        block_size_for_budget(2, 100, 8, 8 * (2 * 4 + 6))
+
+
+def test_make_admin_admin_blocked_stays_within_budget():
+    rng = np.random.RandomState(0)
+    n_admins, n_towers = 100, 4
+    tower_admin = rng.rand(n_admins, n_towers)
+    admin_tower = rng.rand(n_towers, n_admins)
+    tower_tower = rng.rand(n_towers, n_towers)
+    # Only enough for the result, the scratch matrix, and blocks of 1 tower
+    budget = 8 * (2 * n_admins ** 2 + 1 + 3 * n_admins)
+    tracemalloc.start()
+    try:
+        actual = make_admin_admin_blocked(tower_tower, tower_admin,
+                                          admin_tower, budget)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # Leave a little room for the scalars numpy allocates along the way
+    assert peak <= budget + 1024
+    assert np.allclose(actual, make_admin_admin_matrix(
+        tower_tower, tower_admin, admin_tower))
@@ -14,3 +14,10 @@ def test_compute_overlap_simple():
     assert compute_overlap(polygon1, enclosing) == 1
     assert compute_overlap(polygon2, enclosing) == 0.5
     assert compute_overlap(polygon3, enclosing) == 0.5
+
+
+def test_compute_overlap_zero_area():
+    empty = Polygon([(0, 0), (0, 0), (0, 0)])
+    enclosing = Polygon([(-2, -3), (-2, 3), (2, 3), (2, -3)])
+
+    assert compute_overlap(empty, enclosing) == 0
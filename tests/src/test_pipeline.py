@@ -0,0 +1,72 @@
+# pragma pylint: disable=missing-docstring
+
+import threading
+import pytest
+from mobility_pipeline.lib.pipeline import run_pipeline
+
+
+def test_run_pipeline_simple():
+    written = {}
+
+    def write(item, result):
+        written[item] = result
+        return item
+
+    order = run_pipeline(range(10), lambda i: i * 2,
+                         lambda i, data: data + i, write)
+    assert order == list(range(10))
+    assert written == {i: 3 * i for i in range(10)}
+
+
+def test_run_pipeline_stages_on_separate_threads():
+    threads = {'read': set(), 'compute': set(), 'write': set()}
+
+    def read(item):
+        threads['read'].add(threading.get_ident())
+        return item
+
+    def compute(_, data):
+        threads['compute'].add(threading.get_ident())
+        return data
+
+    def write(_, result):
+        threads['write'].add(threading.get_ident())
+        return result
+
+    run_pipeline(range(5), read, compute, write)
+    assert threads['compute'] == {threading.get_ident()}
+    assert len(threads['read'] | threads['compute'] | threads['write']) == 3
+
+
+def test_run_pipeline_bounded():
+    in_flight = []
+    max_in_flight = [0]
+    lock = threading.Lock()
+
+    def read(item):
+        with lock:
+            in_flight.append(item)
+            max_in_flight[0] = max(max_in_flight[0], len(in_flight))
+        return item
+
+    def write(item, _):
+        with lock:
+            in_flight.remove(item)
+
+    run_pipeline(range(50), read, lambda _, data: data, write, queue_size=1)
+    # At most one item per queue, one per stage, and one being read
+    assert max_in_flight[0] <= 5
+
+
+@pytest.mark.parametrize('failing_stage', ['read', 'compute', 'write'])
+def test_run_pipeline_propagates_errors(failing_stage):
+    def stage(name):
+        def run(*args):
+            if name == failing_stage and args[0] == 3:
+                raise ValueError(name)
+            return args[-1]
+        return run
+
+    with pytest.raises(ValueError, match=failing_stage):
+        run_pipeline(range(100), stage('read'), stage('compute'),
+                     stage('write'))
@@ -0,0 +1,51 @@
+# pragma pylint: disable=missing-docstring
+
+import numpy as np
+import pandas as pd
+from mobility_pipeline.lib.make_matrix import make_tower_tower_matrix, \
+    make_admin_admin_matrix, make_tower_to_admin_matrix
+from mobility_pipeline.lib.precision import float32_error_bound, \
+    round_counts, FLOAT32_POLICY
+from shapely.geometry import MultiPolygon, Polygon
+
+
+def test_float32_within_error_bound():
+    rng = np.random.RandomState(0)
+    n_admins, n_towers = 20, 300
+    tower_admin = rng.rand(n_admins, n_towers)
+    admin_tower = rng.rand(n_towers, n_admins)
+    tower_tower = rng.randint(0, 10 ** 6, size=(n_towers, n_towers))
+
+    exact = make_admin_admin_matrix(tower_tower.astype(np.float64),
+                                    tower_admin, admin_tower)
+    dtype = FLOAT32_POLICY.operator_dtype
+    approx = make_admin_admin_matrix(tower_tower.astype(dtype),
+                                     tower_admin.astype(dtype),
+                                     admin_tower.astype(dtype))
+    assert approx.dtype == np.float32
+    rel_err = np.abs(approx - exact) / exact
+    assert np.all(rel_err <= float32_error_bound(n_towers))
+
+
+def test_make_tower_tower_matrix_dtype():
+    mobility = pd.DataFrame([[0, 1, 3]],
+                            columns=['ORIGIN', 'DESTINATION', 'COUNT'])
+    mat = make_tower_tower_matrix(mobility, 2, np.float32)
+    assert mat.dtype == np.float32
+    assert np.all(mat == [[0, 3], [0, 0]])
+
+
+def test_make_tower_to_admin_dtype():
+    towers = [MultiPolygon([Polygon([(-6, -2), (2, 6), (2, 2), (-2, -2)])])]
+    admins = [MultiPolygon([Polygon([(-2, -2), (-2, 2), (2, 2), (2, -2)])])]
+    expected = make_tower_to_admin_matrix(towers, admins)
+    actual = make_tower_to_admin_matrix(towers, admins, np.float32)
+    assert actual.dtype == np.float32
+    assert np.allclose(actual, expected)
+
+
+def test_round_counts():
+    rounded = round_counts(np.array([[0.4, 1.6], [2.5, 3.5]]))
+    assert rounded.dtype == np.int32
+    assert np.all(rounded == [[0, 2], [2, 4]])
+    assert round_counts(np.array([2.0 ** 40])).dtype == np.int64
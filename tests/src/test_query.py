@@ -0,0 +1,48 @@
+# pragma pylint: disable=missing-docstring
+
+import numpy as np
+from shapely.geometry import MultiPolygon, box
+from mobility_pipeline.benchmarks.synthetic import make_country
+from mobility_pipeline.lib.make_matrix import (
+    make_admin_to_tower_matrix,
+    make_tower_to_admin_matrix,
+    make_a_to_b_matrix,
+)
+from mobility_pipeline.lib.query import OverlapQuery, intersection_areas
+
+
+def test_matches_full_matrices():
+    country = make_country(n_towers=40, n_admins_side=3, n_vertices=8,
+                           density=1.0, seed=2)
+    towers, admins = country.tower_cells, country.admin_cells
+    tower_admin = make_tower_to_admin_matrix(towers, admins)
+    admin_tower = make_admin_to_tower_matrix(admins, towers)
+    query = OverlapQuery(towers, admins)
+    for i_tower in [0, 7, 39]:
+        assert np.allclose(query.tower_admin_column(i_tower),
+                           tower_admin[:, i_tower])
+        assert np.allclose(query.admin_tower_row(i_tower),
+                           admin_tower[i_tower])
+    for i_admin in [0, 4, 8]:
+        assert np.allclose(query.tower_admin_row(i_admin),
+                           tower_admin[i_admin])
+        assert np.allclose(query.admin_tower_column(i_admin),
+                           admin_tower[:, i_admin])
+
+
+def test_nonconvex_pairs():
+    # The admins are not convex, so every pair is intersected by shapely
+    admins = make_country(n_towers=5, n_admins_side=3, n_vertices=8,
+                          density=1.0, seed=3).admin_cells
+    query = OverlapQuery(admins, admins)
+    assert np.allclose(query.tower_admin_column(4),
+                       make_a_to_b_matrix(admins, admins)[:, 4])
+
+
+def test_intersection_areas():
+    cell = MultiPolygon([box(0, 0, 2, 2)])
+    others = [MultiPolygon([box(1, 1, 3, 3)]),
+              box(0, 0, 4, 4).difference(box(0.5, 0.5, 1.5, 1.5)),
+              MultiPolygon([box(5, 5, 6, 6)])]
+    assert np.allclose(intersection_areas(cell, others), [1, 3, 0])
+    assert np.allclose(intersection_areas(others[1], [cell]), [3])
@@ -0,0 +1,56 @@
+# pragma pylint: disable=missing-docstring
+
+import numpy as np
+from shapely.geometry import MultiPolygon, Polygon, box
+from mobility_pipeline.benchmarks.synthetic import make_country
+from mobility_pipeline.lib.raster import (
+    Grid,
+    rasterize,
+    joint_counts,
+    make_raster_operators,
+    estimate_raster_error,
+    NO_LABEL,
+)
+from mobility_pipeline.lib.make_matrix import (
+    make_tower_to_admin_matrix,
+    make_admin_to_tower_matrix,
+)
+
+
+def test_rasterize_and_joint_counts():
+    grid = Grid(0, 0, 1, 4, 2)
+    admins = [MultiPolygon([box(0, 0, 2, 2)]), MultiPolygon([box(2, 0, 3, 2)])]
+    towers = [MultiPolygon([box(0, 0, 1, 2)]), MultiPolygon([box(1, 0, 4, 2)])]
+    admin_labels = rasterize(admins, grid)
+    assert admin_labels.tolist() == [[0, 0, 1, NO_LABEL]] * 2
+    joint = joint_counts(admin_labels, rasterize(towers, grid), 2, 2)
+    assert joint.toarray().tolist() == [[2, 2], [0, 2]]
+
+
+def test_make_raster_operators_close_to_exact():
+    country = make_country(n_towers=20, n_admins_side=3, n_vertices=4,
+                           density=0.1, seed=4)
+    tower_admin, admin_tower = make_raster_operators(
+        country.tower_cells, country.admin_cells, 0.5)
+    exact_tower_admin = make_tower_to_admin_matrix(country.tower_cells,
+                                                   country.admin_cells)
+    exact_admin_tower = make_admin_to_tower_matrix(country.admin_cells,
+                                                   country.tower_cells)
+    assert np.abs(tower_admin - exact_tower_admin).max() < 0.05
+    assert np.abs(admin_tower - exact_admin_tower).max() < 0.05
+
+    errors = estimate_raster_error(country.tower_cells, country.admin_cells,
+                                   tower_admin, admin_tower, n_samples=5)
+    assert 0 < errors['tower_admin']['max_row_l1_error'] < 0.1
+    assert 0 < errors['admin_tower']['max_row_l1_error'] < 0.1
+
+
+def test_make_raster_operators_small_cells_exact():
+    admins = [MultiPolygon([box(0, 0, 10, 10)])]
+    towers = [MultiPolygon([box(0, 0, 10, 9.99)]),
+              MultiPolygon([box(0, 9.99, 10, 10)]),
+              MultiPolygon([Polygon([[0, 0], [0, 0], [0, 0]])])]
+    tower_admin, admin_tower = make_raster_operators(towers, admins, 1)
+    # The thin tower covers no pixel centers, so its row is computed exactly
+    assert np.allclose(admin_tower, [[1], [1], [0]])
+    assert tower_admin[0, 1] == 0
@@ -0,0 +1,55 @@
+# pragma pylint: disable=missing-docstring
+
+import numpy as np
+from shapely.geometry import MultiPolygon, Polygon, box
+from mobility_pipeline.lib.render import (
+    add_cells,
+    add_points,
+    cell_path,
+    cells_bounds,
+    make_figure,
+    pixel_size,
+    show_or_save,
+)
+
+
+def test_cell_path_rings():
+    square = Polygon([(0, 0), (4, 0), (4, 4), (0, 4)],
+                     [[(1, 1), (2, 1), (2, 2), (1, 2)]])
+    cell = MultiPolygon([square, box(10, 10, 11, 11)])
+    path = cell_path(cell)
+    # Two parts, one with a hole, each ring closed
+    assert len(path.vertices) == 15
+    assert list(path.codes).count(path.MOVETO) == 3
+    assert list(path.codes).count(path.CLOSEPOLY) == 3
+    assert cell_path(Polygon()) is None
+
+
+def test_cell_path_drops_subpixel_vertices():
+    xs = np.linspace(0, 10, 1000)
+    wiggly = Polygon(list(zip(xs, 1e-4 * np.sin(xs * 50))) + [(10, 5), (0, 5)])
+    assert len(cell_path(wiggly).vertices) > 1000
+    assert len(cell_path(wiggly, 0.01).vertices) < 10
+    assert cell_path(box(0, 0, 1e-3, 1e-3), 1) is None
+
+
+def test_pixel_size():
+    assert pixel_size((0, 0, 100, 50), (10, 10), 10) == 1
+    assert cells_bounds([box(0, 0, 1, 1), Polygon(), box(2, -1, 3, 0)]) \
+        == (0, -1, 3, 1)
+
+
+def test_render_to_file(tmp_path):
+    output = str(tmp_path / 'plot.png')
+    fig, axes = make_figure(output, (2, 2), 50)
+    cells = [box(0, 0, 1, 1), box(1, 0, 2, 1), box(5, 5, 5.001, 5.001)]
+    collection = add_cells(axes, cells, [[1, 0, 0], [0, 1, 0], [0, 0, 1]],
+                           tolerance=0.01)
+    # The tiny cell vanishes, and the colors stay with their cells
+    assert len(collection.get_paths()) == 2
+    assert np.allclose(collection.get_facecolor()[:, :3], [[1, 0, 0],
+                                                           [0, 1, 0]])
+    add_points(axes, np.array([[0.5, 0.5], [1.5, 0.5]]), ['red', 'green'])
+    show_or_save(fig, axes, output)
+    with open(output, 'rb') as f:
+        assert f.read(8) == b'\x89PNG\r\n\x1a\n'
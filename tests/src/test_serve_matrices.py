@@ -0,0 +1,143 @@
+# pragma pylint: disable=missing-docstring
+
+import json
+import os
+from urllib.parse import urlencode
+import numpy as np
+import pandas as pd
+import pytest
+from webob import Request
+from mobility_pipeline.data_interface import (
+    DATA_PATH,
+    load_admin_admin,
+    save_admin_tower,
+    save_mobility,
+    save_tower_admin,
+)
+from mobility_pipeline.serve_matrices import MatrixService
+
+
+# Two admins, three towers
+TOWER_ADMIN = np.array([[1, 0.5, 0], [0, 0.5, 1]])
+ADMIN_TOWER = np.array([[1, 0], [0.5, 0.5], [0, 1]])
+MOBILITY = pd.DataFrame({'ORIGIN': [0, 1, 2], 'DESTINATION': [1, 2, 2],
+                         'COUNT': [4, 2, 6]})
+
+
+def expected_admin_admin():
+    tower_tower = np.zeros((3, 3))
+    tower_tower[MOBILITY['ORIGIN'], MOBILITY['DESTINATION']] = \
+        MOBILITY['COUNT']
+    return TOWER_ADMIN @ tower_tower @ ADMIN_TOWER
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(DATA_PATH)
+    save_tower_admin('xx', TOWER_ADMIN)
+    save_admin_tower('xx', ADMIN_TOWER)
+    return MatrixService(['xx'])
+
+
+def post(service, path, body, content_type='text/csv'):
+    request = Request.blank(path, method='POST', body=body)
+    request.content_type = content_type
+    return request.get_response(service)
+
+
+def mobility_csv(tmp_path):
+    mobility_path = str(tmp_path / 'mobility.csv')
+    save_mobility(MOBILITY, mobility_path, '2015-02-01')
+    with open(mobility_path, 'rb') as f:
+        return f.read()
+
+
+def test_csv_body(service, tmp_path):
+    response = post(service, '/admin-admin/xx', mobility_csv(tmp_path))
+    assert response.status_code == 200
+    assert response.content_type == 'text/csv'
+    result = np.loadtxt(response.body.decode().splitlines(), delimiter=',')
+    assert np.allclose(result, expected_admin_admin())
+
+
+def test_countries(service):
+    response = Request.blank('/countries').get_response(service)
+    assert response.status_code == 200
+    assert response.json == ['xx']
+
+
+def test_json_body(service):
+    body = json.dumps(MOBILITY.values.tolist()).encode()
+    response = post(service, '/admin-admin/xx', body, 'application/json')
+    assert response.status_code == 200
+    result = np.loadtxt(response.body.decode().splitlines(), delimiter=',')
+    assert np.allclose(result, expected_admin_admin())
+
+
+def test_unknown_country_and_path(service, tmp_path):
+    assert post(service, '/admin-admin/yy',
+                mobility_csv(tmp_path)).status_code == 404
+    assert Request.blank('/admin-admin/xx').get_response(service) \
+        .status_code == 405
+    assert Request.blank('/other').get_response(service).status_code == 404
+
+
+@pytest.mark.parametrize('body, content_type', [
+    (b'not,a,mobility\nfile,at,all\n', 'text/csv'),
+    (b'[[0, 1', 'application/json'),
+    (b'[["a", "b", "c"]]', 'application/json'),
+    (b'[1, 2]', 'application/json'),
+    (b'[[0, 1]]', 'application/json'),
+    (b'[[0, 1, 2], [1, 2]]', 'application/json'),
+    (b'{"0": [1, 2]}', 'application/json'),
+    (b'[[0, 1, {}]]', 'application/json'),
+    (b'[[-1, 1, 2]]', 'application/json'),
+    (b'[[0.5, 1, 2]]', 'application/json'),
+    (b'[[0, 1, null]]', 'application/json'),
+])
+def test_malformed_body(service, body, content_type):
+    response = post(service, '/admin-admin/xx', body, content_type)
+    assert response.status_code == 400
+
+
+def test_day_id_saves(service, tmp_path):
+    response = post(service, '/admin-admin/xx?day_id=2015-02-01',
+                    mobility_csv(tmp_path))
+    assert response.status_code == 200
+    assert os.path.exists(response.json['path'])
+    assert np.allclose(load_admin_admin('xx', '2015-02-01'),
+                       expected_admin_admin())
+
+    response = post(service,
+                    '/admin-admin/xx?day_id=20150201&format=edges&threshold=1',
+                    mobility_csv(tmp_path))
+    assert response.status_code == 200
+    assert (load_admin_admin('xx', '20150201', 'edges')['COUNT'] > 1).all()
+
+
+@pytest.mark.parametrize('day_id', ['../../x', '/tmp/x', '..', 'a/b', '.x'])
+def test_day_id_outside_data_path(service, tmp_path, day_id):
+    before = set(os.listdir(DATA_PATH))
+    query = urlencode({'day_id': day_id})
+    response = post(service, '/admin-admin/xx?' + query,
+                    mobility_csv(tmp_path))
+    assert response.status_code == 400
+    assert set(os.listdir(DATA_PATH)) == before
+    assert set(os.listdir(tmp_path)) == {'data', 'mobility.csv'}
+
+
+@pytest.mark.parametrize('query', [
+    {'day_id': '..'},
+    {'day_id': 'x', 'format': 'xlsx'},
+    {'day_id': 'x', 'threshold': 'high'},
+    {'day_id': 'x', 'top_k': '1.5'},
+])
+def test_query_checked_before_compute(service, tmp_path, monkeypatch,
+                                      query):
+    def compute(*_):
+        raise AssertionError('computed despite an invalid query')
+    monkeypatch.setattr(service, 'compute', compute)
+    response = post(service, '/admin-admin/xx?' + urlencode(query),
+                    mobility_csv(tmp_path))
+    assert response.status_code == 400
@@ -0,0 +1,58 @@
+# pragma pylint: disable=missing-docstring
+
+import numpy as np
+from shapely.geometry import MultiPolygon, Polygon
+from mobility_pipeline.benchmarks.synthetic import make_country
+from mobility_pipeline.lib.simplify import (
+    cached_simplify,
+    count_vertices,
+    estimate_simplification_error,
+    simplify_cells,
+)
+
+
+def test_simplify_cells():
+    xs = np.linspace(0, 10, 101)
+    wiggly = Polygon(list(zip(xs, 0.001 * np.sin(xs * 10))) + [(10, 5),
+                                                                (0, 5)])
+    cells = [MultiPolygon([wiggly]), MultiPolygon()]
+    simplified = simplify_cells(cells, 0.01)
+    assert count_vertices(cells) == 104
+    assert count_vertices(simplified) == 5
+    assert simplified[1].is_empty
+    assert all(isinstance(cell, MultiPolygon) for cell in simplified)
+    assert simplified[0].is_valid
+    assert abs(simplified[0].area - wiggly.area) < 0.01 * 10
+
+
+def test_cached_simplify(tmp_path):
+    cells = make_country(n_towers=5, n_admins_side=2, n_vertices=32,
+                         density=0.0, seed=1).admin_cells + [MultiPolygon()]
+    cache_path = str(tmp_path / 'cells.npz')
+    messages = []
+    first = cached_simplify(cells, 0.5, cache_path, messages.append)
+    second = cached_simplify(cells, 0.5, cache_path, messages.append)
+    assert messages[1].startswith('Using')
+    assert all(a.equals(b) for a, b in zip(first[:-1], second[:-1]))
+    assert isinstance(second[-1], MultiPolygon) and second[-1].is_empty
+    # A different tolerance replaces the cache
+    coarser = cached_simplify(cells, 2, cache_path, messages.append)
+    assert not messages[2].startswith('Using')
+    assert count_vertices(coarser) < count_vertices(first)
+
+
+def test_estimate_simplification_error():
+    country = make_country(n_towers=30, n_admins_side=3, n_vertices=64,
+                           density=0.0, seed=2)
+    towers, admins = country.tower_cells, country.admin_cells
+    same = estimate_simplification_error(towers, admins, towers, admins, 5)
+    assert same['tower_admin']['max_abs_error'] == 0
+    coarse = estimate_simplification_error(
+        towers, admins, simplify_cells(towers, 1), simplify_cells(admins, 1),
+        5)
+    fine = estimate_simplification_error(
+        towers, admins, simplify_cells(towers, 0.01),
+        simplify_cells(admins, 0.01), 5)
+    for name in ('tower_admin', 'admin_tower'):
+        assert 0 < fine[name]['max_abs_error'] \
+            < coarse[name]['max_abs_error'] < 0.5
@@ -0,0 +1,68 @@
+# pragma pylint: disable=missing-docstring
+
+import numpy as np
+import pandas as pd
+from mobility_pipeline.lib.subset import (
+    make_subset,
+    tower_mask,
+    make_admin_admin_subset,
+    subset_to_edges,
+)
+from mobility_pipeline.lib.make_matrix import (
+    make_tower_tower_matrix,
+    make_admin_admin_matrix,
+)
+
+
+def random_operators(rng, n_admins, n_towers):
+    # Sparse operators, like those of real tessellations
+    tower_admin = rng.uniform(size=(n_admins, n_towers)) * \
+        (rng.uniform(size=(n_admins, n_towers)) < 0.2)
+    admin_tower = rng.uniform(size=(n_towers, n_admins)) * \
+        (rng.uniform(size=(n_towers, n_admins)) < 0.2)
+    return tower_admin, admin_tower
+
+
+def random_mobility(rng, n_towers):
+    origins, destinations = np.nonzero(
+        rng.uniform(size=(n_towers, n_towers)) < 0.5)
+    return pd.DataFrame({
+        'ORIGIN': origins,
+        'DESTINATION': destinations,
+        'COUNT': rng.randint(1, 100, len(origins)).astype(float),
+    })
+
+
+def test_make_admin_admin_subset_matches_full():
+    rng = np.random.RandomState(0)
+    tower_admin, admin_tower = random_operators(rng, 12, 20)
+    mobility = random_mobility(rng, 20)
+    full = make_admin_admin_matrix(make_tower_tower_matrix(mobility, 20),
+                                   tower_admin, admin_tower)
+    subset = make_subset(tower_admin, admin_tower, [3, 1, 7], [0, 11])
+    assert len(subset.origin_towers) < 20
+    mat = make_admin_admin_subset(mobility, subset)
+    assert np.allclose(mat, full[np.ix_([3, 1, 7], [0, 11])])
+
+    edges = subset_to_edges(mat, subset)
+    assert np.allclose(full[edges['ORIGIN'], edges['DESTINATION']],
+                       edges['COUNT'])
+
+
+def test_make_subset_defaults_to_all_admins():
+    rng = np.random.RandomState(1)
+    tower_admin, admin_tower = random_operators(rng, 5, 8)
+    mobility = random_mobility(rng, 8)
+    full = make_admin_admin_matrix(make_tower_tower_matrix(mobility, 8),
+                                   tower_admin, admin_tower)
+    subset = make_subset(tower_admin, admin_tower, destinations=[2])
+    assert np.allclose(make_admin_admin_subset(mobility, subset),
+                       full[:, [2]])
+
+
+def test_tower_mask_remap():
+    assert tower_mask(np.array([1, 3]), 5).tolist() == \
+        [False, True, False, True, False]
+    remap = np.array([0, 1, 1, -1, 3])
+    assert tower_mask(np.array([1, 3]), 4, remap).tolist() == \
+        [False, True, True, False, True]
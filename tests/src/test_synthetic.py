@@ -0,0 +1,45 @@
+# pragma pylint: disable=missing-docstring
+
+import numpy as np
+from shapely.geometry import Point
+from mobility_pipeline.benchmarks.synthetic import make_country, BOUNDS
+from mobility_pipeline.lib.validate import \
+    validate_contiguous_disjoint_cells
+
+
+def test_make_country_valid():
+    country = make_country(n_towers=40, n_admins_side=4, n_vertices=8,
+                           density=0.2, seed=1)
+    assert len(country.tower_cells) == 40
+    assert len(country.admin_cells) == 16
+    assert validate_contiguous_disjoint_cells(country.tower_cells) is None
+    assert validate_contiguous_disjoint_cells(country.admin_cells) is None
+    total_area = (BOUNDS[2] - BOUNDS[0]) * (BOUNDS[3] - BOUNDS[1])
+    assert np.isclose(sum(c.area for c in country.admin_cells), total_area)
+    for tower, cell in zip(country.towers, country.tower_cells):
+        assert cell.contains(Point(*tower))
+
+
+def test_make_country_nested_admins():
+    country = make_country(n_towers=10, n_admins_side=4, n_vertices=2,
+                           density=0.1)
+    assert np.all(np.bincount(country.parent_ids) == 4)
+
+
+def test_make_country_mobility_sorted():
+    country = make_country(n_towers=30, n_admins_side=2, n_vertices=2,
+                           density=0.3)
+    keys = country.mobility['ORIGIN'] * 30 + country.mobility['DESTINATION']
+    assert np.all(np.diff(keys.values) > 0)
+    assert country.mobility['ORIGIN'].max() < 30
+
+
+def test_make_country_seeded():
+    first = make_country(n_towers=20, n_admins_side=3, n_vertices=4,
+                         density=0.1, seed=5)
+    second = make_country(n_towers=20, n_admins_side=3, n_vertices=4,
+                          density=0.1, seed=5)
+    assert np.all(first.towers == second.towers)
+    assert all(a.equals(b) for a, b in zip(first.admin_cells,
+                                           second.admin_cells))
+    assert first.mobility.equals(second.mobility)
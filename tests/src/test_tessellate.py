@@ -0,0 +1,46 @@
+# pragma pylint: disable=missing-docstring
+
+import numpy as np
+from shapely.geometry import MultiPolygon, Point, Polygon, box
+from mobility_pipeline.lib.tessellate import tessellate
+from mobility_pipeline.lib.validate import \
+    validate_contiguous_disjoint_cells
+
+
+def square_outline():
+    # Two admins that together form the square from (0, 0) to (10, 10)
+    return [MultiPolygon([box(0, 0, 5, 10)]), MultiPolygon([box(5, 0, 10, 10)])]
+
+
+def test_tessellate_covers_outline_in_tower_order():
+    rng = np.random.RandomState(0)
+    towers = rng.uniform(0, 10, (20, 2))
+    cells = tessellate(towers, square_outline())
+    assert len(cells) == 20
+    assert validate_contiguous_disjoint_cells(cells) is None
+    assert np.isclose(sum(cell.area for cell in cells), 100)
+    for tower, cell in zip(towers, cells):
+        assert cell.contains(Point(*tower))
+
+
+def test_tessellate_clips_to_outline():
+    towers = np.array([[1, 1], [9, 9], [1, 9], [9, 1]])
+    triangle = [MultiPolygon([Polygon([(0, 0), (10, 0), (0, 10)])])]
+    cells = tessellate(towers, triangle)
+    assert np.isclose(sum(cell.area for cell in cells), 50)
+    assert cells[1].area == 0
+
+
+def test_tessellate_duplicate_towers_get_empty_cells():
+    towers = np.array([[2, 2], [8, 8], [2, 2], [2, 8]])
+    cells = tessellate(towers, square_outline())
+    assert cells[0].area > 0
+    assert cells[2].area == 0
+    assert np.isclose(sum(cell.area for cell in cells), 100)
+
+
+def test_tessellate_few_towers():
+    cells = tessellate(np.array([[3, 3], [3, 3]]), square_outline())
+    assert np.isclose(cells[0].area, 100)
+    assert cells[1].area == 0
+    assert tessellate(np.zeros((0, 2)), square_outline()) == []